@@ -5,6 +5,9 @@ Script d'extraction des données Oracle Audit Trail vers MongoDB
 import os
 import asyncio
 import logging
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 try:
@@ -14,10 +17,11 @@ except ImportError:
     
 try:
     from motor.motor_asyncio import AsyncIOMotorClient
-    from pymongo.errors import DuplicateKeyError
+    from pymongo.errors import DuplicateKeyError, BulkWriteError
 except ImportError:
     AsyncIOMotorClient = None
     DuplicateKeyError = None
+    BulkWriteError = None
 import pandas as pd
 from pathlib import Path
 
@@ -28,6 +32,55 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Marques hautes de l'extraction incrémentale (un document par source d'audit)
+WATERMARK_COLLECTION = 'oracle_extraction_watermarks'
+# Tranches terminées de l'extraction parallèle (reprise après échec)
+CHECKPOINT_COLLECTION = 'oracle_extraction_checkpoints'
+
+# Colonnes composant _unique_id, dans cet ordre
+UNIQUE_ID_FIELDS = ('timestamp', 'event_timestamp', 'session_id', 'scn')
+
+
+def _clean_string(value):
+    value = value.strip()
+    return value if value else None
+
+
+def _to_isoformat(value):
+    return value.isoformat()
+
+
+def _to_clean_string(value):
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _clean_string(str(value))
+
+
+def _column_converter(type_code):
+    """Convertisseur d'une colonne d'après son type Oracle (None: valeur telle quelle)"""
+    if oracledb is None:
+        return _to_clean_string
+    if type_code in (oracledb.DB_TYPE_DATE, oracledb.DB_TYPE_TIMESTAMP,
+                     oracledb.DB_TYPE_TIMESTAMP_TZ, oracledb.DB_TYPE_TIMESTAMP_LTZ):
+        return _to_isoformat
+    if type_code in (oracledb.DB_TYPE_NUMBER, oracledb.DB_TYPE_BINARY_INTEGER,
+                     oracledb.DB_TYPE_BINARY_FLOAT, oracledb.DB_TYPE_BINARY_DOUBLE):
+        return None
+    if type_code in (oracledb.DB_TYPE_VARCHAR, oracledb.DB_TYPE_NVARCHAR, oracledb.DB_TYPE_CHAR,
+                     oracledb.DB_TYPE_NCHAR, oracledb.DB_TYPE_LONG, oracledb.DB_TYPE_LONG_NVARCHAR):
+        return _clean_string
+    return _to_clean_string
+
+
+def _output_type_handler(cursor, metadata):
+    """Lit les CLOB/NCLOB (SQL_TEXT, SQL_BINDS...) directement comme chaînes"""
+    if metadata.type_code is oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_NCLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+
 class OracleAuditExtractor:
     """Extracteur de données Oracle Audit Trail vers MongoDB"""
     
@@ -36,6 +89,27 @@ class OracleAuditExtractor:
         self.mongo_uri = mongo_uri
         self.mongo_client = None
         self.oracle_pool = None
+        # Collections dont l'index _unique_id a déjà été vérifié pendant ce run
+        self._indexed_collections = set()
+        # Taille des lots Oracle et nombre de lots lus d'avance (file producteur/consommateur)
+        self.batch_size = int(oracle_config.get('batch_size', 1000))
+        self.queue_depth = int(oracle_config.get('queue_depth', 4))
+        # Extraction incrémentale: marque haute par source, relue avec une marge
+        # pour les lignes d'audit commitées en retard
+        self.watermark_overlap = timedelta(seconds=int(oracle_config.get('watermark_overlap_seconds', 300)))
+        # Mode parallèle: nombre de requêtes simultanées (tranches x sources), durée
+        # d'une tranche et tentatives par tranche. 1 = extraction séquentielle.
+        self.parallelism = int(oracle_config.get('parallelism', 1))
+        self.slice_hours = float(oracle_config.get('slice_hours', 6))
+        self.slice_retries = int(oracle_config.get('slice_retries', 3))
+        # Durée de conservation des checkpoints de tranches (runs abandonnés)
+        self.checkpoint_ttl = timedelta(days=int(oracle_config.get('checkpoint_ttl_days', 7)))
+        self._fetch_executor = None
+        self.watermark_columns = {
+            'audit_trail': 'timestamp',
+            'fga_audit': 'timestamp',
+            'unified_audit': 'event_timestamp'
+        }
         
         # Configuration des requêtes d'audit
         self.audit_queries = {
@@ -149,23 +223,32 @@ class OracleAuditExtractor:
             raise
     
     async def extract_audit_data(self, start_date: datetime, end_date: datetime, 
-                               audit_type: str = 'all') -> Dict[str, int]:
-        """Extrait les données d'audit Oracle et les insère dans MongoDB"""
+                               audit_type: str = 'all', incremental: bool = False) -> Dict[str, int]:
+        """Extrait les données d'audit Oracle et les insère dans MongoDB
+        
+        En mode incrémental, chaque source repart de sa marque haute (moins la
+        marge de recouvrement); start_date ne sert qu'à la première extraction.
+        Avec parallelism > 1, la fenêtre est découpée en tranches extraites en
+        parallèle (voir _extract_parallel).
+        """
+        if self.parallelism > 1:
+            return await self._extract_parallel(start_date, end_date, audit_type, incremental)
+        
         try:
             stats = {'total_extracted': 0, 'errors': 0}
             
             if audit_type in ['all', 'audit_trail']:
-                count = await self._extract_and_insert('audit_trail', start_date, end_date)
+                count = await self._extract_and_insert('audit_trail', start_date, end_date, incremental)
                 stats['audit_trail'] = count
                 stats['total_extracted'] += count
             
             if audit_type in ['all', 'fga_audit']:
-                count = await self._extract_and_insert('fga_audit', start_date, end_date)
+                count = await self._extract_and_insert('fga_audit', start_date, end_date, incremental)
                 stats['fga_audit'] = count
                 stats['total_extracted'] += count
             
             if audit_type in ['all', 'unified_audit']:
-                count = await self._extract_and_insert('unified_audit', start_date, end_date)
+                count = await self._extract_and_insert('unified_audit', start_date, end_date, incremental)
                 stats['unified_audit'] = count
                 stats['total_extracted'] += count
             
@@ -178,126 +261,386 @@ class OracleAuditExtractor:
             return stats
     
     async def _extract_and_insert(self, audit_type: str, start_date: datetime, 
-                                end_date: datetime) -> int:
+                                end_date: datetime, incremental: bool = False) -> int:
         """Extrait et insère les données pour un type d'audit spécifique"""
+        if incremental:
+            start_date = await self._incremental_start(audit_type, start_date)
+        
+        result = await self._extract_range(audit_type, start_date, end_date)
+        
+        # La marque n'avance que si tout le lot est en base (sinon le prochain run relit la plage)
+        if result['max_timestamp'] is not None and not result['errors']:
+            await self._save_watermark(audit_type, result['max_timestamp'], result['max_scn'])
+        return result['inserted']
+    
+    async def _incremental_start(self, audit_type: str, start_date: datetime) -> datetime:
+        """Début d'extraction: marque haute moins la marge, sinon start_date"""
+        watermark = await self.get_watermark(audit_type)
+        if watermark and watermark.get('timestamp'):
+            logger.info(f"{audit_type}: reprise depuis la marque haute {watermark['timestamp']} (SCN {watermark.get('scn')})")
+            return watermark['timestamp'] - self.watermark_overlap
+        return start_date
+    
+    async def _extract_range(self, audit_type: str, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        """Extrait une plage [start_date, end_date] d'une source; retourne les compteurs et les maxima.
+        
+        Pipeline producteur/consommateur: un thread de travail lit les lots
+        Oracle (fetchmany) dans une file bornée pendant que la boucle normalise
+        et écrit le lot précédent dans MongoDB. La file pleine suspend la
+        lecture Oracle (contre-pression), la boucle d'événements n'est jamais
+        bloquée par le driver.
+        """
         logger.info(f"Extraction {audit_type} du {start_date} au {end_date}")
         
         query = self.audit_queries[audit_type]
         collection_name = f"oracle_{audit_type}"
+        params = {
+            'start_date': start_date,
+            'end_date': end_date
+        }
+        
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
         
         try:
-            # Extraction Oracle
-            with self.oracle_pool.acquire() as connection:
-                cursor = connection.cursor()
-                cursor.execute(query, {
-                    'start_date': start_date,
-                    'end_date': end_date
-                })
-                
-                # Récupérer les noms de colonnes
-                columns = [desc[0].lower() for desc in cursor.description]
-                
-                # Traitement par batch
-                batch_size = 1000
+            await self._ensure_unique_index(collection_name)
+            
+            producer = loop.run_in_executor(
+                self._fetch_executor, self._fetch_batches, query, params, self.batch_size, loop, queue, stop
+            )
+            try:
                 total_inserted = 0
+                total_duplicates = 0
+                total_errors = 0
+                plan = None
+                max_timestamp = None
+                max_scn = None
                 
                 while True:
-                    rows = cursor.fetchmany(batch_size)
-                    if not rows:
+                    item = await queue.get()
+                    if item is None:
                         break
+                    if isinstance(item, Exception):
+                        raise item
+                    if plan is None:
+                        # Premier élément: (nom, type) des colonnes (cursor.description)
+                        plan = self._document_plan(item)
+                        columns = plan['keys']
+                        ts_column = self.watermark_columns.get(audit_type)
+                        ts_index = columns.index(ts_column) if ts_column in columns else None
+                        scn_index = columns.index('scn') if 'scn' in columns else None
+                        continue
+                    
+                    # Marque haute lue sur les valeurs Oracle brutes (avant normalisation)
+                    if ts_index is not None:
+                        batch_max = max((row[ts_index] for row in item if row[ts_index] is not None), default=None)
+                        if batch_max is not None and (max_timestamp is None or batch_max > max_timestamp):
+                            max_timestamp = batch_max
+                    if scn_index is not None:
+                        batch_scn = max((row[scn_index] for row in item if row[scn_index] is not None), default=None)
+                        if batch_scn is not None and (max_scn is None or batch_scn > max_scn):
+                            max_scn = batch_scn
                     
-                    # Convertir en documents MongoDB
-                    documents = []
-                    for row in rows:
-                        doc = dict(zip(columns, row))
-                        
-                        # Normaliser les types de données
-                        doc = self._normalize_document(doc, audit_type)
-                        
-                        # Ajouter métadonnées
-                        doc['_extraction_time'] = datetime.utcnow()
-                        doc['_audit_type'] = audit_type
-                        doc['_source'] = 'oracle_audit_trail'
-                        
-                        documents.append(doc)
+                    documents = self._normalize_batch(plan, item, audit_type)
                     
-                    # Insertion MongoDB
+                    # Insertion MongoDB (le producteur lit le lot suivant pendant ce temps)
                     if documents:
-                        inserted = await self._insert_documents(collection_name, documents)
-                        total_inserted += inserted
-                        logger.info(f"{audit_type}: {total_inserted} documents insérés")
-                
-                cursor.close()
-                return total_inserted
+                        counts = await self._insert_documents(collection_name, documents)
+                        total_inserted += counts['inserted']
+                        total_duplicates += counts['duplicates']
+                        total_errors += counts['errors']
+                        logger.info(
+                            f"{audit_type}: lot de {len(documents)} -> {counts['inserted']} insérés, "
+                            f"{counts['duplicates']} doublons, {counts['errors']} erreurs "
+                            f"(total {total_inserted} insérés)"
+                        )
+            finally:
+                stop.set()
+                # Débloque le producteur s'il attend une place dans la file
+                while not producer.done():
+                    try:
+                        queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        await asyncio.sleep(0.01)
+            
+            logger.info(f"{audit_type}: {total_inserted} insérés, {total_duplicates} doublons ignorés")
+            return {
+                'inserted': total_inserted,
+                'duplicates': total_duplicates,
+                'errors': total_errors,
+                'max_timestamp': max_timestamp,
+                'max_scn': max_scn
+            }
                 
         except Exception as e:
             logger.error(f"Erreur extraction {audit_type}: {e}")
             raise
     
-    def _normalize_document(self, doc: Dict[str, Any], audit_type: str) -> Dict[str, Any]:
-        """Normalise un document pour MongoDB"""
-        normalized = {}
+    async def _extract_parallel(self, start_date: datetime, end_date: datetime,
+                                audit_type: str = 'all', incremental: bool = False) -> Dict[str, Any]:
+        """Extraction parallèle par tranches de temps et par source.
+        
+        Chaque (source, tranche) est une requête indépendante sur le pool Oracle;
+        au plus `parallelism` s'exécutent simultanément. Une tranche terminée est
+        enregistrée (checkpoint) et sautée si le run est relancé; une tranche en
+        échec est réessayée seule. Les bornes des requêtes étant inclusives, une
+        ligne en limite de tranche peut être lue deux fois: l'index unique
+        _unique_id l'écarte.
+        
+        Seules les tranches complètes (alignées sur slice_hours) ont un checkpoint:
+        les tranches partielles en bordure de fenêtre sont relues à chaque run.
+        Comme en mode séquentiel, une erreur est comptée dans les stats retournées.
+        """
+        stats = {'total_extracted': 0, 'errors': 0}
+        try:
+            return await self._run_parallel(start_date, end_date, audit_type, incremental, stats)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'extraction parallèle: {e}")
+            stats['errors'] += 1
+            return stats
+    
+    async def _run_parallel(self, start_date: datetime, end_date: datetime, audit_type: str,
+                            incremental: bool, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Corps de _extract_parallel (les stats sont complétées au fil des sources)"""
+        audit_types = [t for t in self.audit_queries if audit_type in ('all', t)]
+        parallelism = min(self.parallelism, getattr(self.oracle_pool, 'max', self.parallelism))
+        semaphore = asyncio.Semaphore(parallelism)
+        checkpoints = self.mongo_client.auditdb[CHECKPOINT_COLLECTION]
+        step = timedelta(hours=self.slice_hours)
+        await self._ensure_checkpoint_index(checkpoints)
         
-        for key, value in doc.items():
-            # Nettoyer les clés
-            clean_key = key.lower().strip()
+        async def run_slice(source: str, slice_start: datetime, slice_end: datetime) -> Dict[str, Any]:
+            slice_id = f"{source}:{slice_start.isoformat()}:{slice_end.isoformat()}"
+            complete = slice_end - slice_start == step
+            done = await checkpoints.find_one({'_id': slice_id}) if complete else None
+            if done:
+                logger.info(f"{source}: tranche {slice_start} - {slice_end} déjà extraite, ignorée")
+                return {
+                    'inserted': 0, 'errors': 0, 'skipped': True,
+                    'max_timestamp': done.get('max_timestamp'), 'max_scn': done.get('max_scn')
+                }
             
-            # Traiter les valeurs
-            if value is None:
-                normalized[clean_key] = None
-            elif isinstance(value, (datetime,)):
-                normalized[clean_key] = value.isoformat()
-            elif isinstance(value, (int, float)):
-                normalized[clean_key] = value
-            else:
-                # Convertir en string et nettoyer
-                str_value = str(value).strip()
-                normalized[clean_key] = str_value if str_value else None
+            for attempt in range(1, self.slice_retries + 1):
+                try:
+                    async with semaphore:
+                        result = await self._extract_range(source, slice_start, slice_end)
+                    if result['errors']:
+                        raise RuntimeError(f"{result['errors']} documents non insérés")
+                    if not complete:
+                        return result
+                    await checkpoints.update_one({'_id': slice_id}, {'$set': {
+                        'audit_type': source,
+                        'start': slice_start,
+                        'end': slice_end,
+                        'inserted': result['inserted'],
+                        'max_timestamp': result['max_timestamp'],
+                        'max_scn': result['max_scn'],
+                        'completed_at': datetime.utcnow()
+                    }}, upsert=True)
+                    return result
+                except Exception as e:
+                    if attempt == self.slice_retries:
+                        logger.error(f"{source}: tranche {slice_start} - {slice_end} en échec après {attempt} tentatives: {e}")
+                        raise
+                    logger.warning(f"{source}: tranche {slice_start} - {slice_end} en échec (tentative {attempt}): {e}")
+                    await asyncio.sleep(2 ** attempt)
         
-        # Créer un ID unique pour éviter les doublons
-        id_fields = []
-        if 'timestamp' in normalized:
-            id_fields.append(str(normalized['timestamp']))
-        if 'event_timestamp' in normalized:
-            id_fields.append(str(normalized['event_timestamp']))
-        if 'session_id' in normalized:
-            id_fields.append(str(normalized['session_id']))
-        if 'scn' in normalized:
-            id_fields.append(str(normalized['scn']))
+        # Threads producteurs dédiés: un par requête simultanée
+        self._fetch_executor = ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="oracle-extract")
+        try:
+            tasks = {}
+            for source in audit_types:
+                source_start = await self._incremental_start(source, start_date) if incremental else start_date
+                slices = self._time_slices(source_start, end_date)
+                logger.info(f"{source}: {len(slices)} tranches de {self.slice_hours}h, parallélisme {parallelism}")
+                tasks[source] = [asyncio.ensure_future(run_slice(source, s, e)) for s, e in slices]
+            
+            for source, source_tasks in tasks.items():
+                results = await asyncio.gather(*source_tasks, return_exceptions=True)
+                failed = [r for r in results if isinstance(r, Exception)]
+                inserted = sum(r['inserted'] for r in results if not isinstance(r, Exception))
+                stats[source] = inserted
+                stats['total_extracted'] += inserted
+                stats['errors'] += len(failed)
+                
+                # Marque haute seulement si toutes les tranches de la source ont abouti
+                if not failed:
+                    timestamps = [r['max_timestamp'] for r in results if r['max_timestamp'] is not None]
+                    scns = [r['max_scn'] for r in results if r['max_scn'] is not None]
+                    if timestamps:
+                        await self._save_watermark(source, max(timestamps), max(scns) if scns else None)
+                        # Tranches que la reprise incrémentale ne relira plus: checkpoints inutiles
+                        await checkpoints.delete_many({
+                            'audit_type': source,
+                            'end': {'$lte': max(timestamps) - self.watermark_overlap}
+                        })
+        finally:
+            self._fetch_executor.shutdown(wait=False)
+            self._fetch_executor = None
         
-        if id_fields:
-            import hashlib
-            unique_id = hashlib.md5('_'.join(id_fields).encode()).hexdigest()
-            normalized['_unique_id'] = unique_id
+        logger.info(f"Extraction parallèle terminée: {stats}")
+        return stats
+    
+    def _time_slices(self, start_date: datetime, end_date: datetime) -> List[tuple]:
+        """Découpe [start_date, end_date] en tranches de slice_hours.
         
-        return normalized
+        Les bornes sont alignées sur des multiples de slice_hours depuis l'epoch
+        (et non sur start_date) pour que les identifiants de tranche, donc les
+        checkpoints, restent les mêmes d'un run à l'autre; seules la première et
+        la dernière tranche sont tronquées à la fenêtre demandée.
+        """
+        step = timedelta(hours=self.slice_hours)
+        epoch = datetime(1970, 1, 1, tzinfo=start_date.tzinfo)
+        boundary = epoch + ((start_date - epoch) // step) * step
+        slices = []
+        current = start_date
+        while current < end_date:
+            boundary += step
+            slices.append((current, min(boundary, end_date)))
+            current = boundary
+        return slices
     
-    async def _insert_documents(self, collection_name: str, documents: List[Dict[str, Any]]) -> int:
-        """Insère les documents dans MongoDB en gérant les doublons"""
+    def _fetch_batches(self, query: str, params: Dict[str, Any], batch_size: int,
+                       loop: asyncio.AbstractEventLoop, queue: asyncio.Queue, stop: threading.Event):
+        """Producteur exécuté dans un thread de travail.
+        
+        Pousse dans la file la description des colonnes, puis chaque lot de lignes, puis
+        None en fin de lecture (ou l'exception rencontrée). Chaque put attend une
+        place libre dans la file.
+        """
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        
         try:
-            db = self.mongo_client.auditdb
-            collection = db[collection_name]
-            
-            # Créer l'index sur _unique_id si il n'existe pas
-            await collection.create_index([("_unique_id", 1)], unique=True, background=True)
-            
-            inserted_count = 0
-            for doc in documents:
+            with self.oracle_pool.acquire() as connection:
+                cursor = connection.cursor()
                 try:
-                    await collection.insert_one(doc)
-                    inserted_count += 1
-                except Exception as e:
-                    if DuplicateKeyError and isinstance(e, DuplicateKeyError):
-                        # Document déjà existant, on ignore
-                        pass
-                    else:
-                        logger.warning(f"Erreur insertion document: {e}")
+                    # Un aller-retour réseau par lot
+                    cursor.arraysize = batch_size
+                    cursor.prefetchrows = batch_size
+                    cursor.outputtypehandler = _output_type_handler
+                    cursor.execute(query, params)
+                    put([(desc[0], desc[1]) for desc in cursor.description])
+                    
+                    while not stop.is_set():
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        put(rows)
+                finally:
+                    cursor.close()
+        except Exception as e:
+            put(e)
+            return
+        put(None)
+    
+    def _document_plan(self, description: List[tuple]) -> Dict[str, Any]:
+        """Prépare la conversion d'un curseur: clés nettoyées, convertisseur par
+        colonne (choisi d'après le type Oracle) et colonnes de l'ID unique.
+        
+        Calculé une fois par requête au lieu de chaque ligne.
+        """
+        keys = [name.lower().strip() for name, _ in description]
+        converters = [_column_converter(type_code) for _, type_code in description]
+        # Dernière occurrence d'une clé en double, comme dans un dict
+        positions = {key: index for index, key in enumerate(keys)}
+        id_indexes = [positions[field] for field in UNIQUE_ID_FIELDS if field in positions]
+        return {'keys': keys, 'converters': converters, 'id_indexes': id_indexes}
+    
+    def _normalize_batch(self, plan: Dict[str, Any], rows: List[tuple], audit_type: str) -> List[Dict[str, Any]]:
+        """Convertit un lot de lignes Oracle en documents MongoDB, colonne par colonne"""
+        if not rows:
+            return []
+        
+        # Transposition: un convertisseur appliqué à toute une colonne
+        columns = [
+            list(values) if convert is None else [None if v is None else convert(v) for v in values]
+            for convert, values in zip(plan['converters'], zip(*rows))
+        ]
+        keys = list(plan['keys'])
+        
+        # Créer un ID unique pour éviter les doublons (même empreinte que les runs précédents)
+        if plan['id_indexes']:
+            id_columns = [columns[index] for index in plan['id_indexes']]
+            keys.append('_unique_id')
+            columns.append([
+                hashlib.md5('_'.join(map(str, values)).encode()).hexdigest()
+                for values in zip(*id_columns)
+            ])
+        
+        # Métadonnées
+        count = len(rows)
+        keys.extend(['_extraction_time', '_audit_type', '_source'])
+        columns.extend([
+            [datetime.utcnow()] * count,
+            [audit_type] * count,
+            ['oracle_audit_trail'] * count
+        ])
+        
+        return [dict(zip(keys, values)) for values in zip(*columns)]
+    
+    async def get_watermark(self, audit_type: str) -> Optional[Dict[str, Any]]:
+        """Marque haute d'une source (EVENT_TIMESTAMP/TIMESTAMP et SCN max déjà extraits)"""
+        return await self.mongo_client.auditdb[WATERMARK_COLLECTION].find_one({'_id': audit_type})
+    
+    async def _save_watermark(self, audit_type: str, timestamp: datetime, scn: Optional[int]):
+        """Avance la marque haute ($max: jamais de retour en arrière)"""
+        update = {
+            '$max': {'timestamp': timestamp},
+            '$set': {'updated_at': datetime.utcnow()}
+        }
+        if scn is not None:
+            update['$max']['scn'] = int(scn)
+        await self.mongo_client.auditdb[WATERMARK_COLLECTION].update_one(
+            {'_id': audit_type}, update, upsert=True
+        )
+        logger.info(f"{audit_type}: marque haute {timestamp} (SCN {scn})")
+    
+    async def _ensure_checkpoint_index(self, checkpoints):
+        """Index TTL: les checkpoints d'un run abandonné expirent après checkpoint_ttl"""
+        await checkpoints.create_index(
+            [("completed_at", 1)], expireAfterSeconds=int(self.checkpoint_ttl.total_seconds())
+        )
+    
+    async def _ensure_unique_index(self, collection_name: str):
+        """Crée l'index unique sur _unique_id une seule fois par run et par collection"""
+        if collection_name in self._indexed_collections:
+            return
+        collection = self.mongo_client.auditdb[collection_name]
+        await collection.create_index([("_unique_id", 1)], unique=True, background=True)
+        self._indexed_collections.add(collection_name)
+    
+    async def _insert_documents(self, collection_name: str, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insère un lot en un seul aller-retour (insert_many non ordonné).
+        
+        Les doublons (_unique_id déjà présent) sont rejetés par l'index unique
+        sans interrompre le lot; les compteurs viennent du résultat du bulk.
+        """
+        counts = {'inserted': 0, 'duplicates': 0, 'errors': 0}
+        try:
+            collection = self.mongo_client.auditdb[collection_name]
+            await self._ensure_unique_index(collection_name)
             
-            return inserted_count
+            result = await collection.insert_many(documents, ordered=False)
+            counts['inserted'] = len(result.inserted_ids)
             
         except Exception as e:
-            logger.error(f"Erreur insertion batch: {e}")
-            return 0
+            if BulkWriteError and isinstance(e, BulkWriteError):
+                details = e.details or {}
+                write_errors = details.get('writeErrors', [])
+                counts['inserted'] = details.get('nInserted', 0)
+                # 11000: clé dupliquée (document déjà extrait)
+                counts['duplicates'] = sum(1 for err in write_errors if err.get('code') == 11000)
+                counts['errors'] = len(write_errors) - counts['duplicates']
+                if counts['errors']:
+                    first = next(err for err in write_errors if err.get('code') != 11000)
+                    logger.warning(f"Erreurs insertion {collection_name}: {counts['errors']} (ex: {first.get('errmsg')})")
+            else:
+                logger.error(f"Erreur insertion batch: {e}")
+                counts['errors'] = len(documents)
+        
+        return counts
     
     async def cleanup(self):
         """Nettoie les ressources"""
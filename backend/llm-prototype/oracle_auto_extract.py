@@ -40,10 +40,18 @@ class OracleAutoExtractor:
         self.extraction_interval = int(os.getenv('EXTRACTION_INTERVAL_HOURS', 6))
         self.extraction_days = int(os.getenv('EXTRACTION_DAYS_BACK', 1))
         self.audit_types = os.getenv('AUDIT_TYPES', 'all').split(',')
+        # Extraction incrémentale par marque haute (EXTRACTION_DAYS_BACK: première extraction seulement)
+        self.incremental = os.getenv('EXTRACTION_INCREMENTAL', 'true').lower() == 'true'
+        self.oracle_config['watermark_overlap_seconds'] = int(os.getenv('EXTRACTION_OVERLAP_SECONDS', 300))
+        # Extraction parallèle par tranches (1: séquentielle)
+        self.oracle_config['parallelism'] = int(os.getenv('EXTRACTION_PARALLELISM', 1))
+        self.oracle_config['slice_hours'] = float(os.getenv('EXTRACTION_SLICE_HOURS', 6))
+        self.oracle_config['checkpoint_ttl_days'] = int(os.getenv('EXTRACTION_CHECKPOINT_TTL_DAYS', 7))
         
         logger.info(f"Configuration Oracle: {self.oracle_config['host']}:{self.oracle_config['port']}")
         logger.info(f"Intervalle d'extraction: {self.extraction_interval} heures")
         logger.info(f"Types d'audit: {self.audit_types}")
+        logger.info(f"Mode incrémental: {self.incremental}")
     
     async def extract_data(self):
         """Effectue l'extraction des données"""
@@ -65,7 +73,7 @@ class OracleAutoExtractor:
                     audit_type = audit_type.strip()
                     if audit_type in ['all', 'audit_trail', 'fga_audit', 'unified_audit']:
                         logger.info(f"📊 Extraction {audit_type}...")
-                        stats = await extractor.extract_audit_data(start_date, end_date, audit_type)
+                        stats = await extractor.extract_audit_data(start_date, end_date, audit_type, self.incremental)
                         extracted = stats.get('total_extracted', 0)
                         total_extracted += extracted
                         logger.info(f"✅ {audit_type}: {extracted} enregistrements extraits")
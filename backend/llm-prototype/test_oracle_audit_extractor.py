@@ -0,0 +1,238 @@
+"""Tests de l'extracteur Oracle Audit -> MongoDB (sans Oracle ni MongoDB)"""
+import hashlib
+from datetime import datetime, timedelta
+
+import pytest
+
+import oracle_audit_extractor as extractor_module
+from oracle_audit_extractor import OracleAuditExtractor, CHECKPOINT_COLLECTION
+
+
+def reference_document(document):
+    """Normalisation ligne par ligne d'avant _normalize_batch (référence de parité)"""
+    normalized = {}
+    for key, value in document.items():
+        clean_key = key.lower().strip()
+        if value is None:
+            normalized[clean_key] = None
+        elif isinstance(value, datetime):
+            normalized[clean_key] = value.isoformat()
+        elif isinstance(value, (int, float)):
+            normalized[clean_key] = value
+        else:
+            str_value = str(value).strip()
+            normalized[clean_key] = str_value if str_value else None
+    unique_fields = [str(normalized[f]) for f in ('timestamp', 'event_timestamp', 'session_id', 'scn')
+                     if f in normalized]
+    normalized['_unique_id'] = hashlib.md5('_'.join(unique_fields).encode()).hexdigest()
+    return normalized
+
+
+DESCRIPTION = [('TIMESTAMP', None), ('OS_USERNAME', None), ('SESSION_ID', None), ('SCN', None),
+               ('RETURN_CODE', None), ('SQL_TEXT', None)]
+
+
+def audit_rows(start, count):
+    return [
+        (start + timedelta(minutes=i), ' bob ' if i % 3 else '  ', str(i), 100 + i,
+         0 if i % 2 else None, 'select 1 ')
+        for i in range(count)
+    ]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.description = DESCRIPTION
+
+    def execute(self, query, params):
+        self.pending = [r for r in self.rows if params['start_date'] <= r[0] <= params['end_date']]
+
+    def fetchmany(self, size):
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.rows)
+
+
+class FakePool:
+    max = 4
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def acquire(self):
+        return FakeConnection(self.rows)
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+        self.indexes = []
+
+    async def create_index(self, keys, **options):
+        self.indexes.append((keys, options))
+
+    async def insert_many(self, documents, ordered=True):
+        ids = []
+        for document in documents:
+            if document['_unique_id'] not in self.documents:
+                self.documents[document['_unique_id']] = document
+                ids.append(document['_unique_id'])
+        return type('InsertManyResult', (), {'inserted_ids': ids})()
+
+    async def find_one(self, query):
+        return self.documents.get(query['_id'])
+
+    async def update_one(self, query, update, upsert=False):
+        document = self.documents.setdefault(query['_id'], {'_id': query['_id']})
+        document.update(update.get('$set', {}))
+        for field, value in update.get('$max', {}).items():
+            if document.get(field) is None or value > document[field]:
+                document[field] = value
+
+    async def delete_many(self, query):
+        for key, document in list(self.documents.items()):
+            if (document.get('audit_type') == query['audit_type']
+                    and document['end'] <= query['end']['$lte']):
+                del self.documents[key]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+def make_extractor(rows, **config):
+    extractor = OracleAuditExtractor(dict(config, batch_size=7), 'mongodb://unused')
+    extractor.oracle_pool = FakePool(rows)
+    extractor.mongo_client = type('Client', (), {'auditdb': FakeDatabase()})()
+    return extractor
+
+
+@pytest.fixture(autouse=True)
+def untyped_columns(monkeypatch):
+    # Sans types Oracle: conversion générique, comme la normalisation d'origine
+    monkeypatch.setattr(extractor_module, 'oracledb', None)
+
+
+def test_normalize_batch_matches_row_by_row_normalization():
+    extractor = make_extractor([])
+    rows = audit_rows(datetime(2024, 1, 1), 50)
+    plan = extractor._document_plan(DESCRIPTION)
+    documents = extractor._normalize_batch(plan, rows, 'audit_trail')
+    keys = [name for name, _ in DESCRIPTION]
+    for row, document in zip(rows, documents):
+        assert document['_audit_type'] == 'audit_trail'
+        document = {k: v for k, v in document.items() if not k.startswith('_') or k == '_unique_id'}
+        assert document == reference_document(dict(zip(keys, row)))
+
+
+def test_typed_columns_match_row_by_row_normalization(monkeypatch):
+    oracledb = pytest.importorskip('oracledb')
+    monkeypatch.setattr(extractor_module, 'oracledb', oracledb)
+    extractor = make_extractor([])
+    description = [('TIMESTAMP', oracledb.DB_TYPE_DATE), ('OS_USERNAME', oracledb.DB_TYPE_VARCHAR),
+                   ('SESSION_ID', oracledb.DB_TYPE_VARCHAR), ('SCN', oracledb.DB_TYPE_NUMBER),
+                   ('RETURN_CODE', oracledb.DB_TYPE_NUMBER), ('SQL_TEXT', oracledb.DB_TYPE_CLOB)]
+    rows = audit_rows(datetime(2024, 1, 1), 50)
+    documents = extractor._normalize_batch(extractor._document_plan(description), rows, 'audit_trail')
+    keys = [name for name, _ in description]
+    for row, document in zip(rows, documents):
+        document = {k: v for k, v in document.items() if not k.startswith('_') or k == '_unique_id'}
+        assert document == reference_document(dict(zip(keys, row)))
+
+
+def test_time_slices_are_aligned_on_slice_hours():
+    extractor = make_extractor([], slice_hours=6)
+    slices = extractor._time_slices(datetime(2024, 1, 1, 4, 30), datetime(2024, 1, 2, 1))
+    assert slices == [
+        (datetime(2024, 1, 1, 4, 30), datetime(2024, 1, 1, 6)),
+        (datetime(2024, 1, 1, 6), datetime(2024, 1, 1, 12)),
+        (datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 18)),
+        (datetime(2024, 1, 1, 18), datetime(2024, 1, 2, 0)),
+        (datetime(2024, 1, 2, 0), datetime(2024, 1, 2, 1)),
+    ]
+    # Un autre début dans la même tranche donne les mêmes tranches complètes
+    assert extractor._time_slices(datetime(2024, 1, 1, 5), datetime(2024, 1, 2, 1))[1:] == slices[1:]
+
+
+@pytest.mark.asyncio
+async def test_incremental_extraction_advances_watermark():
+    start = datetime(2024, 1, 1)
+    rows = audit_rows(start, 30)
+    extractor = make_extractor(rows, watermark_overlap_seconds=0)
+    extractor.audit_queries = {'audit_trail': 'SELECT ...'}
+
+    stats = await extractor.extract_audit_data(start, start + timedelta(days=1), 'audit_trail', incremental=True)
+    assert stats == {'total_extracted': 30, 'errors': 0, 'audit_trail': 30}
+    watermark = await extractor.get_watermark('audit_trail')
+    assert watermark['timestamp'] == rows[-1][0]
+    assert watermark['scn'] == rows[-1][3]
+
+    # Le run suivant repart de la marque haute: seule la ligne en limite est relue (doublon)
+    stats = await extractor.extract_audit_data(start, start + timedelta(days=1), 'audit_trail', incremental=True)
+    assert stats['audit_trail'] == 0
+    assert len(extractor.mongo_client.auditdb['oracle_audit_trail'].documents) == 30
+
+
+@pytest.mark.asyncio
+async def test_parallel_extraction_checkpoints_complete_slices():
+    start = datetime(2024, 1, 1, 3)
+    rows = audit_rows(start, 600)
+    extractor = make_extractor(rows, parallelism=3, slice_hours=4, watermark_overlap_seconds=0)
+    extractor.audit_queries = {'audit_trail': 'SELECT ...'}
+    end = datetime(2024, 1, 1, 23)
+
+    stats = await extractor.extract_audit_data(start, end, 'audit_trail')
+    assert stats == {'total_extracted': 600, 'errors': 0, 'audit_trail': 600}
+    checkpoints = extractor.mongo_client.auditdb[CHECKPOINT_COLLECTION]
+    assert checkpoints.indexes[0][1]['expireAfterSeconds'] == 7 * 24 * 3600
+    # Tranches complètes seulement; celles sous la marque haute (12h59) sont effacées
+    assert sorted(checkpoints.documents) == [
+        'audit_trail:2024-01-01T12:00:00:2024-01-01T16:00:00',
+        'audit_trail:2024-01-01T16:00:00:2024-01-01T20:00:00',
+    ]
+
+    # Relance avec un autre début: les tranches déjà extraites sont sautées
+    extracted = []
+    extract_range = extractor._extract_range
+
+    async def recording(source, slice_start, slice_end):
+        extracted.append((slice_start, slice_end))
+        return await extract_range(source, slice_start, slice_end)
+
+    extractor._extract_range = recording
+    stats = await extractor.extract_audit_data(start + timedelta(minutes=30), end, 'audit_trail')
+    assert stats['errors'] == 0
+    assert (datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 16)) not in extracted
+    assert (datetime(2024, 1, 1, 4), datetime(2024, 1, 1, 8)) in extracted
+
+
+@pytest.mark.asyncio
+async def test_parallel_errors_are_reported_in_stats(monkeypatch):
+    extractor = make_extractor(audit_rows(datetime(2024, 1, 1), 10), parallelism=2)
+    extractor.audit_queries = {'audit_trail': 'SELECT ...'}
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("MongoDB indisponible")
+
+    monkeypatch.setattr(extractor, 'get_watermark', unavailable)
+    stats = await extractor.extract_audit_data(datetime(2024, 1, 1), datetime(2024, 1, 2), incremental=True)
+    assert stats == {'total_extracted': 0, 'errors': 1}
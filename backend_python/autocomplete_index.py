@@ -0,0 +1,164 @@
+"""Index d'autocomplétion en mémoire pour /api/chat/suggestions.
+
+Deux structures complémentaires, construites au démarrage depuis
+question_stats et les QUESTION_TEMPLATES puis mises à jour à chaque question:
+
+- un trie pondéré par fréquence: chaque nœud garde ses meilleures
+  complétions, une recherche par préfixe coûte O(longueur du préfixe);
+- un index inversé de trigrammes de caractères pour les correspondances
+  approximatives au milieu de la phrase (fautes de frappe, infixes).
+"""
+import ast
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Set
+from loguru import logger
+from database import db_manager
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_question_templates(path: Path) -> List[str]:
+    """Lire QUESTION_TEMPLATES du service LLM sans importer ses dépendances"""
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+    except (OSError, SyntaxError) as e:
+        logger.warning(f"Templates de questions indisponibles ({path}): {e}")
+        return []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "QUESTION_TEMPLATES" for target in node.targets
+        ):
+            templates = ast.literal_eval(node.value)
+            return [t["question"] for t in templates if isinstance(t, dict) and t.get("question")]
+    return []
+
+
+class _TrieNode:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.top: List[int] = []
+
+
+class AutocompleteIndex:
+    """Trie pondéré + index de trigrammes, mis à jour incrémentalement"""
+
+    def __init__(self, top_k: int = 10, min_trigram_score: float = 0.45):
+        self.top_k = top_k
+        self.min_trigram_score = min_trigram_score
+        self._lock = threading.RLock()
+        self._reset()
+        self.loaded = False
+
+    def _reset(self):
+        self._root = _TrieNode()
+        self._phrases: List[str] = []
+        self._display: List[str] = []
+        self._weights: List[int] = []
+        self._ids: Dict[str, int] = {}
+        self._trigram_postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._phrases)
+
+    async def load(self, templates_path: Optional[Path] = None):
+        """Construire l'index depuis question_stats et les templates"""
+        rows = await db_manager.fetch_sqlite_query_async(
+            "SELECT normalized_question, count FROM question_stats"
+        )
+        templates = load_question_templates(templates_path) if templates_path else []
+        with self._lock:
+            self._reset()
+            for question in templates:
+                self.add(question, weight=1)
+            for row in rows:
+                self.add(row["normalized_question"], weight=row["count"] or 1)
+            self.loaded = True
+        logger.info(f"Index d'autocomplétion construit: {len(self)} phrases ({len(templates)} templates)")
+
+    def add(self, text: str, weight: int = 1):
+        """Ajouter une phrase ou augmenter son poids"""
+        phrase = normalize_phrase(text)
+        if not phrase:
+            return
+        with self._lock:
+            phrase_id = self._ids.get(phrase)
+            if phrase_id is None:
+                phrase_id = len(self._phrases)
+                self._ids[phrase] = phrase_id
+                self._phrases.append(phrase)
+                self._display.append(text.strip())
+                self._weights.append(weight)
+                for gram in trigrams(phrase):
+                    self._trigram_postings.setdefault(gram, set()).add(phrase_id)
+            else:
+                self._weights[phrase_id] += weight
+            self._update_trie(phrase, phrase_id)
+
+    def _update_trie(self, phrase: str, phrase_id: int):
+        """Propager le poids de la phrase dans les top-k des nœuds de son chemin"""
+        node = self._root
+        self._offer(node, phrase_id)
+        for char in phrase:
+            node = node.children.setdefault(char, _TrieNode())
+            self._offer(node, phrase_id)
+
+    def _offer(self, node: _TrieNode, phrase_id: int):
+        weights = self._weights
+        top = node.top
+        if phrase_id not in top:
+            if len(top) >= self.top_k and weights[top[-1]] >= weights[phrase_id]:
+                return
+            top.append(phrase_id)
+        top.sort(key=lambda i: -weights[i])
+        del top[self.top_k:]
+
+    def _prefix_matches(self, prefix: str) -> List[int]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return list(node.top)
+
+    def _trigram_matches(self, text: str, exclude: Set[int]) -> List[int]:
+        grams = trigrams(text)
+        if not grams:
+            return []
+        hits: Dict[int, int] = {}
+        for gram in grams:
+            for phrase_id in self._trigram_postings.get(gram, ()):
+                hits[phrase_id] = hits.get(phrase_id, 0) + 1
+        threshold = self.min_trigram_score * len(grams)
+        candidates = [pid for pid, count in hits.items() if count >= threshold and pid not in exclude]
+        candidates.sort(key=lambda pid: (-hits[pid], -self._weights[pid]))
+        return candidates
+
+    def suggest(self, partial: str, limit: int = 5) -> List[str]:
+        """Complétions par préfixe, complétées par correspondances de trigrammes"""
+        text = normalize_phrase(partial)
+        with self._lock:
+            ids = self._prefix_matches(text)[:limit]
+            if len(ids) < limit and len(text) >= 3:
+                ids.extend(self._trigram_matches(text, set(ids))[:limit - len(ids)])
+            return [self._display[i] for i in ids]
+
+    def most_frequent(self, limit: int = 5) -> List[str]:
+        with self._lock:
+            return [self._display[i] for i in self._root.top[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"phrases": len(self._phrases), "trigrams": len(self._trigram_postings), "loaded": self.loaded}
+
+
+# Instance globale de l'index d'autocomplétion
+autocomplete_index = AutocompleteIndex()
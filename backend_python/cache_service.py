@@ -1,13 +1,152 @@
 """Services de cache et analyse des requêtes"""
 import json
+import time
+import asyncio
 import hashlib
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable
+from bson import ObjectId
+from config import settings
 from database import db_manager
+from write_behind import write_behind_queue
+from question_index import question_similarity_index
+from autocomplete_index import autocomplete_index
 from models import QueryCache, ActionCache, QuestionStats
 from loguru import logger
 
 
+class QueryMemoryCache:
+    """Cache LRU en mémoire (niveau 1) borné en taille et en durée de vie.
+
+    Sert les hits des requêtes fréquentes sans accès à SQLite. Chaque entrée
+    conserve le résultat décodé et son compteur de hits courant.
+    """
+    
+    def __init__(self, max_size: int = 512, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Retourner (résultat, hit_count) après incrément, ou None si absent/expiré"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result, hit_count = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            hit_count += 1
+            self._entries[key] = (stored_at, result, hit_count)
+            self._entries.move_to_end(key)
+            return result, hit_count
+    
+    def set(self, key: str, result: Dict[str, Any], hit_count: int = 1):
+        """Insérer ou remplacer une entrée (éviction LRU si plein)"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result, hit_count)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def discard_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """Supprimer les entrées dont le résultat satisfait le prédicat"""
+        with self._lock:
+            keys = [key for key, (_, result, _) in self._entries.items() if predicate(result)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class HitCounterBuffer:
+    """Accumule en mémoire les hits du cache pour les écrire par lots dans SQLite"""
+    
+    def __init__(self, flush_interval_seconds: int = 30):
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+    
+    def record(self, query_hash: str):
+        with self._lock:
+            count, _ = self._pending.get(query_hash, (0, ""))
+            self._pending[query_hash] = (count + 1, datetime.utcnow().isoformat())
+    
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+    
+    def flush_due(self) -> bool:
+        return bool(self._pending) and time.monotonic() - self._last_flush >= self.flush_interval_seconds
+    
+    def drain(self) -> List[Tuple[int, str, str]]:
+        """Vider le tampon et retourner les paramètres (delta, last_accessed, hash)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        return [(count, last_accessed, query_hash) for query_hash, (count, last_accessed) in pending.items()]
+    
+    async def _run(self):
+        """Boucle d'écriture périodique des hits (hors du chemin des requêtes)"""
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            await CacheService.flush_hit_counters(force=False)
+    
+    def start(self):
+        """Démarrer l'écriture périodique (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """Arrêter l'écriture périodique et écrire les hits restants"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await CacheService.flush_hit_counters()
+
+
+# Instances globales du cache mémoire et du tampon de hits
+query_memory_cache = QueryMemoryCache(
+    max_size=settings.query_cache_memory_size,
+    ttl_seconds=settings.query_cache_memory_ttl_seconds
+)
+hit_counter_buffer = HitCounterBuffer(flush_interval_seconds=settings.query_cache_hit_flush_seconds)
+semantic_memory_cache = QueryMemoryCache(
+    max_size=settings.semantic_cache_memory_size,
+    ttl_seconds=settings.semantic_cache_ttl_seconds
+)
+
+# Filtres temporels remplacés par la période relative dans la clé sémantique
+_WINDOW_FILTERS = ("date_start", "date_end")
+# Périodes dont la fin est fixe; les autres s'étendent jusqu'à maintenant
+_CLOSED_PERIODS = frozenset({"yesterday"})
+
+
+def _windows_overlap(window_start: Optional[str], window_end: Optional[str],
+                     start: Optional[str], end: Optional[str]) -> bool:
+    """Chevauchement de deux fenêtres ISO (None = non bornée)"""
+    return (window_start is None or end is None or end >= window_start) and \
+        (window_end is None or start is None or start <= window_end)
+
+
 class CacheService:
     """Service de gestion du cache"""
     
@@ -28,23 +167,35 @@ class CacheService:
         try:
             query_hash = CacheService.generate_query_hash(query)
             
-            # Rechercher dans SQLite
-            result = db_manager.fetch_sqlite_query(
+            # Niveau 1: cache mémoire, aucun accès SQLite
+            memory_hit = query_memory_cache.get(query_hash)
+            if memory_hit:
+                result, hit_count = memory_hit
+                hit_counter_buffer.record(query_hash)
+                return {
+                    "result": result,
+                    "hit_count": hit_count,
+                    "cached": True
+                }
+            
+            # Niveau 2: rechercher dans SQLite
+            result = await db_manager.fetch_sqlite_query_async(
                 "SELECT * FROM query_cache WHERE query_hash = ?",
                 (query_hash,)
             )
             
             if result:
                 row = result[0]
-                # Mettre à jour le compteur et la date d'accès
-                db_manager.execute_sqlite_query(
-                    "UPDATE query_cache SET hit_count = hit_count + 1, last_accessed = ? WHERE query_hash = ?",
-                    (datetime.utcnow().isoformat(), query_hash)
-                )
+                decoded = json.loads(row["result"])
+                hit_count = row["hit_count"] + 1
+                query_memory_cache.set(query_hash, decoded, hit_count)
+                
+                # Le compteur et la date d'accès sont écrits par lots (tâche de fond)
+                hit_counter_buffer.record(query_hash)
                 
                 return {
-                    "result": json.loads(row["result"]),
-                    "hit_count": row["hit_count"] + 1,
+                    "result": decoded,
+                    "hit_count": hit_count,
                     "cached": True
                 }
             
@@ -60,57 +211,213 @@ class CacheService:
         try:
             query_hash = CacheService.generate_query_hash(query)
             normalized_query = CacheService.normalize_query(query)
-            result_json = json.dumps(result, ensure_ascii=False)
-            
-            # Insérer ou mettre à jour dans SQLite
-            db_manager.execute_sqlite_query(
-                """INSERT OR REPLACE INTO query_cache 
-                   (query_hash, normalized_query, result, hit_count, created_at, last_accessed)
-                   VALUES (?, ?, ?, 1, ?, ?)""",
-                (query_hash, normalized_query, result_json, 
-                 datetime.utcnow().isoformat(), datetime.utcnow().isoformat())
-            )
+            # default=str: l'analyse NLP contient les bornes de période en datetime
+            result_json = json.dumps(result, ensure_ascii=False, default=str)
+            
+            # Écriture différée dans SQLite (le niveau mémoire sert déjà les hits)
+            write_behind_queue.enqueue_query_result(query_hash, normalized_query, result_json)
+            
+            # Le compteur de hits est conservé (UPSERT), y compris dans le cache mémoire
+            memory_hit = query_memory_cache.get(query_hash)
+            query_memory_cache.set(query_hash, result, memory_hit[1] if memory_hit else 1)
             
-            logger.info(f"Requête mise en cache: {query_hash}")
+            logger.info(f"Requête mise en cache (écriture différée): {query_hash}")
             
         except Exception as e:
             logger.error(f"Erreur lors de la mise en cache: {e}")
     
+    @staticmethod
+    def semantic_descriptor(analysis) -> Optional[Dict[str, Any]]:
+        """Forme canonique d'une analyse NLP pour le cache sémantique.
+        
+        La clé combine l'intention et les filtres suggérés normalisés; les
+        dates absolues sont remplacées par la période relative arrondie (à
+        l'heure pour « les N derniers ... », au jour sinon) afin que les
+        questions équivalentes posées dans la même tranche partagent la réponse.
+        Retourne None si l'analyse n'est pas assez précise pour être partagée.
+        """
+        if not settings.semantic_cache_enabled:
+            return None
+        if analysis.intent == "GENERAL" or analysis.confidence < settings.semantic_cache_min_confidence:
+            return None
+        
+        filters: Dict[str, Any] = {}
+        for key, value in analysis.suggested_filters.items():
+            if key in _WINDOW_FILTERS or value in (None, "", []):
+                continue
+            if isinstance(value, (list, tuple, set)):
+                filters[key] = sorted({str(v).strip().upper() for v in value})
+            elif key == "focus":
+                filters[key] = str(value).strip().lower()
+            else:
+                filters[key] = str(value).strip().upper()
+        
+        window_start = analysis.suggested_filters.get("date_start")
+        window_end = analysis.suggested_filters.get("date_end")
+        period = (analysis.entities.get("timeframe") or {}).get("period")
+        if period and window_start:
+            bucket = window_start[:13] if period.startswith("last_") else window_start[:10]
+            filters["timeframe"] = f"{period}@{bucket}"
+            if period not in _CLOSED_PERIODS:
+                window_end = None
+        elif window_start or window_end:
+            filters["timeframe"] = f"{window_start or ''}/{window_end or ''}"
+        
+        # Sans entité ni période, l'intention seule est trop vague pour partager une réponse
+        if not any(key != "focus" for key in filters):
+            return None
+        
+        filters_json = json.dumps(filters, sort_keys=True, ensure_ascii=False)
+        return {
+            "key": hashlib.md5(f"{analysis.intent}|{filters_json}".encode()).hexdigest(),
+            "intent": analysis.intent,
+            "filters": filters_json,
+            "window_start": window_start,
+            "window_end": window_end
+        }
+    
+    @staticmethod
+    async def get_semantic_answer(analysis) -> Optional[Dict[str, Any]]:
+        """Récupérer une réponse partagée par une question équivalente"""
+        try:
+            descriptor = CacheService.semantic_descriptor(analysis)
+            if not descriptor:
+                return None
+            
+            memory_hit = semantic_memory_cache.get(descriptor["key"])
+            if memory_hit:
+                return memory_hit[0]["result"]
+            
+            cutoff = datetime.utcnow() - timedelta(seconds=settings.semantic_cache_ttl_seconds)
+            rows = await db_manager.fetch_sqlite_query_async(
+                "SELECT result, window_start, window_end FROM semantic_cache WHERE semantic_key = ? AND created_at >= ?",
+                (descriptor["key"], cutoff.isoformat())
+            )
+            if not rows:
+                return None
+            
+            row = rows[0]
+            result = json.loads(row["result"])
+            semantic_memory_cache.set(descriptor["key"], {
+                "window_start": row["window_start"],
+                "window_end": row["window_end"],
+                "result": result
+            })
+            return result
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture du cache sémantique: {e}")
+            return None
+    
+    @staticmethod
+    async def cache_semantic_answer(analysis, result: Dict[str, Any]):
+        """Partager une réponse avec les questions équivalentes"""
+        try:
+            descriptor = CacheService.semantic_descriptor(analysis)
+            if not descriptor:
+                return
+            
+            write_behind_queue.enqueue_semantic_result(
+                descriptor["key"], descriptor["intent"], descriptor["filters"],
+                descriptor["window_start"], descriptor["window_end"],
+                json.dumps(result, ensure_ascii=False, default=str)
+            )
+            semantic_memory_cache.set(descriptor["key"], {
+                "window_start": descriptor["window_start"],
+                "window_end": descriptor["window_end"],
+                "result": result
+            })
+            logger.info(f"Réponse mise en cache sémantique: {descriptor['intent']} {descriptor['filters']}")
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise en cache sémantique: {e}")
+    
+    @staticmethod
+    async def invalidate_semantic_window(start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Invalider les réponses sémantiques dont la fenêtre couvre [start, end] (None = non borné)"""
+        try:
+            removed = semantic_memory_cache.discard_where(
+                lambda entry: _windows_overlap(entry["window_start"], entry["window_end"], start, end)
+            )
+            
+            # Les réponses encore en attente doivent être écrites avant d'être supprimées
+            await write_behind_queue.flush()
+            cursor = await db_manager.execute_sqlite_query_async(
+                """DELETE FROM semantic_cache
+                   WHERE (window_start IS NULL OR ? IS NULL OR window_start <= ?)
+                   AND (window_end IS NULL OR ? IS NULL OR window_end >= ?)""",
+                (end, end, start, start)
+            )
+            removed = max(removed, cursor.rowcount)
+            if removed:
+                logger.info(f"Cache sémantique invalidé pour la fenêtre {start} - {end}: {removed} réponses")
+            return removed
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de l'invalidation du cache sémantique: {e}")
+            return 0
+    
+    @staticmethod
+    async def flush_hit_counters(force: bool = True):
+        """Écrire dans query_cache les hits accumulés en mémoire (une transaction)"""
+        if not force and not hit_counter_buffer.flush_due():
+            return
+        if not hit_counter_buffer.pending:
+            return
+        try:
+            # Les lignes encore en attente d'écriture différée doivent exister avant l'UPDATE
+            await write_behind_queue.flush()
+            params = hit_counter_buffer.drain()
+            await db_manager.executemany_sqlite_query_async(
+                "UPDATE query_cache SET hit_count = hit_count + ?, last_accessed = ? WHERE query_hash = ?",
+                params
+            )
+            logger.debug(f"Compteurs de hits du cache écrits: {len(params)} requêtes")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture des compteurs de hits: {e}")
+    
     @staticmethod
     async def get_cache_stats() -> Dict[str, Any]:
         """Obtenir les statistiques du cache"""
         try:
-            # Statistiques générales
-            total_queries = db_manager.fetch_sqlite_query(
-                "SELECT COUNT(*) as count FROM query_cache"
-            )[0]["count"]
-            
-            total_hits = db_manager.fetch_sqlite_query(
-                "SELECT SUM(hit_count) as total FROM query_cache"
-            )[0]["total"] or 0
-            
-            # Top requêtes
-            top_queries = db_manager.fetch_sqlite_query(
-                """SELECT normalized_query, hit_count, last_accessed 
-                   FROM query_cache 
-                   ORDER BY hit_count DESC 
-                   LIMIT 10"""
-            )
+            await write_behind_queue.flush()
+            await CacheService.flush_hit_counters()
             
-            # Requêtes récentes
-            recent_queries = db_manager.fetch_sqlite_query(
-                """SELECT normalized_query, hit_count, last_accessed 
-                   FROM query_cache 
-                   ORDER BY last_accessed DESC 
-                   LIMIT 10"""
+            # Les lectures s'exécutent en parallèle sur le pool de lecteurs
+            totals, top_queries, recent_queries, semantic_totals = await asyncio.gather(
+                # Statistiques générales
+                db_manager.fetch_sqlite_query_async(
+                    "SELECT COUNT(*) as count, SUM(hit_count) as total FROM query_cache"
+                ),
+                # Top requêtes
+                db_manager.fetch_sqlite_query_async(
+                    """SELECT normalized_query, hit_count, last_accessed 
+                       FROM query_cache 
+                       ORDER BY hit_count DESC 
+                       LIMIT 10"""
+                ),
+                # Requêtes récentes
+                db_manager.fetch_sqlite_query_async(
+                    """SELECT normalized_query, hit_count, last_accessed 
+                       FROM query_cache 
+                       ORDER BY last_accessed DESC 
+                       LIMIT 10"""
+                ),
+                # Réponses partagées par le cache sémantique
+                db_manager.fetch_sqlite_query_async("SELECT COUNT(*) as count FROM semantic_cache")
             )
+            total_queries = totals[0]["count"]
+            total_hits = totals[0]["total"] or 0
             
             return {
                 "total_queries": total_queries,
                 "total_hits": total_hits,
                 "hit_rate": (total_hits / max(total_queries, 1)) * 100,
                 "top_queries": [dict(row) for row in top_queries],
-                "recent_queries": [dict(row) for row in recent_queries]
+                "recent_queries": [dict(row) for row in recent_queries],
+                "memory_entries": len(query_memory_cache),
+                "semantic_entries": semantic_totals[0]["count"],
+                "semantic_memory_entries": len(semantic_memory_cache)
             }
             
         except Exception as e:
@@ -122,11 +429,7 @@ class CacheService:
         """Mettre en cache une action"""
         try:
             metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
-            
-            db_manager.execute_sqlite_query(
-                "INSERT INTO action_cache (action_type, user_name, metadata) VALUES (?, ?, ?)",
-                (action_type, user, metadata_json)
-            )
+            write_behind_queue.enqueue_action(action_type, user, metadata_json)
             
         except Exception as e:
             logger.error(f"Erreur lors de la mise en cache de l'action: {e}")
@@ -135,6 +438,8 @@ class CacheService:
     async def get_action_stats(timeframe: str = "24h") -> Dict[str, Any]:
         """Obtenir les statistiques des actions"""
         try:
+            await write_behind_queue.flush()
+            
             # Calculer la date de début selon le timeframe
             if timeframe == "1h":
                 start_time = datetime.utcnow() - timedelta(hours=1)
@@ -145,32 +450,33 @@ class CacheService:
             else:
                 start_time = datetime.utcnow() - timedelta(days=1)
             
-            # Actions par type
-            actions_by_type = db_manager.fetch_sqlite_query(
-                """SELECT action_type, COUNT(*) as count 
-                   FROM action_cache 
-                   WHERE timestamp >= ? 
-                   GROUP BY action_type 
-                   ORDER BY count DESC""",
-                (start_time.isoformat(),)
-            )
-            
-            # Actions par utilisateur
-            actions_by_user = db_manager.fetch_sqlite_query(
-                """SELECT user_name, COUNT(*) as count 
-                   FROM action_cache 
-                   WHERE timestamp >= ? AND user_name IS NOT NULL
-                   GROUP BY user_name 
-                   ORDER BY count DESC 
-                   LIMIT 10""",
-                (start_time.isoformat(),)
+            actions_by_type, actions_by_user, total_actions = await asyncio.gather(
+                # Actions par type
+                db_manager.fetch_sqlite_query_async(
+                    """SELECT action_type, COUNT(*) as count 
+                       FROM action_cache 
+                       WHERE timestamp >= ? 
+                       GROUP BY action_type 
+                       ORDER BY count DESC""",
+                    (start_time.isoformat(),)
+                ),
+                # Actions par utilisateur
+                db_manager.fetch_sqlite_query_async(
+                    """SELECT user_name, COUNT(*) as count 
+                       FROM action_cache 
+                       WHERE timestamp >= ? AND user_name IS NOT NULL
+                       GROUP BY user_name 
+                       ORDER BY count DESC 
+                       LIMIT 10""",
+                    (start_time.isoformat(),)
+                ),
+                # Total des actions
+                db_manager.fetch_sqlite_query_async(
+                    "SELECT COUNT(*) as count FROM action_cache WHERE timestamp >= ?",
+                    (start_time.isoformat(),)
+                )
             )
-            
-            # Total des actions
-            total_actions = db_manager.fetch_sqlite_query(
-                "SELECT COUNT(*) as count FROM action_cache WHERE timestamp >= ?",
-                (start_time.isoformat(),)
-            )[0]["count"]
+            total_actions = total_actions[0]["count"]
             
             return {
                 "timeframe": timeframe,
@@ -189,14 +495,26 @@ class CacheService:
         try:
             cutoff_date = datetime.utcnow() - timedelta(days=max_age_days)
             
+            await write_behind_queue.flush()
+            await CacheService.flush_hit_counters()
+            query_memory_cache.clear()
+            semantic_memory_cache.clear()
+            
             # Nettoyer les requêtes anciennes
-            db_manager.execute_sqlite_query(
+            await db_manager.execute_sqlite_query_async(
                 "DELETE FROM query_cache WHERE created_at < ?",
                 (cutoff_date.isoformat(),)
             )
             
+            # Nettoyer les réponses sémantiques expirées
+            semantic_cutoff = datetime.utcnow() - timedelta(seconds=settings.semantic_cache_ttl_seconds)
+            await db_manager.execute_sqlite_query_async(
+                "DELETE FROM semantic_cache WHERE created_at < ?",
+                (semantic_cutoff.isoformat(),)
+            )
+            
             # Nettoyer les actions anciennes
-            db_manager.execute_sqlite_query(
+            await db_manager.execute_sqlite_query_async(
                 "DELETE FROM action_cache WHERE timestamp < ?",
                 (cutoff_date.isoformat(),)
             )
@@ -207,42 +525,99 @@ class CacheService:
             logger.error(f"Erreur lors du nettoyage du cache: {e}")
 
 
+class AuditDataWatcher:
+    """Détecte les nouvelles données d'audit dans MongoDB et invalide le cache sémantique.
+    
+    Les documents arrivés depuis le dernier passage sont repérés par leur
+    ObjectId (croissant à l'insertion); seules les réponses dont la fenêtre
+    temporelle chevauche celle des nouveaux événements sont invalidées.
+    """
+    
+    def __init__(self, interval_seconds: int = 60, collection_name: str = "actions_audit"):
+        self.interval_seconds = interval_seconds
+        self.collection_name = collection_name
+        self._last_id: Optional[ObjectId] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def _as_iso(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None).isoformat()
+        return str(value).replace(" ", "T")
+    
+    async def check(self) -> int:
+        """Invalider les réponses couvertes par les documents arrivés depuis le dernier passage"""
+        if db_manager.mongodb_db is None:
+            return 0
+        if self._last_id is None:
+            # Données insérées avant le démarrage: les réponses persistées peuvent les précéder
+            self._last_id = ObjectId.from_datetime(
+                datetime.utcnow() - timedelta(seconds=settings.semantic_cache_ttl_seconds)
+            )
+        
+        collection = db_manager.get_mongodb_collection(self.collection_name)
+        pipeline = [
+            {"$match": {"_id": {"$gt": self._last_id}}},
+            {"$group": {
+                "_id": None,
+                "last_id": {"$max": "$_id"},
+                "count": {"$sum": 1},
+                "min_ts": {"$min": "$event_timestamp"},
+                "max_ts": {"$max": "$event_timestamp"}
+            }}
+        ]
+        async for summary in collection.aggregate(pipeline):
+            self._last_id = summary["last_id"]
+            start, end = self._as_iso(summary.get("min_ts")), self._as_iso(summary.get("max_ts"))
+            logger.info(f"Nouvelles données d'audit: {summary['count']} documents ({start} - {end})")
+            if start is None or end is None:
+                # Fenêtre inconnue: tout invalider
+                start = end = None
+            return await CacheService.invalidate_semantic_window(start, end)
+        return 0
+    
+    async def _run(self):
+        """Boucle de détection périodique"""
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error(f"Erreur lors de la détection des nouvelles données d'audit: {e}")
+            await asyncio.sleep(self.interval_seconds)
+    
+    def start(self):
+        """Démarrer la détection périodique (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Instance globale du détecteur de nouvelles données d'audit
+audit_data_watcher = AuditDataWatcher(interval_seconds=settings.audit_watch_interval_seconds)
+
+
 class QuestionStatsService:
     """Service de gestion des statistiques de questions"""
     
     @staticmethod
     async def update_question_stats(question: str):
-        """Mettre à jour les statistiques d'une question"""
+        """Mettre à jour les statistiques d'une question (écriture différée)"""
         try:
             normalized = CacheService.normalize_query(question)
+            write_behind_queue.enqueue_question(normalized, question)
+            question_similarity_index.add(normalized)
+            autocomplete_index.add(normalized)
             
-            # Vérifier si la question existe déjà
-            existing = db_manager.fetch_sqlite_query(
-                "SELECT * FROM question_stats WHERE normalized_question = ?",
-                (normalized,)
-            )
-            
-            if existing:
-                # Mettre à jour le compteur
-                variations = json.loads(existing[0]["variations"] or "[]")
-                if question not in variations:
-                    variations.append(question)
-                
-                db_manager.execute_sqlite_query(
-                    """UPDATE question_stats 
-                       SET count = count + 1, last_asked = ?, variations = ?
-                       WHERE normalized_question = ?""",
-                    (datetime.utcnow().isoformat(), json.dumps(variations), normalized)
-                )
-            else:
-                # Créer une nouvelle entrée
-                db_manager.execute_sqlite_query(
-                    """INSERT INTO question_stats 
-                       (normalized_question, count, last_asked, variations)
-                       VALUES (?, 1, ?, ?)""",
-                    (normalized, datetime.utcnow().isoformat(), json.dumps([question]))
-                )
-                
         except Exception as e:
             logger.error(f"Erreur lors de la mise à jour des stats de question: {e}")
     
@@ -250,20 +625,37 @@ class QuestionStatsService:
     async def get_frequent_questions(limit: int = 10) -> List[Dict[str, Any]]:
         """Obtenir les questions les plus fréquentes"""
         try:
-            results = db_manager.fetch_sqlite_query(
-                """SELECT normalized_question, count, last_asked, variations
+            # Lecture servie par l'index couvrant idx_question_count
+            results = await db_manager.fetch_sqlite_query_async(
+                """SELECT normalized_question, count, last_asked
                    FROM question_stats 
                    ORDER BY count DESC 
                    LIMIT ?""",
                 (limit,)
             )
+            if not results:
+                return []
+            
+            # Variations via la clé primaire de question_variations
+            questions = [row["normalized_question"] for row in results]
+            placeholders = ",".join("?" for _ in questions)
+            variation_rows = await db_manager.fetch_sqlite_query_async(
+                f"""SELECT normalized_question, variation
+                    FROM question_variations
+                    WHERE normalized_question IN ({placeholders})
+                    ORDER BY normalized_question, count DESC""",
+                tuple(questions)
+            )
+            variations: Dict[str, List[str]] = {}
+            for row in variation_rows:
+                variations.setdefault(row["normalized_question"], []).append(row["variation"])
             
             return [
                 {
                     "question": row["normalized_question"],
                     "count": row["count"],
                     "last_asked": row["last_asked"],
-                    "variations": json.loads(row["variations"] or "[]")
+                    "variations": variations.get(row["normalized_question"], [])
                 }
                 for row in results
             ]
@@ -19,8 +19,36 @@ class Settings(BaseSettings):
     mongodb_uri: str = "mongodb://localhost:27017/auditdb"
     mongodb_db_name: str = "auditdb"
     sqlite_db_path: str = "./cache/chatbot_cache.db"
+    sqlite_reader_pool_size: int = 4
     redis_url: str = "redis://localhost:6379"
 
+    # Cache des requêtes (niveau mémoire devant SQLite)
+    query_cache_memory_size: int = 512
+    query_cache_memory_ttl_seconds: int = 300
+    query_cache_hit_flush_seconds: int = 30
+
+    # Cache sémantique des réponses (intention + filtres normalisés)
+    semantic_cache_enabled: bool = True
+    semantic_cache_ttl_seconds: int = 3600
+    semantic_cache_min_confidence: float = 0.25
+    semantic_cache_memory_size: int = 256
+    # Intervalle de détection des nouvelles données d'audit (invalidation)
+    audit_watch_interval_seconds: int = 60
+
+    # Threads dédiés aux calculs CPU du chatbot (analyse NLP, similarité)
+    chat_cpu_workers: int = 4
+
+    # Écriture différée (write-behind) des caches et statistiques
+    write_behind_max_batch_size: int = 200
+    write_behind_flush_seconds: float = 2.0
+
+    # Nombre maximal de variations conservées par question
+    question_variations_max: int = 20
+
+    # Fichier source des QUESTION_TEMPLATES pour l'autocomplétion
+    # (vide: backend/llm-prototype/audit_llm_service.py du dépôt)
+    question_templates_path: str = ""
+
     # Oracle DB (optionnel)
     oracle_host: str = ""
     oracle_port: int = 1521
@@ -28,9 +56,27 @@ class Settings(BaseSettings):
     oracle_username: str = ""
     oracle_password: str = ""
     oracle_driver_mode: str = "thin"  # "thin" par défaut, "thick" si Instant Client installé
+    # Pools Oracle par cible (host, port, service, user, mode): taille et éviction
+    oracle_pool_min_sessions: int = 1
+    oracle_pool_max_sessions: int = 10
+    oracle_pool_idle_timeout_seconds: int = 900
+    # Cache d'instructions du driver par connexion et paramétrage automatique des littéraux
+    oracle_statement_cache_size: int = 50
+    oracle_auto_parameterize: bool = False
+    # Curseurs de pagination (sessions retenues entre deux pages)
+    oracle_cursor_max_open: int = 20
+    oracle_cursor_idle_timeout_seconds: int = 300
+    oracle_cursor_max_page_size: int = 5000
+    # Cache des résultats des SELECT Oracle (0: désactivé sauf TTL demandé par requête)
+    oracle_result_cache_default_ttl_seconds: int = 0
+    oracle_result_cache_max_mb: int = 64
+    # Intervalle minimal entre deux exécutions d'une requête sonde d'invalidation
+    oracle_result_cache_probe_interval_seconds: float = 5.0
     
     # API Keys
     openai_api_key: str
+    # URL de base de l'API OpenAI (vide: API publique; ex. serveur LLM local de test)
+    openai_api_base: str = ""
     
     # Sécurité
     secret_key: str
@@ -0,0 +1,8 @@
+"""Configuration pytest: valeurs minimales pour charger config.Settings sans fichier .env"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+
+# test_chatbot.py est un script manuel (python test_chatbot.py) qui appelle le serveur en cours d'exécution
+collect_ignore = ["test_chatbot.py"]
@@ -1,7 +1,9 @@
 """Gestion des connexions aux bases de données"""
 import sqlite3
 import asyncio
-from typing import Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple, Callable, Any
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
 from loguru import logger
@@ -15,6 +17,14 @@ class DatabaseManager:
         self.mongodb_client: Optional[AsyncIOMotorClient] = None
         self.mongodb_db = None
         self.sqlite_conn: Optional[sqlite3.Connection] = None
+        # Accès SQLite asynchrone: un thread écrivain (connexion principale)
+        # et un pool de lecteurs en lecture seule (WAL)
+        self._sqlite_lock = threading.RLock()
+        self._sqlite_writer: Optional[ThreadPoolExecutor] = None
+        self._sqlite_readers: Optional[ThreadPoolExecutor] = None
+        self._reader_local = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._reader_conns_lock = threading.Lock()
     
     async def connect_mongodb(self):
         """Connexion à MongoDB"""
@@ -47,6 +57,12 @@ class DatabaseManager:
             
             # Création des tables
             self._create_sqlite_tables()
+            
+            self._sqlite_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            self._sqlite_readers = ThreadPoolExecutor(
+                max_workers=max(1, settings.sqlite_reader_pool_size),
+                thread_name_prefix="sqlite-reader"
+            )
             logger.info(f"Connecté à SQLite: {settings.sqlite_db_path}")
             return True
         except Exception as e:
@@ -70,6 +86,20 @@ class DatabaseManager:
             )
         ''')
         
+        # Cache sémantique: réponses partagées par les questions équivalentes
+        # (même intention, mêmes filtres normalisés, même fenêtre temporelle)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                semantic_key TEXT PRIMARY KEY,
+                intent TEXT NOT NULL,
+                filters TEXT NOT NULL,
+                window_start TEXT,
+                window_end TEXT,
+                result TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         # Table pour le cache des actions
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS action_cache (
@@ -92,27 +122,68 @@ class DatabaseManager:
             )
         ''')
         
+        # Variations de formulation des questions (bornées aux plus fréquentes)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_variations (
+                normalized_question TEXT NOT NULL,
+                variation TEXT NOT NULL,
+                count INTEGER DEFAULT 1,
+                last_seen DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (normalized_question, variation)
+            ) WITHOUT ROWID
+        ''')
+        self._migrate_question_variations(cursor)
+        
         # Index pour améliorer les performances
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_query_hash ON query_cache(query_hash)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_action_timestamp ON action_cache(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_semantic_window ON semantic_cache(window_start, window_end)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_normalized ON question_stats(normalized_question)')
+        # Index couvrant: la lecture des questions fréquentes ne touche pas la table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_question_count ON question_stats(count DESC, normalized_question, last_asked)')
         
         self.sqlite_conn.commit()
         logger.info("Tables SQLite créées avec succès")
     
+    def _migrate_question_variations(self, cursor):
+        """Déplacer les anciennes variations JSON de question_stats vers question_variations"""
+        try:
+            cursor.execute('''
+                INSERT OR IGNORE INTO question_variations (normalized_question, variation, count, last_seen)
+                SELECT q.normalized_question, v.value, 1, q.last_asked
+                FROM question_stats q, json_each(q.variations) v
+                WHERE q.variations IS NOT NULL AND json_valid(q.variations)
+            ''')
+            if cursor.rowcount > 0:
+                logger.info(f"Variations de questions migrées: {cursor.rowcount}")
+            cursor.execute('UPDATE question_stats SET variations = NULL WHERE variations IS NOT NULL')
+        except sqlite3.Error as e:
+            logger.warning(f"Migration des variations de questions ignorée: {e}")
+    
     async def close_connections(self):
         """Fermeture des connexions"""
         if self.mongodb_client:
             self.mongodb_client.close()
             logger.info("Connexion MongoDB fermée")
         
+        if self._sqlite_writer:
+            self._sqlite_writer.shutdown(wait=True)
+            self._sqlite_writer = None
+        if self._sqlite_readers:
+            self._sqlite_readers.shutdown(wait=True)
+            self._sqlite_readers = None
+        with self._reader_conns_lock:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+        
         if self.sqlite_conn:
             self.sqlite_conn.close()
             logger.info("Connexion SQLite fermée")
     
     def get_mongodb_collection(self, collection_name: str):
         """Récupérer une collection MongoDB"""
-        if not self.mongodb_db:
+        if self.mongodb_db is None:
             raise Exception("MongoDB non connecté")
         return self.mongodb_db[collection_name]
     
@@ -121,9 +192,38 @@ class DatabaseManager:
         if not self.sqlite_conn:
             raise Exception("SQLite non connecté")
         
-        cursor = self.sqlite_conn.cursor()
-        cursor.execute(query, params)
-        self.sqlite_conn.commit()
+        with self._sqlite_lock:
+            cursor = self.sqlite_conn.cursor()
+            cursor.execute(query, params)
+            self.sqlite_conn.commit()
+        return cursor
+    
+    def executemany_sqlite_query(self, query: str, params_seq: list):
+        """Exécuter une requête SQLite sur un lot de paramètres (une seule transaction)"""
+        if not self.sqlite_conn:
+            raise Exception("SQLite non connecté")
+        
+        with self._sqlite_lock:
+            cursor = self.sqlite_conn.cursor()
+            cursor.executemany(query, params_seq)
+            self.sqlite_conn.commit()
+        return cursor
+    
+    def execute_sqlite_batch(self, statements: List[Tuple[str, list]]):
+        """Exécuter plusieurs executemany dans une seule transaction (rollback si erreur)"""
+        if not self.sqlite_conn:
+            raise Exception("SQLite non connecté")
+        
+        with self._sqlite_lock:
+            cursor = self.sqlite_conn.cursor()
+            try:
+                for query, params_seq in statements:
+                    if params_seq:
+                        cursor.executemany(query, params_seq)
+                self.sqlite_conn.commit()
+            except Exception:
+                self.sqlite_conn.rollback()
+                raise
         return cursor
     
     def fetch_sqlite_query(self, query: str, params: tuple = ()):
@@ -131,9 +231,56 @@ class DatabaseManager:
         if not self.sqlite_conn:
             raise Exception("SQLite non connecté")
         
-        cursor = self.sqlite_conn.cursor()
+        with self._sqlite_lock:
+            cursor = self.sqlite_conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    # ---------------------------------------------------------------------
+    # Accès SQLite asynchrone (ne bloque pas la boucle d'événements)
+    # ---------------------------------------------------------------------
+    
+    def _get_reader_connection(self) -> sqlite3.Connection:
+        """Connexion en lecture seule propre au thread lecteur courant"""
+        conn = getattr(self._reader_local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                f"file:{settings.sqlite_db_path}?mode=ro",
+                uri=True,
+                check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            self._reader_local.conn = conn
+            with self._reader_conns_lock:
+                self._reader_conns.append(conn)
+        return conn
+    
+    def _fetch_from_reader(self, query: str, params: tuple):
+        cursor = self._get_reader_connection().cursor()
         cursor.execute(query, params)
         return cursor.fetchall()
+    
+    async def _run_on(self, executor: Optional[ThreadPoolExecutor], fn: Callable[..., Any], *args):
+        if not self.sqlite_conn or executor is None:
+            raise Exception("SQLite non connecté")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, fn, *args)
+    
+    async def execute_sqlite_query_async(self, query: str, params: tuple = ()):
+        """Exécuter une requête SQLite sur le thread écrivain"""
+        return await self._run_on(self._sqlite_writer, self.execute_sqlite_query, query, params)
+    
+    async def executemany_sqlite_query_async(self, query: str, params_seq: list):
+        """Exécuter une requête SQLite par lot sur le thread écrivain"""
+        return await self._run_on(self._sqlite_writer, self.executemany_sqlite_query, query, params_seq)
+    
+    async def execute_sqlite_batch_async(self, statements: List[Tuple[str, list]]):
+        """Exécuter une transaction de plusieurs lots sur le thread écrivain"""
+        return await self._run_on(self._sqlite_writer, self.execute_sqlite_batch, statements)
+    
+    async def fetch_sqlite_query_async(self, query: str, params: tuple = ()):
+        """Récupérer des données SQLite via le pool de lecteurs (lecture seule, WAL)"""
+        return await self._run_on(self._sqlite_readers, self._fetch_from_reader, query, params)
 
 
 # Instance globale du gestionnaire de base de données
@@ -4,7 +4,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi import Body
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from loguru import logger
@@ -19,7 +19,10 @@ from models import (
 ## Suppression des imports liés à l'authentification
 from openai_service import OpenAIService
 from nlp_service import NLPService, AuditAnalysisService
-from cache_service import CacheService, QuestionStatsService
+from cache_service import CacheService, QuestionStatsService, audit_data_watcher, hit_counter_buffer
+from write_behind import write_behind_queue
+from question_index import question_similarity_index
+from autocomplete_index import autocomplete_index
 import csv
 from pathlib import Path
 import asyncio
@@ -30,7 +33,10 @@ try:
 except Exception:
     oracledb = None  # fallback si non installé
 
-from oracle_pool import oracle_pool, OraclePoolConfig
+from oracle_pool import oracle_pool, oracle_pools, OraclePoolConfig, OraclePoolManager
+from oracle_result_cache import oracle_result_cache
+from oracle_metrics import oracle_metrics
+from oracle_cursors import oracle_cursors, CursorNotFoundError, CursorLimitError
 
 
 # Configuration des logs
@@ -61,6 +67,31 @@ async def lifespan(app: FastAPI):
     # Nettoyage périodique du cache
     await CacheService.cleanup_old_cache()
     
+    # Vidage périodique des écritures différées (cache, actions, stats) et des hits du cache
+    write_behind_queue.start()
+    hit_counter_buffer.start()
+    
+    # Invalidation du cache sémantique à l'arrivée de nouvelles données d'audit
+    if mongodb_connected and sqlite_connected:
+        audit_data_watcher.start()
+    
+    # Index de similarité des questions (construit une fois, mis à jour ensuite)
+    if sqlite_connected:
+        try:
+            await question_similarity_index.load()
+        except Exception as e:
+            logger.error(f"Impossible de construire l'index de similarité: {e}")
+        
+        # Index d'autocomplétion (trie + trigrammes) pour /api/chat/suggestions
+        templates_path = (
+            Path(settings.question_templates_path) if settings.question_templates_path
+            else Path(__file__).resolve().parents[1] / "backend" / "llm-prototype" / "audit_llm_service.py"
+        )
+        try:
+            await autocomplete_index.load(templates_path)
+        except Exception as e:
+            logger.error(f"Impossible de construire l'index d'autocomplétion: {e}")
+    
     # Initialisation optionnelle du pool Oracle si les paramètres sont présents
     try:
         if settings.oracle_host and settings.oracle_username and settings.oracle_password and settings.oracle_service_name and oracle_pool.is_available:
@@ -71,13 +102,16 @@ async def lifespan(app: FastAPI):
                 username=settings.oracle_username,
                 password=settings.oracle_password,
                 driver_mode=settings.oracle_driver_mode,
-                min_sessions=1,
-                max_sessions=10,
+                min_sessions=settings.oracle_pool_min_sessions,
+                max_sessions=settings.oracle_pool_max_sessions,
                 increment=1,
                 connection_timeout_seconds=30,
+                statement_cache_size=settings.oracle_statement_cache_size,
             )
             initialized = oracle_pool.init_pool(pool_config)
             if initialized:
+                # Pool de démarrage enregistré (épinglé) dans le registre des pools
+                oracle_pools.adopt(oracle_pool)
                 logger.info("Pool Oracle initialisé au démarrage de l'application")
             else:
                 logger.warning("Pool Oracle non initialisé (paramètres présents mais connexion échouée)")
@@ -85,12 +119,21 @@ async def lifespan(app: FastAPI):
             logger.info("Paramètres Oracle non fournis ou module indisponible, pool non initialisé")
     except Exception as e:
         logger.warning(f"Échec d'initialisation du pool Oracle au démarrage: {e}")
+    oracle_pools.start()
+    oracle_cursors.start()
     
     yield
     
     # Arrêt
     logger.info("Arrêt de l'application")
+    await audit_data_watcher.stop()
+    await oracle_cursors.stop()
+    await oracle_pools.stop()
+    await openai_service.wait_background_tasks()
+    await write_behind_queue.stop()
+    await hit_counter_buffer.stop()
     await db_manager.close_connections()
+    await asyncio.to_thread(oracle_pools.close_all)
 
 
 # Création de l'application FastAPI
@@ -111,19 +154,17 @@ async def oracle_config_save(config: Dict[str, Any]):
     required = ["host", "port", "serviceName", "username", "password", "driverMode"]
     if not all(k in config and config[k] for k in required):
         return JSONResponse(status_code=400, content={"success": False, "error": "Paramètres manquants"})
-    # Sauvegarde en mémoire
-    _oracle_runtime_config.update(config)
     try:
-        pool_config = OraclePoolConfig(
-            host=config["host"],
-            port=int(config["port"]),
-            service_name=config["serviceName"],
-            username=config["username"],
-            password=config["password"],
-            driver_mode=config.get("driverMode", "thin"),
+        pool_config = _oracle_pool_config(
+            config["host"], int(config["port"]), config["serviceName"],
+            config["username"], config["password"], config.get("driverMode", "thin"),
+            config.get("minSessions"), config.get("maxSessions"),
         )
-        ok = oracle_pool.init_pool(pool_config)
-        return {"success": ok, "message": "Pool initialisé" if ok else "Pool non initialisé"}
+        # Pool de la cible créé ou réutilisé; la configuration devient la cible par défaut
+        await asyncio.to_thread(oracle_pools.get, pool_config)
+        _oracle_runtime_config.update(config)
+        return {"success": True, "message": "Pool initialisé",
+                "pool": oracle_pools.pool_name(oracle_pools.key_for(pool_config))}
     except Exception as e:
         logger.error(f"Erreur init pool depuis config: {e}")
         return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
@@ -131,7 +172,35 @@ async def oracle_config_save(config: Dict[str, Any]):
 
 @app.get("/api/oracle/config/get")
 async def oracle_config_get():
-    return {"success": True, "config": _oracle_runtime_config, "pool": oracle_pool.stats()}
+    return {"success": True, "config": _oracle_runtime_config, "pool": oracle_pool.stats(), "pools": oracle_pools.stats()}
+
+
+def _oracle_pool_config(host: str | None = None, port: int | None = None, service_name: str | None = None,
+                        username: str | None = None, password: str | None = None,
+                        driver_mode: str | None = None, min_sessions: int | None = None,
+                        max_sessions: int | None = None) -> OraclePoolConfig:
+    """Cible Oracle d'une requête: paramètres fournis, sinon configuration sauvegardée, sinon settings"""
+    saved = _oracle_runtime_config
+    host = host or saved.get("host") or settings.oracle_host
+    port = port or saved.get("port") or settings.oracle_port
+    service_name = service_name or saved.get("serviceName") or settings.oracle_service_name
+    username = username or saved.get("username") or settings.oracle_username
+    password = password or saved.get("password") or settings.oracle_password
+    driver_mode = driver_mode or saved.get("driverMode") or settings.oracle_driver_mode
+
+    if not (host and port and service_name and username and password):
+        raise ValueError("Paramètres de connexion Oracle incomplets")
+    return OraclePoolConfig(
+        host=host,
+        port=int(port),
+        service_name=service_name,
+        username=username,
+        password=password,
+        driver_mode=driver_mode,
+        min_sessions=int(min_sessions or settings.oracle_pool_min_sessions),
+        max_sessions=int(max_sessions or settings.oracle_pool_max_sessions),
+        statement_cache_size=settings.oracle_statement_cache_size,
+    )
 
 
 # Configuration CORS
@@ -200,6 +269,38 @@ async def chatbot_endpoint(request: Dict[str, Any]):
         }
 
 
+def _chat_event_stream(question: str) -> StreamingResponse:
+    """Réponse Server-Sent Events: analyse, tableau de données, jetons puis fin"""
+    async def event_generator():
+        async for event, data in openai_service.stream_chat_message(question, None):
+            payload = json.dumps(data, ensure_ascii=False, default=str)
+            yield f"event: {event}\ndata: {payload}\n\n"
+
+    headers = {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "Connection": "keep-alive",
+        "X-Accel-Buffering": "no"
+    }
+    return StreamingResponse(event_generator(), headers=headers)
+
+
+@app.post("/api/chat/stream")
+async def stream_chat_message(message: ChatMessage):
+    """Envoyer un message au chatbot, réponse transmise en flux (SSE)"""
+    logger.info(f"Message en flux: {message.message[:50]}...")
+    return _chat_event_stream(message.message)
+
+
+@app.post("/api/chatbot/stream")
+async def chatbot_stream_endpoint(request: Dict[str, Any]):
+    """Endpoint chatbot du frontend en flux (SSE)"""
+    question = request.get("question", "")
+    if not question:
+        return {"type": "error", "data": "Question vide", "summary": "Erreur: aucune question fournie"}
+    return _chat_event_stream(question)
+
+
 @app.get("/api/chat/suggestions")
 async def get_chat_suggestions(partial_message: str):
     """Obtenir des suggestions de complétion pour un message"""
@@ -351,42 +452,47 @@ async def oracle_test_connection(
     password: str = Body(...),
     driver_mode: str = Body("thin")  # thin par défaut; thick si Instant Client installé
 ):
-    """Teste une connexion Oracle simple (SELECT 1 FROM dual)."""
+    """Teste une connexion Oracle simple (SELECT 1 FROM dual) via le pool de la cible.
+
+    Le pool est créé au besoin puis conservé pour les requêtes suivantes sur
+    la même cible; il est retiré du registre si le test échoue.
+    """
     if oracledb is None:
         return JSONResponse(status_code=500, content={
             "success": False,
             "error": "Le module oracledb n'est pas installé. Faites: pip install oracledb"
         })
 
-    try:
-        if driver_mode == "thick":
-            try:
-                oracledb.init_oracle_client()  # s'il est déjà initialisé, ignore
-            except Exception:
-                pass
+    pool_config = OraclePoolConfig(
+        host=host,
+        port=port,
+        service_name=service_name,
+        username=username,
+        password=password,
+        driver_mode=driver_mode,
+        min_sessions=settings.oracle_pool_min_sessions,
+        max_sessions=settings.oracle_pool_max_sessions,
+        statement_cache_size=settings.oracle_statement_cache_size,
+    )
 
-        dsn = f"(description=(address=(protocol=TCP)(host={host})(port={port}))(connect_data=(service_name={service_name})))"
-        with oracledb.connect(user=username, password=password, dsn=dsn) as connection:
+    def ping(manager) -> bool:
+        with manager.acquire() as connection:
             with connection.cursor() as cursor:
                 cursor.execute("select 1 from dual")
                 row = cursor.fetchone()
-                ok = bool(row and row[0] == 1)
-        # Pré-initialiser le pool pour cette connexion (optionnel)
-        try:
-            pool_config = OraclePoolConfig(
-                host=host,
-                port=port,
-                service_name=service_name,
-                username=username,
-                password=password,
-                driver_mode=driver_mode,
-            )
-            oracle_pool.init_pool(pool_config)
-        except Exception:
-            pass
-        return {"success": ok, "message": "Connexion Oracle OK" if ok else "Échec de la requête test"}
+                return bool(row and row[0] == 1)
+
+    try:
+        manager = await asyncio.to_thread(oracle_pools.get, pool_config)
+        ok = await asyncio.to_thread(ping, manager)
+        return {
+            "success": ok,
+            "message": "Connexion Oracle OK" if ok else "Échec de la requête test",
+            "pool": oracle_pools.pool_name(oracle_pools.key_for(pool_config))
+        }
     except Exception as e:
         logger.error(f"Oracle test connection error: {e}")
+        oracle_pools.discard(pool_config)
         return JSONResponse(status_code=500, content={"success": False, "error": str(e)})
 
 
@@ -422,6 +528,66 @@ async def oracle_awr_snapshots(limit: int = 100):
         raise HTTPException(status_code=500, detail="Impossible de lire le CSV AWR")
 
 
+def _oracle_stream_response(pool: OraclePoolManager, query: str, max_rows: int, batch_size: int,
+                            stream_format: str, binds: Any = None,
+                            auto_parameterize: bool | None = None) -> StreamingResponse:
+    """Réponse fragmentée d'un SELECT Oracle: colonnes une fois, puis les lignes par lots.
+
+    La requête est validée ici (exception avant toute réponse); seule la
+    lecture se fait pendant l'envoi.
+    """
+    events = pool.stream_select(
+        query, max_rows=max_rows, batch_size=batch_size, binds=binds, auto_parameterize=auto_parameterize
+    )
+
+    async def ndjson_generator():
+        async for event, payload in events:
+            if event == "columns":
+                line = {"type": "columns", "columns": payload}
+            elif event == "rows":
+                line = {"type": "rows", "rows": payload}
+            elif event == "end":
+                line = {"type": "end", **payload}
+            else:
+                line = {"type": "error", "message": payload}
+            yield json.dumps(line, default=str) + "\n"
+
+    async def counted(chunks):
+        # Octets réellement transmis, enregistrés même si le client se déconnecte
+        total = 0
+        try:
+            async for chunk in chunks:
+                data = chunk.encode("utf-8")
+                total += len(data)
+                yield data
+        finally:
+            oracle_metrics.record_bytes(pool.name, f"stream-{stream_format}", total)
+
+    async def json_array_generator():
+        opened = False
+        first_batch = True
+        async for event, payload in events:
+            if event == "columns":
+                opened = True
+                yield '{"status": "success", "columns": ' + json.dumps(payload) + ', "data": ['
+            elif event == "rows":
+                chunk = ",".join(json.dumps(row, default=str) for row in payload)
+                if chunk:
+                    yield chunk if first_batch else "," + chunk
+                    first_batch = False
+            elif event == "end":
+                yield '], "rowCount": ' + str(payload["rowCount"]) + ', "timings": ' + json.dumps(payload["timings"]) + '}'
+            elif opened:
+                # Erreur en cours de lecture: clore le document avec le message
+                yield '], "error": ' + json.dumps(payload) + '}'
+            else:
+                yield json.dumps({"status": "error", "message": payload})
+
+    if stream_format == "json":
+        return StreamingResponse(counted(json_array_generator()), media_type="application/json")
+    return StreamingResponse(counted(ndjson_generator()), media_type="application/x-ndjson")
+
+
 @app.post("/api/oracle/execute-sql")
 async def oracle_execute_sql(
     query: str = Body(..., embed=True),
@@ -430,13 +596,34 @@ async def oracle_execute_sql(
     service_name: str | None = Body(None),
     username: str | None = Body(None),
     password: str | None = Body(None),
-    driver_mode: str = Body("thin"),
+    driver_mode: str | None = Body(None),
     max_rows: int = Body(1000),
     timeout_seconds: int = Body(30),
+    stream: bool = Body(False),
+    stream_format: str = Body("ndjson"),
+    batch_size: int = Body(1000),
+    result_format: str = Body("rows"),
+    binds: Dict[str, Any] | List[Any] | None = Body(None),
+    cache_ttl_seconds: float | None = Body(None),
+    cache_probe: str | None = Body(None),
+    auto_parameterize: bool | None = Body(None),
 ):
     """Exécute une requête SQL Oracle de lecture (SELECT) et retourne les lignes.
 
-    Si les paramètres de connexion ne sont pas fournis, utilise ceux de la configuration.
+    Si les paramètres de connexion ne sont pas fournis, utilise la configuration
+    sauvegardée (/api/oracle/config/save) puis celle des settings; chaque cible a
+    son propre pool, créé au premier usage et réutilisé ensuite.
+    Avec stream=true, les lignes sont transmises par lots de batch_size (mémoire
+    bornée par le lot), en NDJSON (stream_format="ndjson") ou en tableau JSON
+    fragmenté (stream_format="json"); max_rows <= 0 lit tout le résultat.
+    result_format="columnar" renvoie les colonnes une fois (nom, type, valeurs
+    en tableau); "arrow" renvoie un flux Arrow IPC (pyarrow requis).
+    binds: valeurs des variables de liaison. cache_ttl_seconds active le cache
+    de résultats pour cette requête (0: désactivé); cache_probe est une requête
+    sonde peu coûteuse (ex. SELECT MAX(ORA_ROWSCN) FROM t) dont le changement
+    invalide le résultat en cache. Le mode stream n'utilise pas le cache.
+    auto_parameterize remplace les littéraux du SELECT par des binds (défaut:
+    ORACLE_AUTO_PARAMETERIZE) pour partager les curseurs entre variantes.
     """
     if oracledb is None:
         return JSONResponse(status_code=500, content={
@@ -445,18 +632,12 @@ async def oracle_execute_sql(
         })
 
     try:
-        # Paramètres par défaut depuis settings
-        host = host or settings.oracle_host
-        port = port or settings.oracle_port
-        service_name = service_name or settings.oracle_service_name
-        username = username or settings.oracle_username
-        password = password or settings.oracle_password
-        driver_mode = driver_mode or settings.oracle_driver_mode
-
-        if not (host and port and service_name and username and password):
+        try:
+            pool_config = _oracle_pool_config(host, port, service_name, username, password, driver_mode)
+        except ValueError as e:
             return JSONResponse(status_code=400, content={
                 "status": "error",
-                "message": "Paramètres de connexion Oracle incomplets"
+                "message": str(e)
             })
 
         # Sécurité simple: empêcher les DML/DDL non désirées via cet endpoint
@@ -467,26 +648,46 @@ async def oracle_execute_sql(
                 "message": "Seules les requêtes SELECT sont autorisées via cet endpoint"
             })
 
-        # Utiliser le pool si initialisé, sinon tentative d'initialisation ad-hoc
-        if not oracle_pool.is_initialized:
-            pool_config = OraclePoolConfig(
-                host=host,
-                port=port,
-                service_name=service_name,
-                username=username,
-                password=password,
-                driver_mode=driver_mode,
-            )
-            oracle_pool.init_pool(pool_config)
+        # Pool de la cible (créé au premier usage, réutilisé ensuite)
+        pool = await asyncio.to_thread(oracle_pools.get, pool_config)
 
-        column_names, data = oracle_pool.execute_select(query, max_rows=max_rows)
+        if stream:
+            return _oracle_stream_response(pool, query, max_rows, batch_size, stream_format, binds, auto_parameterize)
 
-        return {
-            "status": "success",
-            "data": data,
-            "columns": column_names,
-            "rowCount": len(data)
-        }
+        # Exécution hors de la boucle d'événements (pool de threads borné à max_sessions)
+        column_names, data, timings = await pool.execute_select_async(
+            query, max_rows=max_rows, result_format=result_format,
+            binds=binds, cache_ttl_seconds=cache_ttl_seconds, cache_probe=cache_probe,
+            auto_parameterize=auto_parameterize
+        )
+
+        if result_format == "arrow":
+            oracle_metrics.record_bytes(pool.name, result_format, len(data))
+            return Response(
+                content=data,
+                media_type="application/vnd.apache.arrow.stream",
+                headers={"X-Oracle-Timings": json.dumps(timings)}
+            )
+        if result_format == "columnar":
+            payload = {
+                "status": "success",
+                "format": "columnar",
+                "columns": data["columns"],
+                "rowCount": data["rowCount"],
+                "timings": timings
+            }
+        else:
+            payload = {
+                "status": "success",
+                "data": data,
+                "columns": column_names,
+                "rowCount": len(data),
+                "timings": timings
+            }
+        # Sérialisation explicite pour mesurer la taille de la réponse
+        body = json.dumps(payload, default=str).encode("utf-8")
+        oracle_metrics.record_bytes(pool.name, result_format, len(body))
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logger.error(f"Oracle execute SQL error: {e}")
         return JSONResponse(status_code=500, content={
@@ -496,9 +697,89 @@ async def oracle_execute_sql(
 
 
 # =========================================================================
-# ORACLE: Statut du pool et SSE pour métriques simples
+# ORACLE: Pagination par curseur (jeton) ou par clé (keyset)
+# =========================================================================
+
+@app.post("/api/oracle/cursors")
+async def oracle_cursor_open(
+    query: str = Body(..., embed=True),
+    host: str | None = Body(None),
+    port: int | None = Body(None),
+    service_name: str | None = Body(None),
+    username: str | None = Body(None),
+    password: str | None = Body(None),
+    driver_mode: str | None = Body(None),
+    page_size: int = Body(500),
+    mode: str = Body("cursor"),
+    key_columns: List[str] | None = Body(None),
+    descending: bool = Body(False),
+    result_format: str = Body("rows"),
+    binds: Dict[str, Any] | List[Any] | None = Body(None),
+    auto_parameterize: bool | None = Body(None),
+):
+    """Ouvre une pagination: exécute le SELECT une fois et retourne la première page.
+
+    mode="cursor": le curseur reste ouvert sur une session du pool, les pages
+    suivantes (POST /api/oracle/cursors/{cursor}/next) reprennent où la
+    précédente s'est arrêtée. Les curseurs inactifs sont fermés après
+    ORACLE_CURSOR_IDLE_TIMEOUT_SECONDS; leur nombre est plafonné.
+    mode="keyset": aucune session retenue, chaque page filtre après la dernière
+    valeur de key_columns (colonnes non nulles formant un ordre total).
+    Le champ cursor vaut null quand il n'y a plus de page.
+    """
+    try:
+        pool_config = _oracle_pool_config(host, port, service_name, username, password, driver_mode)
+        pool = await asyncio.to_thread(oracle_pools.get, pool_config)
+        page = await oracle_cursors.open(
+            pool, query, page_size=page_size, mode=mode, binds=binds, result_format=result_format,
+            key_columns=key_columns, descending=descending, auto_parameterize=auto_parameterize,
+        )
+        return {"status": "success", **page}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    except CursorLimitError as e:
+        return JSONResponse(status_code=429, content={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"Oracle cursor open error: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+
+@app.post("/api/oracle/cursors/{token}/next")
+async def oracle_cursor_next(token: str):
+    """Page suivante d'une pagination ouverte (sans ré-exécuter la requête en mode cursor)"""
+    try:
+        return {"status": "success", **await oracle_cursors.next_page(token)}
+    except CursorNotFoundError:
+        return JSONResponse(status_code=404, content={
+            "status": "error",
+            "message": "Curseur inconnu, expiré ou terminé"
+        })
+    except Exception as e:
+        logger.error(f"Oracle cursor next error: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+
+@app.delete("/api/oracle/cursors/{token}")
+async def oracle_cursor_close(token: str):
+    """Ferme une pagination et rend sa session au pool"""
+    return {"success": await oracle_cursors.close(token)}
+
+
+@app.get("/api/oracle/cursors")
+async def oracle_cursors_status():
+    return oracle_cursors.stats()
+
+
+# =========================================================================
+# ORACLE: Statut du pool, télémétrie et SSE des métriques
 # =========================================================================
 
+@app.post("/api/oracle/result-cache/clear")
+async def oracle_result_cache_clear():
+    """Vider le cache des résultats Oracle (ex. après un chargement de données)"""
+    return {"success": True, "removed": oracle_result_cache.invalidate()}
+
+
 @app.get("/api/oracle/pool-status")
 async def oracle_pool_status():
     try:
@@ -507,13 +788,35 @@ async def oracle_pool_status():
         return {"initialized": False, "available": False, "error": str(e)}
 
 
+@app.get("/api/oracle/pools")
+async def oracle_pools_status():
+    """Pools Oracle du registre (un par cible), avec leur inactivité"""
+    return {"pools": oracle_pools.stats(), "idle_timeout_seconds": oracle_pools.idle_timeout_seconds}
+
+
+@app.get("/api/oracle/metrics")
+async def oracle_metrics_scrape(format: str = "prometheus"):
+    """Télémétrie Oracle: attentes (file, acquisition), durées par empreinte de requête,
+    retries, erreurs, lignes lues et octets sérialisés. Format Prometheus par défaut,
+    format=json pour le JSON."""
+    pools = oracle_pools.stats()
+    if format == "json":
+        return {"pools": pools, "metrics": oracle_metrics.snapshot()}
+    return Response(content=oracle_metrics.prometheus(pools), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/oracle/metrics/stream")
 async def oracle_metrics_stream():
+    """Flux SSE: statut du pool toutes les 2s et séries de télémétrie modifiées depuis
+    l'événement précédent (toutes les séries au premier événement)"""
     async def event_generator():
+        seq = 0
         while True:
             stats = oracle_pool.stats()
+            delta = oracle_metrics.snapshot(since=seq)
+            seq = delta["seq"]
             try:
-                payload = json.dumps(stats)
+                payload = json.dumps({**stats, "pools": oracle_pools.stats(), "metrics": delta}, default=str)
             except Exception:
                 payload = "{}"
             yield f"data: {payload}\n\n"
@@ -551,7 +854,7 @@ async def get_app_info():
         "version": settings.app_version,
         "description": "Backend Python pour l'application d'audit SIO",
         "endpoints": {
-            "chat": ["/api/chat/message", "/api/chat/suggestions", "/api/chat/frequent-questions"],
+            "chat": ["/api/chat/message", "/api/chat/stream", "/api/chat/suggestions", "/api/chat/frequent-questions"],
             "audit": ["/api/audit/analyze", "/api/audit/user-activity", "/api/audit/anomalies", "/api/audit/search"],
             "cache": ["/api/cache/stats", "/api/cache/actions", "/api/cache/cleanup"],
             "system": ["/api/health", "/api/info"]
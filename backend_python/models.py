@@ -122,6 +122,8 @@ class ChatResponse(BaseModel):
     analysis: Optional[Dict[str, Any]] = None
     suggestions: Optional[List[str]] = None
     cached: bool = False
+    # Durées des étapes du traitement en ms (cache, NLP, audit, génération, total)
+    timings: Optional[Dict[str, float]] = None
 
 
 # Modèles d'analyse
@@ -4,20 +4,257 @@ import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple
 from textblob import TextBlob
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from loguru import logger
 from models import QueryAnalysis, AuditQuery
 from database import db_manager
+from question_index import question_similarity_index
 
 
+# Patterns d'entités par famille. Dans chaque famille, le premier pattern qui
+# trouve une correspondance l'emporte (ordre de priorité).
+ENTITY_PATTERNS: Dict[str, List[str]] = {
+    "user": [
+        r"utilisateur(?:\s+(?:os|db))?\s+([A-Za-z0-9_-]+)",
+        r"user\s+([A-Za-z0-9_-]+)",
+        r"(?:je suis|je m'appelle)\s+([A-Za-zÀ-ÿ-]+)",
+    ],
+    "object_name": [
+        r"(?:table|objet)\s+([A-Za-z0-9_-]+)",
+        r"(?:sur|dans)\s+([A-Za-z0-9_-]+)",
+        r"(?:CREATE|DROP|ALTER)\s+(?:TABLE\s+)?([A-Za-z0-9_-]+)",
+    ],
+    "schema": [r"schéma\s+([A-Za-z0-9_-]+)"],
+    "program": [r"(SQL Developer|Toad|DBeaver|PL\/SQL Developer|SSMS)"],
+    "client_host": [r"(?:poste|host)\s+([A-Za-z0-9_-]+)"],
+    # Période: aujourd'hui > hier > cette semaine > ce mois
+    "period": [r"aujourd'hui", r"hier", r"cette semaine", r"ce mois"],
+    "duration": [r"(?:pendant|durant|dernières?)\s+(\d+)\s+(heures?|jours?|semaines?|mois)"],
+    "dates": [
+        r"(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})",
+        r"(aujourd'hui|hier)",
+        r"(cette semaine|ce mois|cette année)",
+        r"(pendant|durant)\s+(\d+)\s+(heures?|jours?|semaines?|mois)",
+    ],
+    "actions": [r"\b(SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER)\b"],
+}
+
+PERIOD_NAMES = ["today", "yesterday", "this_week", "this_month"]
+
+_REGEX_META = set(".^$*+?{}[]\\|()")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """Préfixe littéral obligatoire d'un pattern (vide si aucun)"""
+    literal = []
+    for char in pattern:
+        if char in _REGEX_META:
+            # Un quantificateur rend le caractère précédent optionnel
+            if char in "?*{" and literal:
+                literal.pop()
+            break
+        literal.append(char)
+    return "".join(literal)
+
+
+def literal_gate(pattern: str) -> Optional[frozenset]:
+    """Mots-clés dont l'un au moins doit apparaître pour que le pattern puisse correspondre.
+
+    Retourne None si aucun mot-clé fiable ne peut être déduit: le pattern est
+    alors toujours évalué.
+    """
+    if pattern.startswith("(?:") or (pattern.startswith("(") and not pattern.startswith("(?")):
+        start = 3 if pattern.startswith("(?:") else 1
+        end = pattern.find(")")
+        body = pattern[start:end]
+        if end < 0 or "(" in body:
+            return None
+        prefixes = [_literal_prefix(alternative) for alternative in body.split("|")]
+    else:
+        prefixes = [_literal_prefix(pattern)]
+    if not all(len(prefix) >= 2 for prefix in prefixes):
+        return None
+    return frozenset(prefix.lower() for prefix in prefixes)
+
+
+class _GatedPattern:
+    __slots__ = ("regex", "gate")
+
+    def __init__(self, pattern: str, flags: int = 0):
+        self.regex = re.compile(pattern, flags)
+        self.gate = literal_gate(pattern)
+
+
+class IntentEntityEngine:
+    """Moteur d'extraction compilé une seule fois: intentions, entités et période.
+
+    Chaque pattern est précompilé et associé à des mots-clés littéraux
+    déduits de son préfixe. Un seul balayage du texte (en minuscules) relève
+    tous les mots-clés présents; un pattern n'est évalué que si l'un de ses
+    mots-clés a été trouvé.
+    """
+    
+    def __init__(self, question_patterns: Dict[str, List[str]]):
+        # Intentions: appliquées au texte en minuscules (sensibles à la casse)
+        self._intents = [
+            (intent, [_GatedPattern(pattern) for pattern in patterns])
+            for intent, patterns in question_patterns.items()
+        ]
+        # Entités et période: insensibles à la casse, sur le texte d'origine
+        self._entities = {
+            family: [_GatedPattern(pattern, re.IGNORECASE) for pattern in patterns]
+            for family, patterns in ENTITY_PATTERNS.items()
+        }
+        
+        # Balayage unique des mots-clés: lookahead à chaque position (recouvrements
+        # possibles), le plus long d'abord; les mots-clés qui en sont préfixes
+        # sont ajoutés via la fermeture précalculée
+        all_patterns = [p for _, ps in self._intents for p in ps]
+        all_patterns += [p for ps in self._entities.values() for p in ps]
+        keywords = sorted({k for p in all_patterns if p.gate for k in p.gate}, key=len, reverse=True)
+        self._keyword_scan = re.compile("(?=(" + "|".join(re.escape(k) for k in keywords) + "))")
+        self._keyword_closure = {
+            keyword: frozenset(k for k in keywords if keyword.startswith(k)) for keyword in keywords
+        }
+    
+    def _present_keywords(self, text_lower: str) -> set:
+        present = set()
+        for keyword in set(self._keyword_scan.findall(text_lower)):
+            present |= self._keyword_closure[keyword]
+        return present
+    
+    def analyze(self, text: str) -> Tuple[str, float, Dict[str, Any], Dict[str, Any]]:
+        """Intention, score, entités et période en une passe sur le texte"""
+        text_lower = text.lower()
+        gates = self._present_keywords(text_lower)
+        intent, score = self._classify(text_lower, gates)
+        entities, timeframe = self._extract(text, text_lower, gates)
+        return intent, score, entities, timeframe
+    
+    def classify(self, text: str) -> Tuple[str, float]:
+        text_lower = text.lower()
+        return self._classify(text_lower, self._present_keywords(text_lower))
+    
+    def extract(self, text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        text_lower = text.lower()
+        return self._extract(text, text_lower, self._present_keywords(text_lower))
+    
+    def _classify(self, text_lower: str, gates: set) -> Tuple[str, float]:
+        best_intent = "GENERAL"
+        best_score = 0.0
+        for intent, patterns in self._intents:
+            score = 0.0
+            for pattern in patterns:
+                if (pattern.gate is None or not pattern.gate.isdisjoint(gates)) and pattern.regex.search(text_lower):
+                    score += 1.0
+            
+            # Normaliser le score
+            if patterns:
+                score = score / len(patterns)
+            
+            if score > best_score:
+                best_score = score
+                best_intent = intent
+        return best_intent, best_score
+    
+    def _first(self, family: str, text: str, text_lower: str, gates: set) -> Tuple[int, Optional["re.Match"]]:
+        for index, pattern in enumerate(self._entities[family]):
+            if pattern.gate is None or not pattern.gate.isdisjoint(gates):
+                match = pattern.regex.search(text)
+                if match:
+                    return index, match
+        return -1, None
+    
+    def _findall(self, family: str, text: str, text_lower: str, gates: set) -> List[Any]:
+        found = []
+        for pattern in self._entities[family]:
+            if pattern.gate is None or not pattern.gate.isdisjoint(gates):
+                found.extend(pattern.regex.findall(text))
+        return found
+    
+    def _extract(self, text: str, text_lower: str, gates: set) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        entities: Dict[str, Any] = {}
+        
+        _, match = self._first("user", text, text_lower, gates)
+        if match:
+            entities["user"] = match.group(1)
+        
+        sql_actions = self._findall("actions", text, text_lower, gates)
+        if sql_actions:
+            entities["actions"] = [action.upper() for action in sql_actions]
+        
+        _, match = self._first("object_name", text, text_lower, gates)
+        if match:
+            entities["object_name"] = match.group(1).upper()
+        
+        _, match = self._first("schema", text, text_lower, gates)
+        if match:
+            entities["schema"] = match.group(1).upper()
+        
+        dates = self._findall("dates", text, text_lower, gates)
+        if dates:
+            entities["dates"] = [match if isinstance(match, str) else ' '.join(match) for match in dates]
+        
+        _, match = self._first("program", text, text_lower, gates)
+        if match:
+            entities["program"] = match.group(1)
+        
+        _, match = self._first("client_host", text, text_lower, gates)
+        if match:
+            entities["client_host"] = match.group(1).upper()
+        
+        return entities, self._timeframe(text, text_lower, gates)
+    
+    def _timeframe(self, text: str, text_lower: str, gates: set) -> Dict[str, Any]:
+        timeframe: Dict[str, Any] = {}
+        now = datetime.utcnow()
+        
+        period_index, _ = self._first("period", text, text_lower, gates)
+        if period_index >= 0:
+            period = PERIOD_NAMES[period_index]
+            if period == "today":
+                timeframe["start"] = now.replace(hour=0, minute=0, second=0, microsecond=0)
+                timeframe["end"] = now
+            elif period == "yesterday":
+                yesterday = now - timedelta(days=1)
+                timeframe["start"] = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
+                timeframe["end"] = yesterday.replace(hour=23, minute=59, second=59)
+            elif period == "this_week":
+                start_week = now - timedelta(days=now.weekday())
+                timeframe["start"] = start_week.replace(hour=0, minute=0, second=0, microsecond=0)
+                timeframe["end"] = now
+            else:
+                timeframe["start"] = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                timeframe["end"] = now
+            timeframe["period"] = period
+        
+        # Patterns de durée
+        _, duration_match = self._first("duration", text, text_lower, gates)
+        if duration_match:
+            amount = int(duration_match.group(1))
+            unit = duration_match.group(2).lower()
+            
+            if "heure" in unit:
+                timeframe["start"] = now - timedelta(hours=amount)
+            elif "jour" in unit:
+                timeframe["start"] = now - timedelta(days=amount)
+            elif "semaine" in unit:
+                timeframe["start"] = now - timedelta(weeks=amount)
+            elif "mois" in unit:
+                timeframe["start"] = now - timedelta(days=amount * 30)
+            
+            timeframe["end"] = now
+            timeframe["period"] = f"last_{amount}_{unit}"
+        
+        return timeframe
+
 class NLPService:
     """Service de traitement du langage naturel"""
     
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(stop_words='french')
+        self.similarity_index = question_similarity_index
         self.question_patterns = self._load_question_patterns()
+        self.engine = IntentEntityEngine(self.question_patterns)
     
     def _load_question_patterns(self) -> Dict[str, List[str]]:
         """Charger les patterns de questions prédéfinis"""
@@ -56,140 +293,16 @@ class NLPService:
     
     def extract_entities(self, text: str) -> Dict[str, Any]:
         """Extraire les entités du texte"""
-        entities = {}
-        
-        # Extraction des utilisateurs
-        user_patterns = [
-            r"utilisateur(?:\s+(?:os|db))?\s+([A-Za-z0-9_-]+)",
-            r"user\s+([A-Za-z0-9_-]+)",
-            r"(?:je suis|je m'appelle)\s+([A-Za-zÀ-ÿ-]+)"
-        ]
-        
-        for pattern in user_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                entities["user"] = match.group(1)
-                break
-        
-        # Extraction des actions SQL
-        sql_actions = re.findall(r'\b(SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER)\b', text, re.IGNORECASE)
-        if sql_actions:
-            entities["actions"] = [action.upper() for action in sql_actions]
-        
-        # Extraction des objets/tables
-        object_patterns = [
-            r"(?:table|objet)\s+([A-Za-z0-9_-]+)",
-            r"(?:sur|dans)\s+([A-Za-z0-9_-]+)",
-            r"(?:CREATE|DROP|ALTER)\s+(?:TABLE\s+)?([A-Za-z0-9_-]+)"
-        ]
-        
-        for pattern in object_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                entities["object_name"] = match.group(1).upper()
-                break
-        
-        # Extraction des schémas
-        schema_match = re.search(r"schéma\s+([A-Za-z0-9_-]+)", text, re.IGNORECASE)
-        if schema_match:
-            entities["schema"] = schema_match.group(1).upper()
-        
-        # Extraction des dates
-        date_patterns = [
-            r"(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})",
-            r"(aujourd'hui|hier)",
-            r"(cette semaine|ce mois|cette année)",
-            r"(pendant|durant)\s+(\d+)\s+(heures?|jours?|semaines?|mois)"
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            dates.extend([match if isinstance(match, str) else ' '.join(match) for match in matches])
-        
-        if dates:
-            entities["dates"] = dates
-        
-        # Extraction des programmes/clients
-        program_match = re.search(r"(SQL Developer|Toad|DBeaver|PL\/SQL Developer|SSMS)", text, re.IGNORECASE)
-        if program_match:
-            entities["program"] = program_match.group(1)
-        
-        # Extraction des hosts/postes
-        host_match = re.search(r"(?:poste|host)\s+([A-Za-z0-9_-]+)", text, re.IGNORECASE)
-        if host_match:
-            entities["client_host"] = host_match.group(1).upper()
-        
+        entities, _ = self.engine.extract(text)
         return entities
     
     def classify_intent(self, text: str) -> Tuple[str, float]:
         """Classifier l'intention de la question"""
-        text_lower = text.lower()
-        best_intent = "GENERAL"
-        best_score = 0.0
-        
-        for intent, patterns in self.question_patterns.items():
-            score = 0.0
-            for pattern in patterns:
-                if re.search(pattern, text_lower):
-                    score += 1.0
-            
-            # Normaliser le score
-            if patterns:
-                score = score / len(patterns)
-            
-            if score > best_score:
-                best_score = score
-                best_intent = intent
-        
-        return best_intent, best_score
+        return self.engine.classify(text)
     
     def extract_timeframe(self, text: str) -> Dict[str, Any]:
         """Extraire la période temporelle"""
-        timeframe = {}
-        now = datetime.utcnow()
-        
-        # Patterns temporels
-        if re.search(r"aujourd'hui", text, re.IGNORECASE):
-            timeframe["start"] = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            timeframe["end"] = now
-            timeframe["period"] = "today"
-        
-        elif re.search(r"hier", text, re.IGNORECASE):
-            yesterday = now - timedelta(days=1)
-            timeframe["start"] = yesterday.replace(hour=0, minute=0, second=0, microsecond=0)
-            timeframe["end"] = yesterday.replace(hour=23, minute=59, second=59)
-            timeframe["period"] = "yesterday"
-        
-        elif re.search(r"cette semaine", text, re.IGNORECASE):
-            start_week = now - timedelta(days=now.weekday())
-            timeframe["start"] = start_week.replace(hour=0, minute=0, second=0, microsecond=0)
-            timeframe["end"] = now
-            timeframe["period"] = "this_week"
-        
-        elif re.search(r"ce mois", text, re.IGNORECASE):
-            timeframe["start"] = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            timeframe["end"] = now
-            timeframe["period"] = "this_month"
-        
-        # Patterns de durée
-        duration_match = re.search(r"(?:pendant|durant|dernières?)\s+(\d+)\s+(heures?|jours?|semaines?|mois)", text, re.IGNORECASE)
-        if duration_match:
-            amount = int(duration_match.group(1))
-            unit = duration_match.group(2).lower()
-            
-            if "heure" in unit:
-                timeframe["start"] = now - timedelta(hours=amount)
-            elif "jour" in unit:
-                timeframe["start"] = now - timedelta(days=amount)
-            elif "semaine" in unit:
-                timeframe["start"] = now - timedelta(weeks=amount)
-            elif "mois" in unit:
-                timeframe["start"] = now - timedelta(days=amount * 30)
-            
-            timeframe["end"] = now
-            timeframe["period"] = f"last_{amount}_{unit}"
-        
+        _, timeframe = self.engine.extract(text)
         return timeframe
     
     def analyze_question(self, question: str) -> QueryAnalysis:
@@ -197,14 +310,9 @@ class NLPService:
         # Normaliser la question
         normalized = question.lower().strip()
         
-        # Extraire les entités
-        entities = self.extract_entities(question)
+        # Intention, entités et période temporelle en une seule passe
+        intent, confidence, entities, timeframe = self.engine.analyze(question)
         
-        # Classifier l'intention
-        intent, confidence = self.classify_intent(question)
-        
-        # Extraire la période temporelle
-        timeframe = self.extract_timeframe(question)
         if timeframe:
             entities["timeframe"] = timeframe
         
@@ -263,39 +371,9 @@ class NLPService:
         return filters
     
     def find_similar_questions(self, question: str, limit: int = 5) -> List[Dict[str, Any]]:
-        """Trouver des questions similaires"""
+        """Trouver des questions similaires (index TF-IDF incrémental)"""
         try:
-            # Récupérer les questions existantes
-            existing_questions = db_manager.fetch_sqlite_query(
-                "SELECT normalized_question, count FROM question_stats ORDER BY count DESC LIMIT 100"
-            )
-            
-            if not existing_questions:
-                return []
-            
-            # Préparer les textes pour la vectorisation
-            questions_text = [row["normalized_question"] for row in existing_questions]
-            questions_text.append(question.lower().strip())
-            
-            # Vectoriser
-            tfidf_matrix = self.vectorizer.fit_transform(questions_text)
-            
-            # Calculer la similarité
-            similarities = cosine_similarity(tfidf_matrix[-1:], tfidf_matrix[:-1]).flatten()
-            
-            # Obtenir les indices des questions les plus similaires
-            similar_indices = similarities.argsort()[-limit:][::-1]
-            
-            results = []
-            for idx in similar_indices:
-                if similarities[idx] > 0.1:  # Seuil de similarité
-                    results.append({
-                        "question": existing_questions[idx]["normalized_question"],
-                        "count": existing_questions[idx]["count"],
-                        "similarity": float(similarities[idx])
-                    })
-            
-            return results
+            return self.similarity_index.search(question.lower().strip(), limit=limit)
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche de questions similaires: {e}")
@@ -1,51 +1,137 @@
 """Service d'intégration avec OpenAI pour le chatbot"""
+import time
+import asyncio
 import openai
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, AsyncIterator, Tuple, Callable, Awaitable, Set
 from loguru import logger
 from config import settings
 from nlp_service import NLPService, AuditAnalysisService
 from cache_service import CacheService, QuestionStatsService
+from autocomplete_index import autocomplete_index
 from models import ChatResponse
 
 
+# Intentions traitées avec les données d'audit MongoDB
+AUDIT_INTENTS = ("USER_ACTIVITY", "OBJECT_MODIFICATIONS", "SECURITY_ANALYSIS")
+
+# Colonnes du tableau de données envoyé avant la réponse en flux
+AUDIT_TABLE_COLUMNS = {
+    "user_activity": ["username", "total_actions", "unique_objects_count", "last_activity"],
+    "anomalies": ["user", "action", "hour", "count", "severity"],
+    "events": ["os_username", "action_name", "object_name", "event_timestamp"],
+}
+AUDIT_TABLE_MAX_ROWS = 20
+
+OPENAI_FALLBACK_RESPONSE = (
+    "Je rencontre des difficultés pour générer une réponse détaillée. Pouvez-vous reformuler votre question ?"
+)
+
+
+class StageTimings:
+    """Durées des étapes du traitement d'un message (ms), pour repérer le chemin critique"""
+    
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+    
+    async def measure(self, name: str, fn: Callable[..., Awaitable[Any]], *args) -> Any:
+        """Exécuter fn(*args) en chronométrant l'étape"""
+        start = time.perf_counter()
+        try:
+            return await fn(*args)
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 2)
+    
+    def finish(self) -> Dict[str, float]:
+        self.stages["total"] = round((time.perf_counter() - self._started) * 1000, 2)
+        return dict(self.stages)
+
+
 class OpenAIService:
     """Service d'intégration avec OpenAI"""
     
     def __init__(self):
         openai.api_key = settings.openai_api_key
+        if settings.openai_api_base:
+            openai.api_base = settings.openai_api_base
         self.nlp_service = NLPService()
         self.max_tokens = 1000
         self.temperature = 0.7
+        # Calculs CPU hors boucle d'événements et écritures en arrière-plan
+        self._cpu_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.chat_cpu_workers),
+            thread_name_prefix="chat-cpu"
+        )
+        self._background_tasks: Set[asyncio.Task] = set()
     
     async def process_chat_message(self, message: str, user_id: Optional[str] = None) -> ChatResponse:
-        """Traiter un message de chat avec analyse NLP et OpenAI"""
+        """Traiter un message de chat avec analyse NLP et OpenAI.
+        
+        Les étapes indépendantes s'exécutent en parallèle: cache exact et
+        analyse NLP, puis cache sémantique, données d'audit et questions
+        similaires; seule la génération OpenAI attend les données d'audit.
+        Les écritures (statistiques, cache, journal) partent en arrière-plan.
+        """
+        timings = StageTimings()
         try:
-            # Vérifier le cache d'abord
-            cached_result = await CacheService.get_cached_query(message)
+            # Cache exact et analyse NLP (thread CPU) en parallèle
+            cached_result, analysis = await asyncio.gather(
+                timings.measure("cache_lookup", CacheService.get_cached_query, message),
+                timings.measure("nlp_analysis", self._run_cpu, self.nlp_service.analyze_question, message)
+            )
             if cached_result:
                 logger.info(f"Réponse trouvée dans le cache pour: {message[:50]}...")
                 return ChatResponse(
                     response=cached_result["result"].get("response", ""),
                     analysis=cached_result["result"].get("analysis"),
                     suggestions=cached_result["result"].get("suggestions"),
-                    cached=True
+                    cached=True,
+                    timings=timings.finish()
                 )
             
-            # Analyser la question avec NLP
-            analysis = self.nlp_service.analyze_question(message)
             logger.info(f"Analyse NLP - Intent: {analysis.intent}, Confidence: {analysis.confidence}")
             
-            # Mettre à jour les statistiques de questions
-            await QuestionStatsService.update_question_stats(message)
+            # Mettre à jour les statistiques de questions (hors chemin critique)
+            self._spawn(QuestionStatsService.update_question_stats(message))
+            
+            # Données d'audit et questions similaires démarrent sans attendre le cache sémantique
+            audit_task = None
+            if analysis.intent in AUDIT_INTENTS:
+                audit_task = asyncio.ensure_future(
+                    timings.measure("audit_fetch", self._fetch_audit_results, analysis)
+                )
+            similar_task = asyncio.ensure_future(
+                timings.measure("similar_questions", self._run_cpu, self.nlp_service.find_similar_questions, message)
+            )
+            
+            # Réponse d'une question équivalente (même intention, mêmes filtres, même période)
+            semantic_result = await timings.measure("semantic_lookup", CacheService.get_semantic_answer, analysis)
+            if semantic_result:
+                logger.info(f"Réponse trouvée dans le cache sémantique pour: {message[:50]}...")
+                for task in (audit_task, similar_task):
+                    if task:
+                        task.cancel()
+                chat_response = ChatResponse(
+                    response=semantic_result.get("response", ""),
+                    analysis=analysis.dict(),
+                    suggestions=semantic_result.get("suggestions"),
+                    cached=True
+                )
+                self._spawn(self._store_semantic_hit(message, analysis, chat_response, user_id))
+                chat_response.timings = timings.finish()
+                return chat_response
             
             # Générer la réponse selon l'intention
-            if analysis.intent in ["USER_ACTIVITY", "OBJECT_MODIFICATIONS", "SECURITY_ANALYSIS"]:
-                response = await self._handle_audit_query(message, analysis)
+            if audit_task:
+                response = await timings.measure(
+                    "generation", self._handle_audit_query, message, analysis, audit_task
+                )
             else:
-                response = await self._handle_general_query(message, analysis)
+                response = await timings.measure("generation", self._handle_general_query, message, analysis)
             
-            # Trouver des questions similaires pour suggestions
-            similar_questions = self.nlp_service.find_similar_questions(message)
+            # Questions similaires pour suggestions (calculées pendant la génération)
+            similar_questions = await similar_task
             suggestions = [q["question"] for q in similar_questions[:3]]
             
             # Créer la réponse finale
@@ -56,15 +142,11 @@ class OpenAIService:
                 cached=False
             )
             
-            # Mettre en cache la réponse
-            await CacheService.cache_query_result(message, chat_response.dict())
-            
-            # Logger l'action
-            await CacheService.cache_action("chat_query", user_id, {
-                "intent": analysis.intent,
-                "confidence": analysis.confidence
-            })
+            # Mettre en cache la réponse et logger l'action (arrière-plan)
+            self._spawn(self._store_response(message, analysis, chat_response, user_id))
             
+            chat_response.timings = timings.finish()
+            logger.debug(f"Étapes du traitement (ms): {chat_response.timings}")
             return chat_response
             
         except Exception as e:
@@ -76,19 +158,160 @@ class OpenAIService:
                 cached=False
             )
     
-    async def _handle_audit_query(self, message: str, analysis) -> str:
-        """Traiter une requête d'audit spécifique"""
+    async def _run_cpu(self, fn: Callable[..., Any], *args) -> Any:
+        """Exécuter un calcul CPU (NLP, similarité) sur le pool de threads dédié"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cpu_executor, fn, *args)
+    
+    def _spawn(self, coro: Awaitable[Any]):
+        """Lancer une écriture en arrière-plan (la référence est gardée jusqu'à la fin)"""
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def wait_background_tasks(self):
+        """Attendre les écritures en arrière-plan (arrêt de l'application)"""
+        if self._background_tasks:
+            await asyncio.gather(*self._background_tasks, return_exceptions=True)
+    
+    async def _store_semantic_hit(self, message: str, analysis, chat_response: ChatResponse,
+                                  user_id: Optional[str] = None):
+        """Mettre en cache (texte exact) une réponse servie par le cache sémantique"""
+        await CacheService.cache_query_result(message, chat_response.dict(exclude={"timings"}))
+        await CacheService.cache_action("chat_query", user_id, {
+            "intent": analysis.intent,
+            "confidence": analysis.confidence,
+            "semantic_cache": True
+        })
+    
+    async def _store_response(self, message: str, analysis, chat_response: ChatResponse,
+                              user_id: Optional[str] = None):
+        """Mettre en cache une réponse générée (texte exact et forme sémantique) et journaliser l'action"""
+        await CacheService.cache_query_result(message, chat_response.dict(exclude={"timings"}))
+        await CacheService.cache_semantic_answer(analysis, {
+            "response": chat_response.response,
+            "suggestions": chat_response.suggestions
+        })
+        
+        # Logger l'action
+        await CacheService.cache_action("chat_query", user_id, {
+            "intent": analysis.intent,
+            "confidence": analysis.confidence
+        })
+    
+    async def stream_chat_message(self, message: str,
+                                  user_id: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Traiter un message en flux: événements (nom, données) dans l'ordre d'envoi.
+        
+        L'analyse NLP puis le tableau des données d'audit sont émis avant
+        l'appel à OpenAI; les jetons de la réponse suivent dès leur arrivée.
+        La réponse assemblée est mise en cache comme avec process_chat_message,
+        seulement si le flux OpenAI s'est terminé normalement.
+        """
         try:
-            # Exécuter l'analyse d'audit basée sur l'intention
-            if analysis.intent == "USER_ACTIVITY":
-                audit_results = await AuditAnalysisService.analyze_user_activity(
-                    filters=analysis.suggested_filters
+            cached_result = await CacheService.get_cached_query(message)
+            if cached_result:
+                result = cached_result["result"]
+                yield "analysis", result.get("analysis")
+                yield "token", result.get("response", "")
+                yield "done", {"suggestions": result.get("suggestions"), "cached": True}
+                return
+            
+            analysis = await self._run_cpu(self.nlp_service.analyze_question, message)
+            yield "analysis", analysis.dict()
+            
+            self._spawn(QuestionStatsService.update_question_stats(message))
+            similar_task = asyncio.ensure_future(
+                self._run_cpu(self.nlp_service.find_similar_questions, message)
+            )
+            
+            # Questions similaires abandonnées si le flux s'arrête avant (déconnexion, erreur)
+            try:
+                semantic_result = await CacheService.get_semantic_answer(analysis)
+                if semantic_result:
+                    yield "token", semantic_result.get("response", "")
+                    self._spawn(self._store_semantic_hit(message, analysis, ChatResponse(
+                        response=semantic_result.get("response", ""),
+                        analysis=analysis.dict(),
+                        suggestions=semantic_result.get("suggestions"),
+                        cached=True
+                    ), user_id))
+                    yield "done", {"suggestions": semantic_result.get("suggestions"), "cached": True}
+                    return
+                
+                if analysis.intent in AUDIT_INTENTS:
+                    audit_results = await self._fetch_audit_results(analysis)
+                    yield "table", self._audit_table(audit_results)
+                    context = self._prepare_audit_context(message, analysis, audit_results)
+                else:
+                    context = self._prepare_general_context(message, analysis)
+                
+                tokens: List[str] = []
+                stream_status: Dict[str, bool] = {}
+                async for token in self._stream_openai_response(context, stream_status):
+                    tokens.append(token)
+                    yield "token", token
+                
+                similar_questions = await similar_task
+                suggestions = [q["question"] for q in similar_questions[:3]]
+                
+                chat_response = ChatResponse(
+                    response="".join(tokens).strip(),
+                    analysis=analysis.dict(),
+                    suggestions=suggestions,
+                    cached=False
                 )
-            elif analysis.intent == "SECURITY_ANALYSIS":
-                audit_results = await AuditAnalysisService.detect_anomalies()
-            else:
-                # Requête générale d'audit
-                audit_results = await self._execute_audit_query(analysis.suggested_filters)
+                if stream_status.get("complete"):
+                    self._spawn(self._store_response(message, analysis, chat_response, user_id))
+                else:
+                    # Réponse tronquée ou texte de repli: jamais mise en cache
+                    logger.warning("Flux OpenAI incomplet: réponse non mise en cache")
+                
+                yield "done", {"suggestions": suggestions, "cached": False,
+                               "complete": stream_status.get("complete", False)}
+            finally:
+                if not similar_task.done():
+                    similar_task.cancel()
+            
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement du message en flux: {e}")
+            yield "error", "Désolé, une erreur s'est produite lors du traitement de votre demande."
+    
+    async def _fetch_audit_results(self, analysis) -> Dict[str, Any]:
+        """Exécuter l'analyse d'audit basée sur l'intention"""
+        if analysis.intent == "USER_ACTIVITY":
+            return await AuditAnalysisService.analyze_user_activity(
+                filters=analysis.suggested_filters
+            )
+        if analysis.intent == "SECURITY_ANALYSIS":
+            return await AuditAnalysisService.detect_anomalies()
+        # Requête générale d'audit
+        return await self._execute_audit_query(analysis.suggested_filters)
+    
+    @staticmethod
+    def _audit_table(audit_results: Dict[str, Any]) -> Dict[str, Any]:
+        """Tableau (colonnes + lignes) des résultats d'audit pour l'affichage immédiat"""
+        if "anomalies" in audit_results:
+            kind, rows = "anomalies", audit_results["anomalies"]
+        elif audit_results.get("analysis_type") == "user_activity":
+            kind, rows = "user_activity", audit_results.get("results", [])
+        else:
+            kind, rows = "events", audit_results.get("results", [])
+        
+        columns = AUDIT_TABLE_COLUMNS[kind]
+        return {
+            "type": kind,
+            "columns": columns,
+            "rows": [[row.get(column) for column in columns] for row in rows[:AUDIT_TABLE_MAX_ROWS]],
+            "count": len(rows),
+            "error": audit_results.get("error")
+        }
+    
+    async def _handle_audit_query(self, message: str, analysis,
+                                  audit_results: Optional[Awaitable[Dict[str, Any]]] = None) -> str:
+        """Traiter une requête d'audit spécifique (données éventuellement déjà en cours de lecture)"""
+        try:
+            audit_results = await (audit_results or self._fetch_audit_results(analysis))
             
             # Préparer le contexte pour OpenAI
             context = self._prepare_audit_context(message, analysis, audit_results)
@@ -105,8 +328,18 @@ class OpenAIService:
     async def _handle_general_query(self, message: str, analysis) -> str:
         """Traiter une requête générale"""
         try:
-            # Préparer le contexte général
-            context = f"""
+            context = self._prepare_general_context(message, analysis)
+            
+            response = await self._generate_openai_response(context)
+            return response
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la requête générale: {e}")
+            return "Je peux vous aider avec l'analyse d'audit de bases de données. Pouvez-vous reformuler votre question ?"
+    
+    def _prepare_general_context(self, message: str, analysis) -> str:
+        """Préparer le contexte général pour OpenAI"""
+        return f"""
             Question de l'utilisateur: {message}
             
             Analyse NLP:
@@ -118,13 +351,6 @@ class OpenAIService:
             Répondez de manière claire et professionnelle en français.
             Si la question concerne l'audit, proposez des requêtes ou analyses pertinentes.
             """
-            
-            response = await self._generate_openai_response(context)
-            return response
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la requête générale: {e}")
-            return "Je peux vous aider avec l'analyse d'audit de bases de données. Pouvez-vous reformuler votre question ?"
     
     async def _execute_audit_query(self, filters: Dict[str, Any]) -> Dict[str, Any]:
         """Exécuter une requête d'audit avec les filtres"""
@@ -223,16 +449,7 @@ class OpenAIService:
         try:
             response = await openai.ChatCompletion.acreate(
                 model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Vous êtes un assistant expert en audit de bases de données. Répondez toujours en français de manière professionnelle et claire."
-                    },
-                    {
-                        "role": "user",
-                        "content": context
-                    }
-                ],
+                messages=self._chat_messages(context),
                 max_tokens=self.max_tokens,
                 temperature=self.temperature
             )
@@ -241,30 +458,68 @@ class OpenAIService:
             
         except Exception as e:
             logger.error(f"Erreur OpenAI: {e}")
-            return "Je rencontre des difficultés pour générer une réponse détaillée. Pouvez-vous reformuler votre question ?"
+            return OPENAI_FALLBACK_RESPONSE
+    
+    async def _stream_openai_response(self, context: str,
+                                      status: Optional[Dict[str, bool]] = None) -> AsyncIterator[str]:
+        """Générer une réponse avec OpenAI en transmettant les jetons dès leur arrivée
+        
+        status["complete"] passe à True seulement si le flux OpenAI s'est
+        terminé normalement, avec un finish_reason (réponse tronquée ou texte
+        de repli: False).
+        """
+        status = status if status is not None else {}
+        status["complete"] = False
+        emitted = False
+        try:
+            stream = await openai.ChatCompletion.acreate(
+                model="gpt-3.5-turbo",
+                messages=self._chat_messages(context),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=True
+            )
+            finished = False
+            async for chunk in stream:
+                choice = chunk.choices[0]
+                token = choice.delta.get("content")
+                if token:
+                    emitted = True
+                    yield token
+                if choice.get("finish_reason"):
+                    finished = True
+            # Connexion fermée sans finish_reason: réponse tronquée
+            status["complete"] = finished
+                    
+        except Exception as e:
+            logger.error(f"Erreur OpenAI (flux): {e}")
+            if not emitted:
+                yield OPENAI_FALLBACK_RESPONSE
+    
+    @staticmethod
+    def _chat_messages(context: str) -> List[Dict[str, str]]:
+        return [
+            {
+                "role": "system",
+                "content": "Vous êtes un assistant expert en audit de bases de données. Répondez toujours en français de manière professionnelle et claire."
+            },
+            {
+                "role": "user",
+                "content": context
+            }
+        ]
     
     async def get_chat_suggestions(self, partial_message: str) -> List[str]:
         """Obtenir des suggestions de complétion pour un message partiel"""
         try:
-            # Trouver des questions similaires
-            similar = self.nlp_service.find_similar_questions(partial_message, limit=5)
-            
-            # Obtenir les questions fréquentes
-            frequent = await QuestionStatsService.get_frequent_questions(limit=5)
-            
-            # Combiner et filtrer les suggestions
-            suggestions = []
-            
-            # Ajouter les questions similaires
-            for q in similar:
-                if q["similarity"] > 0.3:
-                    suggestions.append(q["question"])
+            # Préfixes (trie pondéré) puis correspondances approximatives (trigrammes)
+            suggestions = autocomplete_index.suggest(partial_message, limit=5)
             
-            # Ajouter les questions fréquentes si pas assez de similaires
+            # Ajouter les questions fréquentes si pas assez de complétions
             if len(suggestions) < 3:
-                for q in frequent:
-                    if q["question"] not in suggestions:
-                        suggestions.append(q["question"])
+                for question in autocomplete_index.most_frequent(limit=5):
+                    if question not in suggestions:
+                        suggestions.append(question)
                         if len(suggestions) >= 5:
                             break
             
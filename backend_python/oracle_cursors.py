@@ -0,0 +1,404 @@
+"""Pagination des SELECT Oracle par jeton de curseur.
+
+Deux modes:
+
+- "cursor": la requête est exécutée une fois; le curseur reste ouvert sur une
+  session du pool et chaque page suivante est lue là où la précédente s'est
+  arrêtée (aucune ré-exécution depuis la ligne 1). Les sessions retenues sont
+  plafonnées (global et par pool) et libérées après un délai d'inactivité ou
+  en fin de résultat;
+- "keyset": aucune session retenue; chaque page ré-exécute la requête bornée
+  par la dernière clé lue (``WHERE (k1, k2) > (:dernière clé) ORDER BY k1, k2
+  FETCH FIRST n ROWS ONLY``). Les colonnes de clé doivent être non nulles et
+  former un ordre total (ex. EVENT_TIMESTAMP puis un identifiant unique).
+"""
+from __future__ import annotations
+
+import re
+import time
+import asyncio
+import secrets
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from oracle_metrics import oracle_metrics
+from oracle_pool import OraclePoolManager, lob_output_type_handler, rows_to_columnar, rows_to_records
+
+try:
+    from config import settings  # type: ignore
+except Exception:  # pragma: no cover
+    settings = None  # type: ignore
+
+CURSOR_MODES = ("cursor", "keyset")
+PAGE_FORMATS = ("rows", "columnar")
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z][\w$#]*$")
+
+
+class CursorNotFoundError(KeyError):
+    """Jeton inconnu, expiré ou curseur déjà épuisé"""
+
+
+class CursorLimitError(RuntimeError):
+    """Plafond de curseurs ouverts atteint"""
+
+
+@dataclass
+class _PageCursor:
+    token: str
+    mode: str
+    pool: OraclePoolManager
+    query: str
+    binds: Any
+    page_size: int
+    result_format: str
+    offset: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # Mode "cursor": session et curseur ouverts, ligne lue d'avance
+    connection: Any = None
+    cursor: Any = None
+    description: Any = None
+    lookahead: List[Tuple[Any, ...]] = field(default_factory=list)
+    # Mode "keyset": colonnes de clé et dernière clé lue
+    key_columns: List[str] = field(default_factory=list)
+    descending: bool = False
+    last_key: Optional[List[Any]] = None
+
+
+def _format_page(description: Any, rows: List[Tuple[Any, ...]], result_format: str) -> Any:
+    if result_format == "columnar":
+        return rows_to_columnar(description, rows)
+    return rows_to_records(description, rows)
+
+
+def keyset_query(query: str, key_columns: List[str], descending: bool,
+                 after: bool) -> str:
+    """Enveloppe la requête: filtre strictement après la dernière clé, tri et limite"""
+    operator = "<" if descending else ">"
+    order = ", ".join(f"{col} {'DESC' if descending else 'ASC'}" for col in key_columns)
+    sql = f"SELECT * FROM ({query.strip().rstrip(';')}) keyset_q"
+    if after:
+        # (k1, k2) > (:v1, :v2) développé: Oracle ne compare pas les tuples avec < ou >
+        terms = []
+        for i, col in enumerate(key_columns):
+            equal = [f"{key_columns[j]} = :keyset_{j + 1}" for j in range(i)]
+            terms.append("(" + " AND ".join(equal + [f"{col} {operator} :keyset_{i + 1}"]) + ")")
+        sql += " WHERE " + " OR ".join(terms)
+    return f"{sql} ORDER BY {order} FETCH FIRST :keyset_limit ROWS ONLY"
+
+
+class OracleCursorRegistry:
+    """Curseurs de pagination ouverts, par jeton"""
+
+    def __init__(self, max_open: int = 20, idle_timeout_seconds: float = 300,
+                 max_page_size: int = 5000, max_keyset: int = 1000) -> None:
+        self.max_open = max_open
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.max_page_size = max_page_size
+        self.max_keyset = max_keyset
+        self._cursors: Dict[str, _PageCursor] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _session_cursors(self, pool: Optional[OraclePoolManager] = None) -> int:
+        return sum(
+            1 for c in self._cursors.values()
+            if c.mode == "cursor" and (pool is None or c.pool is pool)
+        )
+
+    # -----------------------------------------------------------------
+    # Travail bloquant (threads du pool)
+    # -----------------------------------------------------------------
+
+    # Les pages sont mises en forme dans le thread de travail, session encore
+    # tenue: aucune lecture (LOB, conversion) après le retour de la connexion.
+
+    @staticmethod
+    def _open_in_worker(entry: _PageCursor, submitted: float) -> Tuple[Any, Any, int, bool]:
+        started = time.perf_counter()
+        connection = entry.pool.acquire()
+        acquired = time.perf_counter()
+        try:
+            cursor = connection.cursor()
+            cursor.arraysize = entry.page_size
+            cursor.prefetchrows = entry.page_size + 1
+            cursor.outputtypehandler = lob_output_type_handler
+            cursor.execute(entry.query, entry.binds)
+            # Une ligne lue d'avance pour savoir s'il reste des pages
+            rows = cursor.fetchmany(numRows=entry.page_size + 1)
+            page = rows[:entry.page_size]
+            data = _format_page(cursor.description, page, entry.result_format)
+        except Exception:
+            oracle_metrics.record_error(entry.pool.name)
+            connection.close()
+            raise
+        finished = time.perf_counter()
+        oracle_metrics.record_select(
+            entry.pool.name, entry.query, (started - submitted) * 1000,
+            (acquired - started) * 1000, (finished - acquired) * 1000, len(rows)
+        )
+        entry.connection, entry.cursor, entry.description = connection, cursor, cursor.description
+        entry.lookahead = list(rows[entry.page_size:])
+        return entry.description, data, len(page), len(rows) > entry.page_size
+
+    @staticmethod
+    def _next_in_worker(entry: _PageCursor) -> Tuple[Any, int, bool]:
+        started = time.perf_counter()
+        wanted = entry.page_size + 1 - len(entry.lookahead)
+        rows = entry.lookahead + (entry.cursor.fetchmany(numRows=wanted) if wanted > 0 else [])
+        oracle_metrics.record_cursor_page(
+            entry.pool.name, entry.query, (time.perf_counter() - started) * 1000, len(rows)
+        )
+        entry.lookahead = list(rows[entry.page_size:])
+        page = rows[:entry.page_size]
+        return _format_page(entry.description, page, entry.result_format), len(page), len(rows) > entry.page_size
+
+    @staticmethod
+    def _close_in_worker(entry: _PageCursor) -> None:
+        try:
+            if entry.cursor is not None:
+                entry.cursor.close()
+        except Exception as e:
+            logger.debug(f"Fermeture du curseur Oracle {entry.token}: {e}")
+        try:
+            if entry.connection is not None:
+                # Session rendue au pool
+                entry.connection.close()
+        except Exception as e:
+            logger.warning(f"Libération de la session du curseur {entry.token}: {e}")
+        entry.cursor = entry.connection = None
+
+    @staticmethod
+    def _keyset_in_worker(entry: _PageCursor, submitted: float) -> Tuple[Any, Any, int, bool]:
+        sql = keyset_query(entry.query, entry.key_columns, entry.descending, entry.last_key is not None)
+        binds = dict(entry.binds or {})
+        binds["keyset_limit"] = entry.page_size + 1
+        for i, value in enumerate(entry.last_key or []):
+            binds[f"keyset_{i + 1}"] = value
+        started = time.perf_counter()
+        try:
+            with entry.pool.acquire() as connection:
+                acquired = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.arraysize = entry.page_size + 1
+                    cursor.outputtypehandler = lob_output_type_handler
+                    cursor.execute(sql, binds)
+                    description = cursor.description
+                    rows = cursor.fetchall()
+                finished = time.perf_counter()
+
+                has_more = len(rows) > entry.page_size
+                rows = rows[:entry.page_size]
+                if rows:
+                    names = [d[0].upper() for d in description]
+                    try:
+                        positions = [names.index(col.upper()) for col in entry.key_columns]
+                    except ValueError:
+                        raise ValueError(f"Colonnes de clé absentes du résultat: {entry.key_columns}")
+                    entry.last_key = [rows[-1][i] for i in positions]
+                data = _format_page(description, rows, entry.result_format)
+        except Exception:
+            oracle_metrics.record_error(entry.pool.name)
+            raise
+        oracle_metrics.record_select(
+            entry.pool.name, sql, (started - submitted) * 1000,
+            (acquired - started) * 1000, (finished - acquired) * 1000, len(rows)
+        )
+        return description, data, len(rows), has_more
+
+    # -----------------------------------------------------------------
+    # API asynchrone
+    # -----------------------------------------------------------------
+
+    async def open(self, pool: OraclePoolManager, query: str, page_size: int = 500, mode: str = "cursor",
+                   binds: Any = None, result_format: str = "rows", key_columns: Optional[List[str]] = None,
+                   descending: bool = False, auto_parameterize: Optional[bool] = None) -> Dict[str, Any]:
+        """Exécute la requête et retourne la première page avec le jeton des suivantes"""
+        if mode not in CURSOR_MODES:
+            raise ValueError(f"Mode de pagination inconnu: {mode}")
+        if result_format not in PAGE_FORMATS:
+            raise ValueError(f"Format de page inconnu: {result_format}")
+        pool.check_select(query)
+        page_size = max(1, min(int(page_size), self.max_page_size))
+        query, binds = OraclePoolManager.prepare_statement(query, binds, auto_parameterize)
+
+        entry = _PageCursor(
+            token=secrets.token_urlsafe(18), mode=mode, pool=pool, query=query, binds=binds,
+            page_size=page_size, result_format=result_format,
+        )
+        if mode == "keyset":
+            return await self._open_keyset(entry, key_columns or [], descending)
+
+        await self.sweep()
+        per_pool = max(1, (pool.config.max_sessions if pool.config else 2) // 2)
+        if self._session_cursors() >= self.max_open or self._session_cursors(pool) >= per_pool:
+            raise CursorLimitError(
+                f"Trop de curseurs ouverts (max {self.max_open}, {per_pool} par pool); "
+                "fermez-en un ou utilisez le mode keyset"
+            )
+
+        # Réservé avant l'exécution: les ouvertures concurrentes respectent le plafond
+        self._cursors[entry.token] = entry
+        pool.hold_session()
+        started = time.perf_counter()
+        try:
+            async with entry.lock:
+                description, data, count, has_more = await pool.run_in_worker(
+                    self._open_in_worker, entry, time.perf_counter()
+                )
+        except Exception:
+            self._cursors.pop(entry.token, None)
+            pool.release_session()
+            raise
+        if not has_more:
+            await self._discard(entry)
+        return self._page(entry, description, data, count, has_more, started)
+
+    async def _open_keyset(self, entry: _PageCursor, key_columns: List[str], descending: bool) -> Dict[str, Any]:
+        if not key_columns or not all(_IDENTIFIER_RE.match(col) for col in key_columns):
+            raise ValueError("key_columns doit lister les colonnes de tri (identifiants simples)")
+        if isinstance(entry.binds, (list, tuple)):
+            raise ValueError("Le mode keyset nécessite des binds nommés")
+        entry.key_columns = list(key_columns)
+        entry.descending = descending
+
+        await self.sweep()
+        if len(self._cursors) - self._session_cursors() >= self.max_keyset:
+            raise CursorLimitError(f"Trop de curseurs keyset ouverts (max {self.max_keyset})")
+        self._cursors[entry.token] = entry
+        try:
+            return await self._keyset_page(entry)
+        except Exception:
+            self._cursors.pop(entry.token, None)
+            raise
+
+    async def _keyset_page(self, entry: _PageCursor) -> Dict[str, Any]:
+        started = time.perf_counter()
+        description, data, count, has_more = await entry.pool.run_in_worker(
+            self._keyset_in_worker, entry, time.perf_counter()
+        )
+        if not has_more:
+            self._cursors.pop(entry.token, None)
+        return self._page(entry, description, data, count, has_more, started)
+
+    def _page(self, entry: _PageCursor, description: Any, data: Any, count: int,
+              has_more: bool, started: float) -> Dict[str, Any]:
+        page = {
+            "cursor": entry.token if has_more else None,
+            "mode": entry.mode,
+            "columns": [d[0] for d in description],
+            "data": data,
+            "rowCount": count,
+            "offset": entry.offset,
+            "hasMore": has_more,
+            "timings": {"total_ms": round((time.perf_counter() - started) * 1000, 2)},
+        }
+        entry.offset += count
+        entry.last_used = time.monotonic()
+        return page
+
+    async def next_page(self, token: str) -> Dict[str, Any]:
+        """Page suivante d'un curseur ouvert"""
+        entry = self._cursors.get(token)
+        if entry is None:
+            raise CursorNotFoundError(token)
+        async with entry.lock:
+            if token not in self._cursors:
+                raise CursorNotFoundError(token)
+            entry.last_used = time.monotonic()
+            if entry.mode == "keyset":
+                return await self._keyset_page(entry)
+
+            started = time.perf_counter()
+            try:
+                data, count, has_more = await entry.pool.run_in_worker(self._next_in_worker, entry)
+            except Exception:
+                await self._discard(entry)
+                raise
+            if not has_more:
+                await self._discard(entry)
+            return self._page(entry, entry.description, data, count, has_more, started)
+
+    async def _discard(self, entry: _PageCursor) -> None:
+        """Retire le curseur; en mode "cursor", rend sa session au pool"""
+        if self._cursors.get(entry.token) is entry:
+            del self._cursors[entry.token]
+        if entry.mode == "cursor" and entry.connection is not None:
+            try:
+                await entry.pool.run_in_worker(self._close_in_worker, entry)
+            except RuntimeError:
+                # Pool déjà fermé: la session l'a été avec lui
+                entry.cursor = entry.connection = None
+            entry.pool.release_session()
+
+    async def close(self, token: str) -> bool:
+        entry = self._cursors.get(token)
+        if entry is None:
+            return False
+        async with entry.lock:
+            await self._discard(entry)
+        return True
+
+    async def sweep(self) -> int:
+        """Ferme les curseurs inactifs depuis idle_timeout_seconds (hors lecture en cours)"""
+        deadline = time.monotonic() - self.idle_timeout_seconds
+        expired = [
+            entry for entry in list(self._cursors.values())
+            if entry.last_used < deadline and not entry.lock.locked()
+        ]
+        for entry in expired:
+            logger.info(f"Curseur Oracle inactif fermé ({entry.mode}, {entry.offset} lignes servies)")
+            async with entry.lock:
+                await self._discard(entry)
+        return len(expired)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(max(5.0, self.idle_timeout_seconds / 4))
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Nettoyage des curseurs Oracle: {e}")
+
+    def start(self) -> None:
+        """Démarre le nettoyage périodique (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for entry in list(self._cursors.values()):
+            await self._discard(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "open": len(self._cursors),
+            "session_cursors": self._session_cursors(),
+            "max_open": self.max_open,
+            "idle_timeout_seconds": self.idle_timeout_seconds,
+            "cursors": [
+                {
+                    "mode": entry.mode,
+                    "pool": entry.pool.name,
+                    "rows_served": entry.offset,
+                    "idle_seconds": round(now - entry.last_used, 1),
+                }
+                for entry in self._cursors.values()
+            ],
+        }
+
+
+# Instance globale des curseurs de pagination
+oracle_cursors = OracleCursorRegistry(
+    max_open=settings.oracle_cursor_max_open if settings else 20,
+    idle_timeout_seconds=settings.oracle_cursor_idle_timeout_seconds if settings else 300,
+    max_page_size=settings.oracle_cursor_max_page_size if settings else 5000,
+)
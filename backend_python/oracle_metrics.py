@@ -0,0 +1,252 @@
+"""Télémétrie des pools Oracle.
+
+Mesures enregistrées par les threads de travail du pool:
+
+- attente dans la file de l'exécuteur et attente d'acquisition d'une session
+  (histogrammes par pool): c'est ce qui permet de dimensionner max_sessions;
+- durée d'exécution par empreinte de requête (SQL normalisé, littéraux
+  remplacés par ``?``);
+- retries tenacity, erreurs, lignes lues et octets sérialisés;
+- ratio parse/exécution par empreinte: nombre de textes SQL distincts
+  envoyés (chacun coûte un hard parse côté Oracle, le partage de curseur se
+  faisant au texte exact) rapporté au nombre d'exécutions. Proche de 1 avec
+  des littéraux en dur, proche de 0 avec des binds.
+
+Export au format texte Prometheus (endpoint de scrape) ou en JSON, et en
+différentiel: chaque série porte un numéro de séquence, un client SSE ne
+reçoit que les séries modifiées depuis son dernier envoi.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from oracle_sql import fingerprint_sql
+
+# Bornes des histogrammes en millisecondes
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimation par borne supérieure du seau atteint"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(bound)
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        p50, p95 = self.quantile(0.5), self.quantile(0.95)
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "buckets": buckets,
+            # Au-delà de la dernière borne: "+Inf" (JSON n'a pas d'infini)
+            "p50": "+Inf" if p50 == float("inf") else p50,
+            "p95": "+Inf" if p95 == float("inf") else p95,
+        }
+
+
+class OracleMetrics:
+    """Registre thread-safe des compteurs et histogrammes Oracle"""
+
+    def __init__(self, max_fingerprints: int = 500, max_variants: int = 1000):
+        self.max_fingerprints = max_fingerprints
+        self.max_variants = max_variants
+        self._lock = threading.Lock()
+        self._histograms: Dict[SeriesKey, Histogram] = {}
+        self._counters: Dict[SeriesKey, float] = {}
+        self._gauges: Dict[SeriesKey, float] = {}
+        # Textes exacts distincts exécutés par (pool, empreinte), hachés, bornés à max_variants
+        self._variants: Dict[Tuple[str, str], set] = {}
+        self._updated: Dict[SeriesKey, int] = {}
+        # Empreintes les plus récentes: texte normalisé, bornées en nombre
+        self._fingerprints: "OrderedDict[str, str]" = OrderedDict()
+        self._seq = 0
+
+    @staticmethod
+    def _key(name: str, **labels: str) -> SeriesKey:
+        return name, tuple(sorted(labels.items()))
+
+    def _touch(self, key: SeriesKey) -> None:
+        self._seq += 1
+        self._updated[key] = self._seq
+
+    def _observe(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, **labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+        histogram.observe(value)
+        self._touch(key)
+
+    def _inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = self._key(name, **labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+        self._touch(key)
+
+    def _set(self, name: str, value: float, **labels: str) -> None:
+        key = self._key(name, **labels)
+        self._gauges[key] = value
+        self._touch(key)
+
+    def _register_fingerprint(self, fingerprint: str, text: str) -> None:
+        self._fingerprints[fingerprint] = text[:500]
+        self._fingerprints.move_to_end(fingerprint)
+        while len(self._fingerprints) > self.max_fingerprints:
+            evicted, _ = self._fingerprints.popitem(last=False)
+            for key in [k for k in self._variants if k[1] == evicted]:
+                del self._variants[key]
+            for store in (self._histograms, self._counters, self._gauges):
+                for key in [k for k in store if ("fingerprint", evicted) in k[1]]:
+                    del store[key]
+                    self._updated.pop(key, None)
+
+    def record_select(self, pool: str, query: str, queue_wait_ms: float, acquire_ms: float,
+                      execution_ms: float, rows: int) -> None:
+        """Une exécution réussie: attentes, durée par empreinte et lignes lues"""
+        fingerprint, text = fingerprint_sql(query)
+        with self._lock:
+            self._register_fingerprint(fingerprint, text)
+            self._observe("oracle_queue_wait_ms", queue_wait_ms, pool=pool)
+            self._observe("oracle_acquire_wait_ms", acquire_ms, pool=pool)
+            self._observe("oracle_execution_ms", execution_ms, pool=pool, fingerprint=fingerprint)
+            self._inc("oracle_rows_fetched_total", rows, pool=pool, fingerprint=fingerprint)
+
+            variants = self._variants.setdefault((pool, fingerprint), set())
+            if len(variants) < self.max_variants:
+                variants.add(hash(query))
+            executions = self._histograms[self._key("oracle_execution_ms", pool=pool, fingerprint=fingerprint)].count
+            self._set("oracle_statement_variants", len(variants), pool=pool, fingerprint=fingerprint)
+            self._set("oracle_parse_execute_ratio", round(min(1.0, len(variants) / executions), 4),
+                      pool=pool, fingerprint=fingerprint)
+
+    def record_cursor_page(self, pool: str, query: str, fetch_ms: float, rows: int) -> None:
+        """Page suivante lue sur un curseur de pagination déjà ouvert (sans ré-exécution)"""
+        fingerprint, text = fingerprint_sql(query)
+        with self._lock:
+            self._register_fingerprint(fingerprint, text)
+            self._observe("oracle_cursor_fetch_ms", fetch_ms, pool=pool)
+            self._inc("oracle_rows_fetched_total", rows, pool=pool, fingerprint=fingerprint)
+
+    def record_retry(self, pool: str) -> None:
+        with self._lock:
+            self._inc("oracle_retries_total", pool=pool)
+
+    def record_error(self, pool: str) -> None:
+        with self._lock:
+            self._inc("oracle_errors_total", pool=pool)
+
+    def record_bytes(self, pool: str, result_format: str, size: int) -> None:
+        with self._lock:
+            self._inc("oracle_bytes_serialized_total", size, pool=pool, format=result_format)
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def snapshot(self, since: int = 0) -> Dict[str, Any]:
+        """Séries modifiées après la séquence since (0: toutes), avec la séquence courante"""
+        with self._lock:
+            keys = [key for key, seq in self._updated.items() if seq > since]
+            series: List[Dict[str, Any]] = []
+            fingerprints = {}
+            for name, labels in keys:
+                entry: Dict[str, Any] = {"name": name, "labels": dict(labels)}
+                histogram = self._histograms.get((name, labels))
+                if histogram is not None:
+                    entry.update(histogram.to_dict())
+                elif (name, labels) in self._gauges:
+                    entry["value"] = self._gauges[(name, labels)]
+                else:
+                    entry["value"] = self._counters.get((name, labels), 0)
+                series.append(entry)
+                fingerprint = entry["labels"].get("fingerprint")
+                if fingerprint in self._fingerprints:
+                    fingerprints[fingerprint] = self._fingerprints[fingerprint]
+            return {"seq": self._seq, "series": series, "fingerprints": fingerprints}
+
+    def prometheus(self, pool_stats: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """Exposition au format texte Prometheus"""
+
+        def labels_text(labels: Dict[str, Any]) -> str:
+            if not labels:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            declared = set()
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                if name not in declared:
+                    lines.append(f"# TYPE {name} histogram")
+                    declared.add(name)
+                base = dict(labels)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{labels_text({**base, 'le': bound})} {cumulative}")
+                lines.append(f"{name}_bucket{labels_text({**base, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{labels_text(base)} {round(histogram.sum, 3)}")
+                lines.append(f"{name}_count{labels_text(base)} {histogram.count}")
+            for metric_type, store in (("counter", self._counters), ("gauge", self._gauges)):
+                for (name, labels), value in sorted(store.items()):
+                    if name not in declared:
+                        lines.append(f"# TYPE {name} {metric_type}")
+                        declared.add(name)
+                    lines.append(f"{name}{labels_text(dict(labels))} {value}")
+            if self._fingerprints:
+                lines.append("# TYPE oracle_query_info gauge")
+                for fingerprint, text in self._fingerprints.items():
+                    lines.append(f"oracle_query_info{labels_text({'fingerprint': fingerprint, 'sql': text[:200]})} 1")
+
+        for attr in ("open", "busy", "max", "async_pending"):
+            gauges = [
+                (pool, stats.get(attr)) for pool, stats in (pool_stats or {}).items()
+                if isinstance(stats.get(attr), (int, float))
+            ]
+            if gauges:
+                lines.append(f"# TYPE oracle_pool_{attr} gauge")
+                lines.extend(f"oracle_pool_{attr}{labels_text({'pool': pool})} {value}" for pool, value in gauges)
+        return "\n".join(lines) + "\n"
+
+
+# Instance globale de la télémétrie Oracle
+oracle_metrics = OracleMetrics()
@@ -5,16 +5,30 @@ provide helper methods to acquire connections and execute read-only queries.
 """
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple, Iterable
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, List, Optional, Tuple, Iterable, AsyncIterator
 from dataclasses import dataclass
 
 from loguru import logger
 
+from oracle_metrics import oracle_metrics
+from oracle_result_cache import oracle_result_cache
+from oracle_sql import parameterize_sql
+
 try:
     import oracledb  # type: ignore
 except Exception:
     oracledb = None  # type: ignore
 
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.ipc  # type: ignore
+except Exception:
+    pyarrow = None  # type: ignore
+
 try:
     from config import settings  # type: ignore
 except Exception:  # pragma: no cover
@@ -39,6 +53,19 @@ except Exception:
         return None
 
 
+# Erreurs transitoires (session, réseau, pool): seules celles-ci sont réessayées.
+# Une erreur SQL ou de conversion est déterministe et remonte immédiatement.
+_TRANSIENT_ERRORS: Tuple[type, ...] = (
+    (oracledb.OperationalError, oracledb.InterfaceError) if oracledb is not None else (ConnectionError,)
+)
+
+
+def _record_retry(retry_state: Any) -> None:
+    """Callback tenacity (before_sleep): compte les nouvelles tentatives par pool"""
+    manager = retry_state.args[0] if retry_state.args else None
+    oracle_metrics.record_retry(getattr(manager, "name", "unknown"))
+
+
 @dataclass
 class OraclePoolConfig:
     host: str
@@ -51,6 +78,109 @@ class OraclePoolConfig:
     max_sessions: int = 10
     increment: int = 1
     connection_timeout_seconds: int = 30
+    # Cache d'instructions du driver, par connexion du pool (curseurs réutilisés sans re-parse)
+    statement_cache_size: int = 50
+
+
+RESULT_FORMATS = ("rows", "columnar", "arrow")
+
+
+def column_type_tag(type_code: Any) -> str:
+    """Étiquette de type d'une colonne à partir du type oracledb (cursor.description)."""
+    name = str(getattr(type_code, "name", type_code)).upper()
+    if "DATE" in name or "TIMESTAMP" in name:
+        return "datetime"
+    if "INTERVAL" in name:
+        return "interval"
+    if "RAW" in name or "BLOB" in name:
+        return "binary"
+    if "NUMBER" in name or "INTEGER" in name or "FLOAT" in name or "DOUBLE" in name:
+        return "number"
+    if "BOOLEAN" in name:
+        return "boolean"
+    if "CHAR" in name or "CLOB" in name or "LONG" in name or "ROWID" in name:
+        return "string"
+    return "other"
+
+
+def _is_lob(type_code: Any) -> bool:
+    return "LOB" in str(getattr(type_code, "name", type_code)).upper()
+
+
+def lob_output_type_handler(cursor: Any, metadata: Any) -> Any:
+    """Handler de sortie: CLOB/NCLOB lus en str et BLOB en bytes dès le fetch.
+
+    Les valeurs ne dépendent plus de la session: elles peuvent être converties
+    après le retour de la connexion au pool.
+    """
+    if oracledb is None:
+        return None
+    if metadata.type_code is oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_NCLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+    return None
+
+
+def _read_lobs(values: Iterable[Any]) -> List[Any]:
+    # Locators éventuels (curseur sans handler); str/bytes laissés tels quels
+    return [v.read() if hasattr(v, "read") else v for v in values]
+
+
+def _convert_column(tag: str, values: Iterable[Any], lob: bool = False) -> List[Any]:
+    """Convertit les valeurs d'une colonne en types JSON, une seule décision par colonne."""
+    if lob:
+        values = _read_lobs(values)
+    if tag == "datetime":
+        return [v.isoformat() if v is not None else None for v in values]
+    if tag == "binary":
+        return [v.hex() if v is not None else None for v in values]
+    if tag in ("string", "number", "boolean"):
+        return list(values)
+    return [str(v) if v is not None else None for v in values]
+
+
+def rows_to_columnar(description: List[Any], rows: List[Tuple[Any, ...]]) -> Dict[str, Any]:
+    """Résultat colonnaire: noms et types une fois, valeurs en tableaux par colonne."""
+    columns = list(zip(*rows)) if rows else [()] * len(description)
+    result_columns = []
+    for desc, values in zip(description, columns):
+        tag = column_type_tag(desc[1])
+        result_columns.append({
+            "name": desc[0],
+            "type": tag,
+            "values": _convert_column(tag, values, _is_lob(desc[1])),
+        })
+    return {"columns": result_columns, "rowCount": len(rows)}
+
+
+def rows_to_arrow(description: List[Any], rows: List[Tuple[Any, ...]]) -> bytes:
+    """Résultat au format Arrow IPC (flux), types natifs conservés."""
+    if pyarrow is None:
+        raise RuntimeError("Le format Arrow nécessite pyarrow (pip install pyarrow)")
+    columns = list(zip(*rows)) if rows else [()] * len(description)
+    arrays = []
+    for desc, values in zip(description, columns):
+        tag = column_type_tag(desc[1])
+        if tag in ("interval", "other"):
+            values = _convert_column(tag, values, _is_lob(desc[1]))
+        elif _is_lob(desc[1]):
+            values = _read_lobs(values)
+        arrays.append(pyarrow.array(list(values)))
+    table = pyarrow.Table.from_arrays(arrays, names=[desc[0] for desc in description])
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def rows_to_records(description: List[Any], rows: List[Tuple[Any, ...]]) -> List[Dict[str, Any]]:
+    """Résultat ligne à ligne (format historique): une liste de dictionnaires."""
+    colnames = [desc[0] for desc in description]
+    converted = rows_to_columnar(description, rows)["columns"]
+    return [dict(zip(colnames, values)) for values in zip(*(col["values"] for col in converted))]
 
 
 class OraclePoolManager:
@@ -59,12 +189,18 @@ class OraclePoolManager:
     - Initialise le client (thick) si demandé
     - Crée un pool de sessions réutilisable
     - Fournit des helpers pour exécuter des requêtes en lecture
+    - Exécute les requêtes asynchrones sur un pool de threads borné à max_sessions
     """
 
     def __init__(self) -> None:
         self._pool: Optional["oracledb.ConnectionPool"] = None
         self._initialized: bool = False
         self._config: Optional[OraclePoolConfig] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: int = 0
+        # Sessions retenues par des curseurs de pagination ouverts
+        self._held: int = 0
+        self._init_lock = threading.Lock()
 
     @property
     def is_available(self) -> bool:
@@ -74,14 +210,42 @@ class OraclePoolManager:
     def is_initialized(self) -> bool:
         return self._initialized and self._pool is not None
 
+    @property
+    def config(self) -> Optional[OraclePoolConfig]:
+        return self._config
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def held_sessions(self) -> int:
+        return self._held
+
+    def hold_session(self) -> None:
+        self._held += 1
+
+    def release_session(self) -> None:
+        self._held = max(0, self._held - 1)
+
+    @property
+    def name(self) -> str:
+        """Nom du pool dans le registre et dans la télémétrie"""
+        if self._config is None:
+            return "uninitialized"
+        return OraclePoolRegistry.pool_name(OraclePoolRegistry.key_for(self._config))
+
     def init_pool(self, config: OraclePoolConfig) -> bool:
         if not self.is_available:
             logger.error("Le module oracledb n'est pas disponible")
             return False
 
-        if self.is_initialized:
-            return True
+        with self._init_lock:
+            if self.is_initialized:
+                return True
+            return self._create_pool(config)
 
+    def _create_pool(self, config: OraclePoolConfig) -> bool:
         try:
             if config.driver_mode == "thick":
                 try:
@@ -106,8 +270,14 @@ class OraclePoolManager:
                 homogeneous=True,
                 # ping_interval: seconds between pinging idle sessions to keep them valid
                 ping_interval=60,
+                stmtcachesize=config.statement_cache_size,
             )
             self._config = config
+            # Un thread par session: les requêtes en attente patientent dans la file
+            # de l'exécuteur au lieu de bloquer la boucle d'événements
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, config.max_sessions), thread_name_prefix="oracle-select"
+            )
             self._initialized = True
             logger.info(
                 f"Pool Oracle initialisé (min={config.min_sessions}, max={config.max_sessions}, increment={config.increment})"
@@ -119,6 +289,21 @@ class OraclePoolManager:
             self._pool = None
             return False
 
+    def close(self) -> None:
+        """Ferme le pool après la fin des requêtes en cours"""
+        with self._init_lock:
+            executor, pool = self._executor, self._pool
+            self._initialized = False
+            self._executor = None
+            self._pool = None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if pool is not None:
+            try:
+                pool.close(force=True)
+            except Exception as e:
+                logger.warning(f"Fermeture du pool Oracle: {e}")
+
     def stats(self) -> Dict[str, Any]:
         if not self.is_initialized:
             return {"initialized": False, "available": self.is_available}
@@ -129,6 +314,10 @@ class OraclePoolManager:
         # oracledb pools expose open/busy attributes in python-thick; try to read if present
         for attr in ("open", "busy", "max", "min", "increment"):
             stats[attr] = getattr(self._pool, attr, None) if self._pool else None
+        stats["async_workers"] = self._config.max_sessions if self._config else None
+        stats["async_pending"] = self._pending
+        stats["held_sessions"] = self._held
+        stats["result_cache"] = oracle_result_cache.stats()
         return stats
 
     def acquire(self):
@@ -136,13 +325,8 @@ class OraclePoolManager:
             raise RuntimeError("Pool Oracle non initialisé")
         return self._pool.acquire()
 
-    @retry(
-        reraise=True,
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=0.5, min=1, max=5),
-        retry=retry_if_exception_type(Exception),
-    )
-    def execute_select(self, query: str, max_rows: int = 1000) -> Tuple[List[str], List[Dict[str, Any]]]:
+    def check_select(self, query: str) -> None:
+        """Vérifie que le pool est prêt et que la requête est un SELECT (ValueError sinon)"""
         if not self.is_initialized or not self._pool:
             raise RuntimeError("Pool Oracle non initialisé")
 
@@ -150,21 +334,477 @@ class OraclePoolManager:
         if not normalized.startswith("select"):
             raise ValueError("Seules les requêtes SELECT sont autorisées via execute_select")
 
+    @retry(
+        reraise=True,
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=0.5, min=1, max=5),
+        retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+        before_sleep=_record_retry,
+    )
+    def _select_with_timings(self, query: str, max_rows: int, result_format: str = "rows",
+                             binds: Any = None) -> Tuple[List[str], Any, float, float, int]:
+        """Exécute le SELECT; retourne aussi les durées d'acquisition et d'exécution (ms)
+        et le nombre de lignes lues.
+
+        result_format: "rows" (liste de dictionnaires), "columnar" (tableaux
+        par colonne avec types) ou "arrow" (octets Arrow IPC). binds: valeurs
+        des variables de liaison (dict pour :nom, liste pour :1, :2...).
+        """
+        self.check_select(query)
+
+        started = time.perf_counter()
         with self._pool.acquire() as connection:
+            acquired = time.perf_counter()
             with connection.cursor() as cursor:
                 cursor.arraysize = min(max_rows, 100000)
-                cursor.execute(query)
-                colnames = [d[0] for d in cursor.description]
+                cursor.outputtypehandler = lob_output_type_handler
+                cursor.execute(query, binds)
+                description = cursor.description
                 rows = cursor.fetchmany(numRows=max_rows)
-                data = [
-                    {colnames[i]: (row[i].isoformat() if hasattr(row[i], "isoformat") else row[i]) for i in range(len(colnames))}
-                    for row in rows
-                ]
+            finished = time.perf_counter()
+
+            # Conversion tant que la session est tenue
+            colnames = [d[0] for d in description]
+            if result_format == "columnar":
+                data = rows_to_columnar(description, rows)
+            elif result_format == "arrow":
+                data = rows_to_arrow(description, rows)
+            else:
+                data = rows_to_records(description, rows)
+        return colnames, data, (acquired - started) * 1000, (finished - acquired) * 1000, len(rows)
+
+    def _timed_select(self, query: str, max_rows: int, result_format: str, binds: Any,
+                      queue_ms: float) -> Tuple[List[str], Any, float, float]:
+        """_select_with_timings avec enregistrement de la télémétrie (succès ou erreur)"""
+        try:
+            colnames, data, acquire_ms, execution_ms, row_count = self._select_with_timings(
+                query, max_rows, result_format, binds
+            )
+        except Exception:
+            oracle_metrics.record_error(self.name)
+            raise
+        oracle_metrics.record_select(self.name, query, queue_ms, acquire_ms, execution_ms, row_count)
+        return colnames, data, acquire_ms, execution_ms
+
+    @staticmethod
+    def prepare_statement(query: str, binds: Any, auto_parameterize: Optional[bool]) -> Tuple[str, Any]:
+        """Remplace les littéraux par des binds si le paramétrage automatique est actif"""
+        if auto_parameterize is None:
+            auto_parameterize = settings.oracle_auto_parameterize if settings else False
+        # Binds positionnels fournis: pas de mélange avec des binds nommés
+        if not auto_parameterize or isinstance(binds, (list, tuple)):
+            return query, binds
+        statement, auto_binds = parameterize_sql(query, reserved=binds or {})
+        if not auto_binds:
+            return query, binds
+        return statement, {**(binds or {}), **auto_binds}
+
+    def execute_select(self, query: str, max_rows: int = 1000, result_format: str = "rows",
+                       binds: Any = None, auto_parameterize: Optional[bool] = None) -> Tuple[List[str], Any]:
+        query, binds = self.prepare_statement(query, binds, auto_parameterize)
+        colnames, data, _, _ = self._timed_select(query, max_rows, result_format, binds, 0.0)
         return colnames, data
 
+    def _select_in_worker(self, query: str, max_rows: int, result_format: str, binds: Any,
+                          submitted: float) -> Tuple[List[str], Any, Dict[str, float]]:
+        started = time.perf_counter()
+        colnames, data, acquire_ms, execution_ms = self._timed_select(
+            query, max_rows, result_format, binds, (started - submitted) * 1000
+        )
+        return colnames, data, {
+            # Attente dans la file de l'exécuteur + acquisition de la session
+            "queue_wait_ms": round((started - submitted) * 1000 + acquire_ms, 2),
+            "execution_ms": round(execution_ms, 2),
+            "total_ms": round((time.perf_counter() - submitted) * 1000, 2),
+        }
 
-# Instance globale du pool
-oracle_pool = OraclePoolManager()
+    async def run_in_worker(self, fn: Any, *args: Any) -> Any:
+        """Exécute fn (appels bloquants au driver) sur l'exécuteur borné du pool"""
+        if self._executor is None:
+            raise RuntimeError("Pool Oracle non initialisé")
+        self._pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def _run_select(self, query: str, max_rows: int, result_format: str,
+                          binds: Any) -> Tuple[List[str], Any, Dict[str, float]]:
+        return await self.run_in_worker(
+            self._select_in_worker, query, max_rows, result_format, binds, time.perf_counter()
+        )
+
+    async def _probe_value(self, probe_query: str) -> Any:
+        """Première valeur de la requête sonde (ex. SELECT MAX(ORA_ROWSCN) FROM t)"""
+        _, rows, _ = await self._run_select(probe_query, 1, "rows", None)
+        return next(iter(rows[0].values()), None) if rows else None
+
+    async def execute_select_async(self, query: str, max_rows: int = 1000, result_format: str = "rows",
+                                   binds: Any = None, cache_ttl_seconds: Optional[float] = None,
+                                   cache_probe: Optional[str] = None,
+                                   auto_parameterize: Optional[bool] = None) -> Tuple[List[str], Any, Dict[str, Any]]:
+        """Version awaitable de execute_select, exécutée hors de la boucle d'événements.
+
+        Retourne (colonnes, données, durées) avec l'attente (file + acquisition)
+        et l'exécution mesurées séparément; la conversion des données se fait
+        aussi dans le thread de travail.
+
+        Avec cache_ttl_seconds > 0 (défaut: oracle_result_cache_default_ttl_seconds),
+        le résultat passe par le cache de résultats: les requêtes identiques
+        concurrentes partagent une exécution et les suivantes sont servies sans
+        session. cache_probe est une requête sonde dont le changement de valeur
+        invalide l'entrée; timings["cache"] vaut "hit", "miss", "coalesced" ou
+        "off".
+
+        auto_parameterize (défaut: oracle_auto_parameterize) remplace les
+        littéraux par des binds: les variantes d'une requête partagent alors
+        un curseur Oracle et le cache d'instructions du driver.
+        """
+        self.check_select(query)
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Format de résultat inconnu: {result_format}")
+        if self._executor is None:
+            raise RuntimeError("Pool Oracle non initialisé")
+        if cache_probe:
+            self.check_select(cache_probe)
+        query, binds = self.prepare_statement(query, binds, auto_parameterize)
+
+        if cache_ttl_seconds is None:
+            cache_ttl_seconds = settings.oracle_result_cache_default_ttl_seconds if settings else 0
+        if cache_ttl_seconds <= 0:
+            colnames, data, timings = await self._run_select(query, max_rows, result_format, binds)
+            return colnames, data, {**timings, "cache": "off"}
+
+        config = self._config
+        target = f"{config.host}:{config.port}/{config.service_name}@{config.username}" if config else ""
+        key = oracle_result_cache.make_key(target, query, binds, max_rows, result_format)
+        started = time.perf_counter()
+        (colnames, data, timings), status = await oracle_result_cache.get_or_load(
+            key,
+            cache_ttl_seconds,
+            lambda: self._run_select(query, max_rows, result_format, binds),
+            (lambda: self._probe_value(cache_probe)) if cache_probe else None,
+        )
+        if status != "miss":
+            # Durées de l'exécution d'origine remplacées par celles de cette requête
+            timings = {"queue_wait_ms": 0.0, "execution_ms": 0.0,
+                       "total_ms": round((time.perf_counter() - started) * 1000, 2)}
+        return colnames, data, {**timings, "cache": status}
+
+    def _stream_in_worker(self, query: str, binds: Any, max_rows: int, batch_size: int, submitted: float,
+                          loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue[Tuple[str, Any]]",
+                          stop: threading.Event) -> None:
+        """Producteur: lit le curseur par lots et les dépose dans la file bornée du consommateur."""
+
+        def put(item: Tuple[str, Any]) -> bool:
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except FutureTimeoutError:
+                    # Consommateur parti (client déconnecté): abandonner la lecture
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        started = time.perf_counter()
+        try:
+            with self._pool.acquire() as connection:
+                acquired = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.arraysize = batch_size
+                    cursor.prefetchrows = batch_size + 1
+                    cursor.outputtypehandler = lob_output_type_handler
+                    cursor.execute(query, binds)
+                    description = cursor.description
+                    if not put(("columns", [d[0] for d in description])):
+                        return
+
+                    row_count = 0
+                    while not stop.is_set():
+                        limit = batch_size if max_rows <= 0 else min(batch_size, max_rows - row_count)
+                        if limit <= 0:
+                            break
+                        rows = cursor.fetchmany(numRows=limit)
+                        if not rows:
+                            break
+                        row_count += len(rows)
+                        converted = [col["values"] for col in rows_to_columnar(description, rows)["columns"]]
+                        batch = [list(row) for row in zip(*converted)]
+                        if not put(("rows", batch)):
+                            return
+                finished = time.perf_counter()
+            oracle_metrics.record_select(
+                self.name, query, (started - submitted) * 1000, (acquired - started) * 1000,
+                (finished - acquired) * 1000, row_count
+            )
+            put(("end", {
+                "rowCount": row_count,
+                "timings": {
+                    "queue_wait_ms": round((acquired - submitted) * 1000, 2),
+                    "execution_ms": round((finished - acquired) * 1000, 2),
+                    "total_ms": round((finished - submitted) * 1000, 2),
+                },
+            }))
+        except Exception as e:
+            logger.error(f"Oracle stream select error: {e}")
+            oracle_metrics.record_error(self.name)
+            put(("error", str(e)))
+
+    def stream_select(self, query: str, max_rows: int = 0, batch_size: int = 1000, binds: Any = None,
+                      auto_parameterize: Optional[bool] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Exécute un SELECT et produit ses lignes par lots, sans tout charger en mémoire.
+
+        Événements produits: ("columns", noms) une fois, ("rows", lot de
+        lignes en listes) pour chaque lot, puis ("end", {rowCount, timings})
+        ou ("error", message). Au plus deux lots sont en mémoire à la fois;
+        max_rows <= 0 lit tout le résultat. Pas de retry: un flux entamé ne
+        peut pas être rejoué.
+
+        Les vérifications (SELECT, pool initialisé) et le paramétrage sont
+        faits dès l'appel, avant l'envoi du statut HTTP: seule la lecture est
+        différée dans le générateur retourné.
+        """
+        self.check_select(query)
+        if self._executor is None:
+            raise RuntimeError("Pool Oracle non initialisé")
+        query, binds = self.prepare_statement(query, binds, auto_parameterize)
+        return self._stream_events(query, max_rows, max(1, min(batch_size, 100000)), binds)
+
+    async def _stream_events(self, query: str, max_rows: int, batch_size: int,
+                             binds: Any) -> AsyncIterator[Tuple[str, Any]]:
+        loop = asyncio.get_running_loop()
+        queue: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+
+        self._pending += 1
+        loop.run_in_executor(
+            self._executor, self._stream_in_worker,
+            query, binds, max_rows, batch_size, time.perf_counter(), loop, queue, stop
+        )
+        try:
+            while True:
+                event, payload = await queue.get()
+                yield event, payload
+                if event in ("end", "error"):
+                    break
+        finally:
+            stop.set()
+            self._pending -= 1
+
+
+PoolKey = Tuple[str, int, str, str, str]
+
+
+class OraclePoolRegistry:
+    """Registre de pools Oracle nommés, un par cible (host, port, service, user, mode).
+
+    - Création paresseuse au premier usage, réutilisation ensuite
+    - Taille propre à chaque pool (min/max/increment de sa configuration)
+    - Fermeture des pools inactifs au-delà de idle_timeout_seconds (sauf pools épinglés)
+    """
+
+    def __init__(self, idle_timeout_seconds: float = 900, eviction_interval_seconds: float = 60) -> None:
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.eviction_interval_seconds = eviction_interval_seconds
+        self._pools: Dict[PoolKey, OraclePoolManager] = {}
+        self._last_used: Dict[PoolKey, float] = {}
+        self._pinned: set = set()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key_for(config: OraclePoolConfig) -> PoolKey:
+        return (
+            config.host.strip().lower(),
+            int(config.port),
+            config.service_name.strip().lower(),
+            config.username.strip().upper(),
+            (config.driver_mode or "thin").lower(),
+        )
+
+    @staticmethod
+    def pool_name(key: PoolKey) -> str:
+        host, port, service, user, mode = key
+        return f"{user}@{host}:{port}/{service} ({mode})"
+
+    def adopt(self, manager: OraclePoolManager, pinned: bool = True) -> None:
+        """Enregistre un pool déjà initialisé (ex. pool de démarrage), épinglé par défaut"""
+        if not manager.is_initialized or manager.config is None:
+            return
+        key = self.key_for(manager.config)
+        with self._lock:
+            self._pools[key] = manager
+            self._last_used[key] = time.monotonic()
+            if pinned:
+                self._pinned.add(key)
+
+    def get(self, config: OraclePoolConfig) -> OraclePoolManager:
+        """Pool de la cible, créé au besoin (bloquant: appeler via asyncio.to_thread)
+
+        Un nouveau pool n'est publié qu'après l'acquisition d'une session. Pour
+        une cible déjà enregistrée avec un autre mot de passe, le pool candidat
+        est créé et vérifié à part: le pool en service n'est remplacé qu'en cas
+        de succès, et fermé seulement après la fin de ses requêtes et curseurs.
+        """
+        key = self.key_for(config)
+        with self._lock:
+            manager = self._pools.get(key)
+            replacing = (
+                manager is not None and manager.config is not None
+                and manager.config.password != config.password
+            )
+            if manager is None:
+                manager = OraclePoolManager()
+                self._pools[key] = manager
+            if not replacing:
+                self._last_used[key] = time.monotonic()
 
+        if replacing:
+            return self._replace(key, manager, config)
 
+        # Initialisation hors du verrou du registre (verrou propre au pool)
+        try:
+            if not manager.init_pool(config):
+                raise RuntimeError(f"Échec d'initialisation du pool Oracle {self.pool_name(key)}")
+            self._verify(manager)
+        except Exception:
+            with self._lock:
+                if self._pools.get(key) is manager:
+                    self._pools.pop(key, None)
+                    self._last_used.pop(key, None)
+            self._close_later(manager)
+            raise
+        return manager
+
+    def _replace(self, key: PoolKey, current: OraclePoolManager, config: OraclePoolConfig) -> OraclePoolManager:
+        """Crée et vérifie un pool candidat, puis le substitue à current"""
+        candidate = OraclePoolManager()
+        try:
+            if not candidate.init_pool(config):
+                raise RuntimeError(f"Échec d'initialisation du pool Oracle {self.pool_name(key)}")
+            self._verify(candidate)
+        except Exception:
+            # Identifiants refusés: le pool en service (épinglé ou non) reste en place
+            self._close_later(candidate)
+            raise
+
+        with self._lock:
+            # current, ou le pool installé entre-temps par un autre appel
+            replaced = self._pools.get(key)
+            self._pools[key] = candidate
+            self._last_used[key] = time.monotonic()
+        if replaced is not None:
+            logger.info(f"Pool Oracle remplacé (nouveaux identifiants): {self.pool_name(key)}")
+            self._close_later(replaced)
+        return candidate
+
+    @staticmethod
+    def _verify(manager: OraclePoolManager) -> None:
+        """Acquiert une session: identifiants et joignabilité validés avant usage"""
+        with manager.acquire() as connection:
+            connection.ping()
+
+    def discard(self, config: OraclePoolConfig) -> None:
+        """Retire et ferme le pool d'une cible dont la connexion a échoué.
+
+        Sans effet pour un pool épinglé, ou si le pool enregistré a d'autres
+        identifiants que ceux de l'appel (il n'est pas en cause).
+        """
+        key = self.key_for(config)
+        with self._lock:
+            if key in self._pinned:
+                return
+            manager = self._pools.get(key)
+            if manager is None or (manager.config is not None and manager.config.password != config.password):
+                return
+            self._pools.pop(key, None)
+            self._last_used.pop(key, None)
+        self._close_later(manager)
+
+    @staticmethod
+    def _close_later(manager: OraclePoolManager) -> None:
+        # La fermeture attend les requêtes en cours et, dans la limite du délai
+        # d'inactivité des curseurs, les curseurs de pagination: hors du thread appelant
+        held_timeout = settings.oracle_cursor_idle_timeout_seconds if settings else 300
+
+        def close() -> None:
+            deadline = time.monotonic() + held_timeout
+            while manager.held_sessions > 0 and time.monotonic() < deadline:
+                time.sleep(1)
+            manager.close()
+
+        threading.Thread(target=close, name="oracle-pool-close", daemon=True).start()
+
+    def evict_idle(self) -> int:
+        """Ferme les pools non épinglés, sans requête ni curseur en cours, inactifs depuis idle_timeout_seconds"""
+        deadline = time.monotonic() - self.idle_timeout_seconds
+        evicted: List[Tuple[PoolKey, OraclePoolManager]] = []
+        with self._lock:
+            for key, manager in list(self._pools.items()):
+                if key in self._pinned or manager.pending > 0 or manager.held_sessions > 0:
+                    continue
+                if self._last_used.get(key, 0) < deadline:
+                    evicted.append((key, self._pools.pop(key)))
+                    self._last_used.pop(key, None)
+        for key, manager in evicted:
+            logger.info(f"Pool Oracle inactif fermé: {self.pool_name(key)}")
+            self._close_later(manager)
+        return len(evicted)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.eviction_interval_seconds)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Éviction des pools Oracle inactifs: {e}")
+
+    def start(self) -> None:
+        """Démarre l'éviction périodique (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def close_all(self) -> None:
+        with self._lock:
+            managers = list(self._pools.values())
+            self._pools.clear()
+            self._last_used.clear()
+            self._pinned.clear()
+        for manager in managers:
+            manager.close()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._pools.items())
+            last_used = dict(self._last_used)
+            pinned = set(self._pinned)
+        return {
+            self.pool_name(key): {
+                **manager.stats(),
+                "pinned": key in pinned,
+                "idle_seconds": round(now - last_used.get(key, now), 1),
+            }
+            for key, manager in items
+        }
+
+
+# Instance globale du pool
+oracle_pool = OraclePoolManager()
 
+# Registre des pools par cible; le pool de démarrage y est épinglé
+oracle_pools = OraclePoolRegistry(
+    idle_timeout_seconds=settings.oracle_pool_idle_timeout_seconds if settings else 900,
+)
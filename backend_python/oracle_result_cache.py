@@ -0,0 +1,201 @@
+"""Cache des résultats des SELECT Oracle (lecture seule).
+
+Les panneaux du tableau de bord et l'éditeur SQL soumettent souvent les mêmes
+requêtes: chaque exécution coûte une session du pool et une charge sur la base
+auditée. Ce cache garde les résultats en mémoire:
+
+- clé: texte SQL normalisé + valeurs de binds + max_rows + format + cible;
+- durée de vie propre à chaque requête (TTL);
+- budget mémoire (estimation en octets) avec éviction LRU;
+- single-flight: les exécutions concurrentes d'une même requête partagent
+  une seule exécution;
+- invalidation optionnelle par requête sonde peu coûteuse (ex.
+  ``SELECT MAX(ORA_ROWSCN) FROM t`` ou ``SELECT MAX(event_timestamp) ...``):
+  si la valeur change, l'entrée est rechargée.
+"""
+from __future__ import annotations
+
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+from oracle_sql import normalize_sql
+
+try:
+    from config import settings  # type: ignore
+except Exception:  # pragma: no cover
+    settings = None  # type: ignore
+
+_SIZE_SAMPLE = 50
+
+
+def _sampled_json_size(values: Any) -> int:
+    if not isinstance(values, list) or len(values) <= _SIZE_SAMPLE:
+        return len(json.dumps(values, default=str))
+    sample = json.dumps(values[:_SIZE_SAMPLE], default=str)
+    return len(sample) * len(values) // _SIZE_SAMPLE
+
+
+def estimate_size(value: Any) -> int:
+    """Taille approximative en octets d'un résultat (échantillonnage des lignes)"""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(estimate_size(item) for item in value)
+    if isinstance(value, dict) and isinstance(value.get("columns"), list):
+        # Résultat columnar: un tableau de valeurs par colonne
+        return sum(
+            _sampled_json_size(col.get("values", [])) if isinstance(col, dict) else 0
+            for col in value["columns"]
+        )
+    return _sampled_json_size(value)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    probe_value: Any = None
+    probe_checked_at: float = 0.0
+
+
+def _retrieve_exception(task: "asyncio.Task") -> None:
+    """Évite l'avertissement "exception never retrieved" si aucun appelant n'attend plus"""
+    if not task.cancelled():
+        task.exception()
+
+
+class OracleResultCache:
+    """LRU borné en octets, TTL par entrée, single-flight et invalidation par sonde.
+
+    Toutes les opérations s'exécutent sur la boucle d'événements: pas de verrou.
+    """
+
+    def __init__(self, max_bytes: int, probe_interval_seconds: float = 5.0):
+        self.max_bytes = max_bytes
+        self.probe_interval_seconds = probe_interval_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(target: str, query: str, binds: Any, max_rows: int, result_format: str) -> str:
+        payload = json.dumps(
+            [target, normalize_sql(query), binds, max_rows, result_format],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, key: str, value: Any, ttl_seconds: float, probe_value: Any) -> None:
+        size = estimate_size(value)
+        self._remove(key)
+        if size > self.max_bytes:
+            logger.debug(f"Résultat Oracle trop volumineux pour le cache ({size} octets)")
+            return
+
+        now = time.monotonic()
+        self._entries[key] = _Entry(value, size, now + ttl_seconds, probe_value, now)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._counters["evictions"] += 1
+
+    async def _is_fresh(self, key: str, entry: _Entry,
+                        probe: Optional[Callable[[], Awaitable[Any]]]) -> bool:
+        now = time.monotonic()
+        if entry.expires_at <= now:
+            self._remove(key)
+            return False
+        if probe is None or now - entry.probe_checked_at < self.probe_interval_seconds:
+            return True
+
+        try:
+            current = await probe()
+        except Exception as e:
+            # Sonde en échec: on garde l'entrée jusqu'à son TTL
+            logger.warning(f"Sonde d'invalidation Oracle en échec: {e}")
+            return True
+        entry.probe_checked_at = time.monotonic()
+        if current != entry.probe_value:
+            self._remove(key)
+            self._counters["invalidations"] += 1
+            return False
+        return True
+
+    async def get_or_load(self, key: str, ttl_seconds: float, loader: Callable[[], Awaitable[Any]],
+                          probe: Optional[Callable[[], Awaitable[Any]]] = None) -> Tuple[Any, str]:
+        """Retourne (valeur, statut) avec statut "hit", "miss" ou "coalesced"."""
+        entry = self._entries.get(key)
+        if entry is not None and await self._is_fresh(key, entry, probe):
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry.value, "hit"
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._counters["coalesced"] += 1
+            return await asyncio.shield(inflight), "coalesced"
+
+        # Le chargement est une tâche propre: l'annulation d'un appelant (client
+        # déconnecté), y compris le premier, ne l'interrompt pas pour les autres
+        task = asyncio.ensure_future(self._load(key, ttl_seconds, loader, probe))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = task
+        self._counters["misses"] += 1
+        return await asyncio.shield(task), "miss"
+
+    async def _load(self, key: str, ttl_seconds: float, loader: Callable[[], Awaitable[Any]],
+                    probe: Optional[Callable[[], Awaitable[Any]]]) -> Any:
+        try:
+            # Sonde lue avant le chargement: une modification pendant l'exécution
+            # sera détectée à la vérification suivante
+            probe_value = await probe() if probe is not None else None
+            value = await loader()
+        finally:
+            self._inflight.pop(key, None)
+
+        if ttl_seconds > 0:
+            self._store(key, value, ttl_seconds, probe_value)
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """Supprime une entrée (ou tout le cache si key est None); retourne le nombre supprimé"""
+        if key is not None:
+            removed = 1 if key in self._entries else 0
+            self._remove(key)
+        else:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        self._counters["invalidations"] += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            **self._counters,
+        }
+
+
+# Instance globale du cache de résultats Oracle
+oracle_result_cache = OracleResultCache(
+    max_bytes=(settings.oracle_result_cache_max_mb if settings else 64) * 1024 * 1024,
+    probe_interval_seconds=settings.oracle_result_cache_probe_interval_seconds if settings else 5.0,
+)
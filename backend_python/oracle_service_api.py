@@ -1,9 +1,12 @@
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from loguru import logger
 
 from oracle_pool import OraclePoolManager, OraclePoolConfig, oracle_pool
+from oracle_result_cache import oracle_result_cache
 
 app = FastAPI(title="Oracle Connectivity API", version="1.0.0")
 
@@ -17,10 +20,16 @@ class InitRequest(BaseModel):
     min_sessions: int = 1
     max_sessions: int = 5
     increment: int = 1
+    statement_cache_size: int = 50
 
 class SelectRequest(BaseModel):
     query: str
     max_rows: int = 1000
+    result_format: str = "rows"  # "rows", "columnar" ou "arrow"
+    binds: Optional[Any] = None  # dict (:nom) ou liste (:1, :2...)
+    cache_ttl_seconds: Optional[float] = None  # None: TTL par défaut, 0: sans cache
+    cache_probe: Optional[str] = None  # requête sonde d'invalidation (ex. SELECT MAX(ORA_ROWSCN) FROM t)
+    auto_parameterize: Optional[bool] = None  # littéraux remplacés par des binds
 
 @app.get("/health")
 async def health() -> Dict[str, Any]:
@@ -42,6 +51,7 @@ async def init_pool(req: InitRequest) -> Dict[str, Any]:
         min_sessions=req.min_sessions,
         max_sessions=req.max_sessions,
         increment=req.increment,
+        statement_cache_size=req.statement_cache_size,
     )
     ok = oracle_pool.init_pool(cfg)
     if not ok:
@@ -52,6 +62,10 @@ async def init_pool(req: InitRequest) -> Dict[str, Any]:
 async def pool_stats() -> Dict[str, Any]:
     return oracle_pool.stats()
 
+@app.post("/result-cache/clear")
+async def clear_result_cache() -> Dict[str, Any]:
+    return {"status": "ok", "removed": oracle_result_cache.invalidate()}
+
 @app.get("/ping")
 async def ping() -> Dict[str, Any]:
     try:
@@ -67,10 +81,22 @@ async def ping() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/select")
-async def select(req: SelectRequest) -> Dict[str, Any]:
+async def select(req: SelectRequest) -> Any:
     try:
-        cols, data = oracle_pool.execute_select(req.query, req.max_rows)
-        return {"status": "ok", "columns": cols, "rows": data}
+        cols, data, timings = await oracle_pool.execute_select_async(
+            req.query, req.max_rows, req.result_format,
+            binds=req.binds, cache_ttl_seconds=req.cache_ttl_seconds, cache_probe=req.cache_probe,
+            auto_parameterize=req.auto_parameterize,
+        )
+        if req.result_format == "arrow":
+            return Response(
+                content=data,
+                media_type="application/vnd.apache.arrow.stream",
+                headers={"X-Oracle-Timings": json.dumps(timings)},
+            )
+        if req.result_format == "columnar":
+            return {"status": "ok", "format": "columnar", "columns": data["columns"], "rowCount": data["rowCount"], "timings": timings}
+        return {"status": "ok", "columns": cols, "rows": data, "timings": timings}
     except Exception as e:
         logger.error(f"Select failed: {e}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,157 @@
+"""Traitements du texte SQL Oracle: normalisation, empreinte et paramétrage.
+
+- normalize_sql: forme canonique (clé du cache de résultats);
+- fingerprint_sql: forme générique, littéraux et binds remplacés par ``?``
+  (regroupement de la télémétrie par requête);
+- parameterize_sql: remplace les littéraux d'un SELECT par des variables de
+  liaison pour que les variantes d'une même requête partagent un curseur
+  (parse « soft » au lieu de « hard » côté Oracle).
+"""
+from __future__ import annotations
+
+import re
+import hashlib
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Littéraux chaîne et identifiants entre guillemets: casse et espaces préservés
+_QUOTED_RE = re.compile(r"('(?:[^']|'')*'|\"[^\"]*\")")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"(?<![\w:.])\d+(?:\.\d+)?(?:e[+-]?\d+)?(?![\w.])", re.IGNORECASE)
+_BIND_RE = re.compile(r"(?<![\w:]):(?:\w+)")
+_IN_LIST_RE = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<qstring>[nN]?[qQ]'(?:\[.*?\]|\{.*?\}|\(.*?\)|<.*?>|(?P<qd>.).*?(?P=qd))')
+    |(?P<string>[nN]?'(?:[^']|'')*')
+    |(?P<ident>"[^"]*")
+    |(?P<bind>:(?:\w+))
+    |(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?(?![\w$#]))
+    |(?P<word>[A-Za-z_][\w$#]*)
+    |(?P<open>\()
+    |(?P<close>\))
+    |(?P<other>\s+|.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# Mots-clés qui ouvrent une clause au niveau de parenthèses courant
+_CLAUSES = {
+    "select", "from", "where", "group", "having", "order", "connect", "start",
+    "fetch", "offset", "union", "intersect", "minus", "except", "on", "using",
+}
+# Clauses où un littéral ne peut pas devenir un bind sans changer le sens
+# (liste du SELECT: nom de colonne; ORDER/GROUP BY: position de colonne)
+_LITERAL_CLAUSES = {"select", "group", "order"}
+# Littéraux typés (DATE '...', TIMESTAMP '...', INTERVAL '...') et
+# arguments littéraux obligatoires (types, SAMPLE, PARTITION)
+_TYPED_LITERAL_PREFIXES = {"date", "timestamp", "interval"}
+_LITERAL_ARGUMENT_WORDS = {
+    "varchar2", "varchar", "nvarchar2", "char", "nchar", "number", "float", "raw",
+    "timestamp", "interval", "day", "second", "year", "month", "sample", "partition",
+    "subpartition", "decimal", "numeric", "urowid",
+}
+
+AUTO_BIND_PREFIX = "p_auto_"
+
+
+def normalize_sql(query: str) -> str:
+    """Texte SQL canonique: espaces compactés, casse ignorée hors littéraux, sans ';' final."""
+    parts = _QUOTED_RE.split(query.strip().rstrip(";").strip())
+    normalized = []
+    for index, part in enumerate(parts):
+        if index % 2:
+            # Les indices impairs sont les segments entre quotes
+            normalized.append(part)
+        elif part:
+            collapsed = " ".join(part.lower().split())
+            lead = " " if part[0].isspace() and index else ""
+            trail = " " if part[-1].isspace() and index < len(parts) - 1 else ""
+            normalized.append(f"{lead}{collapsed}{trail}" if collapsed else " ")
+    return "".join(normalized)
+
+
+def fingerprint_sql(query: str) -> Tuple[str, str]:
+    """(empreinte, texte) d'une requête: SQL normalisé, littéraux, binds et listes IN génériques.
+
+    Une requête à littéraux et sa version paramétrée ont la même empreinte.
+    """
+    text = normalize_sql(query)
+    text = _STRING_LITERAL_RE.sub("?", text)
+    text = _BIND_RE.sub("?", text)
+    text = _NUMBER_LITERAL_RE.sub("?", text)
+    text = _IN_LIST_RE.sub("in (?)", text)
+    return hashlib.md5(text.encode("utf-8")).hexdigest()[:16], text
+
+
+def _literal_value(kind: str, text: str) -> Any:
+    if kind == "string":
+        return text[1:-1].replace("''", "'")
+    # NUMBER exact (pas de float binaire), y compris en notation exponentielle
+    if "." in text or "e" in text.lower():
+        return Decimal(text)
+    return int(text)
+
+
+def parameterize_sql(query: str, reserved: Iterable[str] = ()) -> Tuple[str, Dict[str, Any]]:
+    """Remplace les littéraux d'un SELECT par des binds nommés (:p_auto_1, ...).
+
+    Sont conservés tels quels: la liste du SELECT et les ORDER/GROUP BY (les
+    littéraux y changent le nom ou la position des colonnes), les littéraux
+    typés (DATE '...'), les arguments de types et de SAMPLE, les commentaires
+    et indications (hints). Une requête avec des binds positionnels (:1) n'est
+    pas modifiée: Oracle interdit de mélanger binds nommés et positionnels.
+    Les noms déjà utilisés (binds de la requête et ``reserved``, les binds
+    fournis par l'appelant) sont sautés dans la numérotation.
+    Retourne (texte, binds); binds vide si rien n'a été remplacé.
+    """
+    tokens: List[Tuple[str, str]] = [(m.lastgroup, m.group()) for m in _TOKEN_RE.finditer(query)]
+    if any(kind == "bind" and text[1:].isdigit() for kind, text in tokens):
+        return query, {}
+    # Noms de binds insensibles à la casse côté Oracle
+    taken = {text[1:].lower() for kind, text in tokens if kind == "bind"}
+    taken.update(name.lower() for name in reserved)
+    counter = 0
+
+    output: List[str] = []
+    binds: Dict[str, Any] = {}
+    # Pile par niveau de parenthèses: [clause courante, littéraux interdits]
+    stack: List[List[Any]] = [[None, False]]
+    previous_word = ""
+    for kind, text in tokens:
+        frame = stack[-1]
+        if kind == "word":
+            word = text.lower()
+            if word in _CLAUSES:
+                frame[0] = word
+            previous_word = word
+        elif kind == "open":
+            keep = frame[1] or previous_word in _LITERAL_ARGUMENT_WORDS
+            stack.append([frame[0], keep])
+            previous_word = ""
+        elif kind == "close":
+            if len(stack) > 1:
+                stack.pop()
+            previous_word = ""
+        elif kind in ("string", "number"):
+            bindable = (
+                not frame[1]
+                and frame[0] not in _LITERAL_CLAUSES
+                and frame[0] is not None
+                and not (kind == "string" and previous_word in _TYPED_LITERAL_PREFIXES)
+                and not (kind == "string" and text[0] in "nN")
+            )
+            if bindable:
+                counter += 1
+                while f"{AUTO_BIND_PREFIX}{counter}" in taken:
+                    counter += 1
+                name = f"{AUTO_BIND_PREFIX}{counter}"
+                binds[name] = _literal_value(kind, text)
+                text = f":{name}"
+            previous_word = ""
+        elif kind in ("bind", "qstring", "ident"):
+            previous_word = ""
+        output.append(text)
+    return "".join(output), binds
@@ -0,0 +1,206 @@
+"""Index de similarité TF-IDF incrémental sur l'historique des questions.
+
+L'index est construit une fois au démarrage depuis question_stats puis mis à
+jour à chaque nouvelle question enregistrée. Il conserve une matrice creuse
+TF-IDF normalisée (L2): une recherche top-k se résume à un produit creux
+matrice-vecteur, sans ré-apprentissage de vectoriseur.
+"""
+import re
+import math
+import threading
+from typing import Dict, List, Optional, Any
+import numpy as np
+from scipy.sparse import csr_matrix, vstack
+from loguru import logger
+from database import db_manager
+
+
+# Mots vides français (sklearn ne fournit qu'une liste anglaise)
+FRENCH_STOP_WORDS = frozenset("""
+    au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me même mes moi mon ne
+    nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+    est sont été être avoir ont fait cette cet quel quels quelle quelles combien comment
+""".split())
+
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+class QuestionSimilarityIndex:
+    """Index TF-IDF incrémental des questions normalisées.
+
+    Les nouvelles questions sont ajoutées avec l'IDF courant; l'IDF et la
+    normalisation sont recalculés entièrement lorsque le nombre de questions
+    ajoutées depuis le dernier calcul dépasse ``rebuild_ratio`` du total.
+    """
+
+    def __init__(self, min_similarity: float = 0.1, rebuild_ratio: float = 0.1):
+        self.min_similarity = min_similarity
+        self.rebuild_ratio = rebuild_ratio
+        self._lock = threading.RLock()
+        self._vocabulary: Dict[str, int] = {}
+        self._doc_freq: List[int] = []
+        self._questions: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._counts: List[int] = []
+        self._term_counts: List[Dict[int, int]] = []
+        self._idf: np.ndarray = np.zeros(0)
+        self._matrix: Optional[csr_matrix] = None
+        self._pending_rows: List[csr_matrix] = []
+        self._added_since_rebuild = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._questions)
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in FRENCH_STOP_WORDS]
+
+    async def load(self):
+        """Construire l'index depuis tout l'historique de question_stats"""
+        rows = await db_manager.fetch_sqlite_query_async(
+            "SELECT normalized_question, count FROM question_stats"
+        )
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add_document(row["normalized_question"], row["count"] or 1)
+            self._rebuild()
+            self.loaded = True
+        logger.info(f"Index de similarité des questions construit: {len(self)} questions")
+
+    def _reset(self):
+        self._vocabulary.clear()
+        self._doc_freq.clear()
+        self._questions.clear()
+        self._positions.clear()
+        self._counts.clear()
+        self._term_counts.clear()
+        self._idf = np.zeros(0)
+        self._matrix = None
+        self._pending_rows.clear()
+        self._added_since_rebuild = 0
+
+    def _add_document(self, question: str, count: int) -> Dict[int, int]:
+        term_counts: Dict[int, int] = {}
+        for token in self.tokenize(question):
+            term_id = self._vocabulary.get(token)
+            if term_id is None:
+                term_id = len(self._vocabulary)
+                self._vocabulary[token] = term_id
+                self._doc_freq.append(0)
+            term_counts[term_id] = term_counts.get(term_id, 0) + 1
+        for term_id in term_counts:
+            self._doc_freq[term_id] += 1
+        self._positions[question] = len(self._questions)
+        self._questions.append(question)
+        self._counts.append(count)
+        self._term_counts.append(term_counts)
+        return term_counts
+
+    def _term_idf(self, term_id: int) -> float:
+        if term_id < len(self._idf):
+            return float(self._idf[term_id])
+        # Terme apparu après le dernier calcul: IDF lissé d'un terme rare
+        return math.log((1 + len(self._questions)) / 2) + 1.0
+
+    def _weighted_row(self, term_counts: Dict[int, int]) -> csr_matrix:
+        """Vecteur TF-IDF normalisé (L2) d'un document, à l'IDF courant"""
+        indices = list(term_counts.keys())
+        data = np.array([term_counts[i] * self._term_idf(i) for i in indices], dtype=np.float64)
+        norm = np.linalg.norm(data)
+        if norm > 0:
+            data /= norm
+        return csr_matrix(
+            (data, ([0] * len(indices), indices)),
+            shape=(1, max(len(self._vocabulary), 1))
+        )
+
+    def _rebuild(self):
+        """Recalculer l'IDF et la matrice normalisée (opérations vectorisées, sans fit)"""
+        n_docs = len(self._questions)
+        n_terms = max(len(self._vocabulary), 1)
+        df = np.asarray(self._doc_freq, dtype=np.float64)
+        self._idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for term_counts in self._term_counts:
+            indices.extend(term_counts.keys())
+            data.extend(term_counts.values())
+            indptr.append(len(indices))
+        matrix = csr_matrix(
+            (np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr)),
+            shape=(n_docs, n_terms)
+        )
+        matrix = matrix.multiply(self._idf[np.newaxis, :n_terms] if len(self._idf) else 1.0).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        self._matrix = csr_matrix(matrix.multiply(1.0 / norms[:, np.newaxis]))
+        self._pending_rows.clear()
+        self._added_since_rebuild = 0
+
+    def _current_matrix(self) -> Optional[csr_matrix]:
+        if not self._questions:
+            return None
+        if self._matrix is None or self._added_since_rebuild > self.rebuild_ratio * len(self._questions):
+            self._rebuild()
+        elif self._pending_rows:
+            n_terms = max(len(self._vocabulary), 1)
+            blocks = []
+            for block in [self._matrix] + self._pending_rows:
+                block = block.copy()
+                block.resize((block.shape[0], n_terms))
+                blocks.append(block)
+            self._matrix = vstack(blocks, format="csr")
+            self._pending_rows.clear()
+        return self._matrix
+
+    def add(self, question: str, count: int = 1):
+        """Enregistrer une occurrence de question (ajout incrémental si nouvelle)"""
+        with self._lock:
+            position = self._positions.get(question)
+            if position is not None:
+                self._counts[position] += count
+                return
+            term_counts = self._add_document(question, count)
+            self._pending_rows.append(self._weighted_row(term_counts))
+            self._added_since_rebuild += 1
+
+    def search(self, question: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """Questions les plus similaires (similarité cosinus > min_similarity)"""
+        with self._lock:
+            matrix = self._current_matrix()
+            if matrix is None:
+                return []
+
+            term_counts: Dict[int, int] = {}
+            for token in self.tokenize(question):
+                term_id = self._vocabulary.get(token)
+                if term_id is not None:
+                    term_counts[term_id] = term_counts.get(term_id, 0) + 1
+            if not term_counts:
+                return []
+
+            query = self._weighted_row(term_counts)
+            query.resize((1, matrix.shape[1]))
+            similarities = (matrix @ query.T).toarray().ravel()
+
+            k = min(limit, len(similarities))
+            top = np.argpartition(-similarities, k - 1)[:k]
+            top = top[np.argsort(-similarities[top])]
+
+            return [
+                {
+                    "question": self._questions[idx],
+                    "count": self._counts[idx],
+                    "similarity": float(similarities[idx])
+                }
+                for idx in top
+                if similarities[idx] > self.min_similarity
+            ]
+
+
+# Instance globale de l'index de similarité
+question_similarity_index = QuestionSimilarityIndex()
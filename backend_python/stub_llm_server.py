@@ -0,0 +1,85 @@
+"""Serveur LLM local minimal compatible avec l'API OpenAI Chat Completions.
+
+Permet de tester le chatbot (notamment /api/chat/stream) sans clé ni accès
+réseau. Les réponses sont déterministes et découpées en jetons émis avec un
+délai configurable, pour mesurer le temps avant le premier octet.
+
+Utilisation:
+    uvicorn stub_llm_server:app --port 8089
+    OPENAI_API_BASE=http://localhost:8089/v1 uvicorn main:app
+
+Variables d'environnement:
+    STUB_LLM_TOKEN_DELAY   délai entre deux jetons en secondes (défaut 0.05)
+    STUB_LLM_RESPONSE      texte de réponse (défaut: réponse d'audit générique)
+    STUB_LLM_FAIL_AFTER    coupe le flux après N jetons, sans fin de réponse (défaut 0: jamais)
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+from typing import Dict, Any, List
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+TOKEN_DELAY = float(os.getenv("STUB_LLM_TOKEN_DELAY", "0.05"))
+FAIL_AFTER = int(os.getenv("STUB_LLM_FAIL_AFTER", "0"))
+DEFAULT_RESPONSE = os.getenv(
+    "STUB_LLM_RESPONSE",
+    "Voici l'analyse des données d'audit demandées. Aucune activité anormale n'a été détectée "
+    "sur la période; les actions observées correspondent aux habitudes des utilisateurs."
+)
+
+app = FastAPI(title="Stub LLM")
+
+
+def _tokens(text: str) -> List[str]:
+    """Découper le texte en jetons (mots suivis de leur espace)"""
+    words = text.split(" ")
+    return [word + " " for word in words[:-1]] + words[-1:]
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason=None) -> str:
+    payload = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+    }
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "stub")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(TOKEN_DELAY * len(_tokens(DEFAULT_RESPONSE)))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": DEFAULT_RESPONSE},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    async def event_generator():
+        yield _chunk(completion_id, model, {"role": "assistant"})
+        for index, token in enumerate(_tokens(DEFAULT_RESPONSE)):
+            if FAIL_AFTER and index >= FAIL_AFTER:
+                # Connexion interrompue en cours de réponse (ni finish_reason ni [DONE])
+                raise ConnectionError("flux LLM interrompu")
+            await asyncio.sleep(TOKEN_DELAY)
+            yield _chunk(completion_id, model, {"content": token})
+        yield _chunk(completion_id, model, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
@@ -0,0 +1,49 @@
+"""Tests de l'index d'autocomplétion (trie pondéré + trigrammes)"""
+from autocomplete_index import AutocompleteIndex, load_question_templates
+
+
+def build():
+    index = AutocompleteIndex(top_k=3)
+    index.add("Liste des utilisateurs", weight=5)
+    index.add("Liste des tables", weight=2)
+    index.add("Liste des connexions échouées", weight=8)
+    index.add("Combien de sessions actives", weight=1)
+    return index
+
+
+def test_prefix_suggestions_are_ordered_by_weight():
+    assert build().suggest("liste  DES", limit=5) == [
+        "Liste des connexions échouées", "Liste des utilisateurs", "Liste des tables"
+    ]
+
+
+def test_repeated_phrase_climbs_the_ranking():
+    index = build()
+    index.add("liste des tables", weight=10)
+    assert index.suggest("liste", limit=1) == ["Liste des tables"]
+    assert index.most_frequent(2) == ["Liste des tables", "Liste des connexions échouées"]
+    assert len(index) == 4
+
+
+def test_trigrams_complete_infix_and_typo_matches():
+    index = build()
+    assert index.suggest("sessoins actives") == ["Combien de sessions actives"]
+    assert index.suggest("zzz") == []
+
+
+def test_top_k_keeps_heaviest_phrases_per_node():
+    index = build()
+    index.add("Liste des index", weight=1)
+    # top_k=3: la phrase la plus légère n'entre pas dans le nœud "liste"
+    assert "Liste des index" not in index.suggest("liste", limit=3)
+
+
+def test_templates_are_read_without_importing(tmp_path):
+    path = tmp_path / "templates.py"
+    path.write_text(
+        "import unavailable_module\n"
+        "QUESTION_TEMPLATES = [{'question': 'Qui est connecté ?'}, {'sql': 'SELECT 1'}]\n",
+        encoding="utf-8",
+    )
+    assert load_question_templates(path) == ["Qui est connecté ?"]
+    assert load_question_templates(tmp_path / "missing.py") == []
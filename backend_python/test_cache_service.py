@@ -0,0 +1,51 @@
+"""Tests du cache des requêtes (niveau mémoire, hits par lots, écriture différée)"""
+import pytest
+
+import cache_service
+import write_behind
+from cache_service import CacheService, query_memory_cache
+from config import settings
+from database import DatabaseManager
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "sqlite_db_path", str(tmp_path / "cache.db"))
+    db = DatabaseManager()
+    assert db.connect_sqlite()
+    monkeypatch.setattr(cache_service, "db_manager", db)
+    monkeypatch.setattr(write_behind, "db_manager", db)
+    query_memory_cache.clear()
+    yield db
+    query_memory_cache.clear()
+    db.sqlite_conn.close()
+
+
+def stored_hit_count(db, query):
+    rows = db.fetch_sqlite_query(
+        "SELECT hit_count FROM query_cache WHERE query_hash = ?", (CacheService.generate_query_hash(query),)
+    )
+    return rows[0]["hit_count"]
+
+
+@pytest.mark.asyncio
+async def test_hits_before_write_behind_flush_are_counted(sqlite_db):
+    await CacheService.cache_query_result("Liste des utilisateurs", {"rows": 3})
+    for _ in range(2):
+        assert (await CacheService.get_cached_query("liste des utilisateurs"))["cached"]
+
+    # La ligne query_cache n'est pas encore écrite: le vidage des hits doit la créer d'abord
+    await CacheService.flush_hit_counters()
+    assert stored_hit_count(sqlite_db, "liste des utilisateurs") == 3
+
+
+@pytest.mark.asyncio
+async def test_caching_again_keeps_hit_count(sqlite_db):
+    await CacheService.cache_query_result("tables modifiées", {"rows": 1})
+    await CacheService.get_cached_query("tables modifiées")
+    await CacheService.flush_hit_counters()
+
+    await CacheService.cache_query_result("tables modifiées", {"rows": 2})
+    await write_behind.write_behind_queue.flush()
+    assert stored_hit_count(sqlite_db, "tables modifiées") == 2
+    assert (await CacheService.get_cached_query("tables modifiées"))["result"] == {"rows": 2}
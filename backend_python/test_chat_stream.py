@@ -0,0 +1,98 @@
+"""Test de /api/chat/stream contre le serveur LLM local (stub_llm_server)"""
+import json
+import socket
+import threading
+import time
+
+import openai
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+import main
+import stub_llm_server
+from cache_service import CacheService, QuestionStatsService
+
+QUESTION = "Quels utilisateurs ont exécuté des requêtes ?"
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub_llm_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def client(stub_url, monkeypatch):
+    monkeypatch.setattr(openai, "api_base", stub_url)
+    monkeypatch.setattr(stub_llm_server, "TOKEN_DELAY", 0)
+    service = main.openai_service
+
+    async def no_cache(*args, **kwargs):
+        return None
+
+    async def audit_results(analysis):
+        return {"analysis_type": "user_activity", "results": [{"username": "SCOTT", "total_actions": 3}]}
+
+    stored = []
+
+    async def store_response(message, analysis, chat_response, user_id=None):
+        stored.append(chat_response)
+
+    monkeypatch.setattr(CacheService, "get_cached_query", no_cache)
+    monkeypatch.setattr(CacheService, "get_semantic_answer", no_cache)
+    monkeypatch.setattr(QuestionStatsService, "update_question_stats", no_cache)
+    monkeypatch.setattr(service, "_fetch_audit_results", audit_results)
+    monkeypatch.setattr(service, "_store_response", store_response)
+    monkeypatch.setattr(service.nlp_service, "find_similar_questions", lambda message, limit=5: [])
+    # Pas de lifespan: ni MongoDB ni SQLite
+    client = TestClient(main.app)
+    client.stored = stored
+    return client
+
+
+def sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_analysis_table_tokens_then_done_and_caches(client):
+    response = client.post("/api/chat/stream", json={"message": QUESTION})
+    assert response.status_code == 200
+    events = sse_events(response.text)
+
+    names = [name for name, _ in events]
+    assert names[:2] == ["analysis", "table"]
+    assert names[-1] == "done"
+    assert set(names[2:-1]) == {"token"} and len(names) > 4
+    assert events[0][1]["intent"] == "USER_ACTIVITY"
+    assert events[1][1]["rows"] == [["SCOTT", 3, None, None]]
+
+    text = "".join(data for name, data in events if name == "token")
+    assert text == stub_llm_server.DEFAULT_RESPONSE
+    assert events[-1][1]["complete"] is True
+
+    assert [r.response for r in client.stored] == [stub_llm_server.DEFAULT_RESPONSE]
+
+
+def test_interrupted_stream_is_not_cached(client, monkeypatch):
+    monkeypatch.setattr(stub_llm_server, "FAIL_AFTER", 3)
+    events = sse_events(client.post("/api/chat/stream", json={"message": QUESTION}).text)
+
+    assert [name for name, _ in events][-1] == "done"
+    text = "".join(data for name, data in events if name == "token")
+    assert text == "".join(stub_llm_server._tokens(stub_llm_server.DEFAULT_RESPONSE)[:3])
+    assert events[-1][1]["complete"] is False
+    assert client.stored == []
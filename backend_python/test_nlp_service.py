@@ -0,0 +1,59 @@
+"""Tests du moteur intentions/entités à mots-clés (literal_gate)"""
+import pytest
+
+from nlp_service import NLPService, literal_gate
+
+
+@pytest.mark.parametrize("pattern, gate", [
+    (r"user\s+([A-Za-z0-9_-]+)", {"user"}),
+    (r"(?:aujourd'hui|hier|cette semaine|ce mois)", {"aujourd'hui", "hier", "cette semaine", "ce mois"}),
+    # Un quantificateur rend le dernier caractère optionnel
+    (r"(?:sécurité|accès|permissions?)", {"sécurité", "accès", "permission"}),
+    (r"(SQL Developer|Toad|DBeaver)", {"sql developer", "toad", "dbeaver"}),
+    (r"utilisateurs? .*(?:exécuté|fait)", {"utilisateur"}),
+])
+def test_gate_keywords_are_mandatory_literal_prefixes(pattern, gate):
+    assert literal_gate(pattern) == frozenset(gate)
+
+
+@pytest.mark.parametrize("pattern", [
+    r"\b(SELECT|INSERT)\b",               # commence par un métacaractère
+    r"(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{4})",  # alternative sans préfixe littéral
+    r"(?:a|bc)",                           # préfixe d'un caractère: pas fiable
+    r"(?:(?:a|b)c|de)",                    # groupe imbriqué
+])
+def test_patterns_without_reliable_keyword_are_always_evaluated(pattern):
+    assert literal_gate(pattern) is None
+
+
+QUESTIONS = [
+    "Quels utilisateurs ont exécuté des DROP TABLE aujourd'hui ?",
+    "Qui a fait un ALTER sur la table EMPLOYEES du schéma HR hier",
+    "tentatives de connexion échouées pendant 3 jours depuis le poste PC042",
+    "Activité de l'utilisateur os SCOTT avec SQL Developer cette semaine",
+    "Requêtes lentes et temps de réponse ce mois",
+    "violations des permissions le 12/03/2024",
+    "bonjour",
+]
+
+
+@pytest.mark.parametrize("question", QUESTIONS)
+def test_gated_engine_matches_full_evaluation(question):
+    engine = NLPService().engine
+    every_keyword = set(engine._keyword_closure)
+    text_lower = question.lower()
+    gates = engine._present_keywords(text_lower)
+
+    assert engine._classify(text_lower, gates) == engine._classify(text_lower, every_keyword)
+    gated_entities, gated_timeframe = engine._extract(question, text_lower, gates)
+    full_entities, full_timeframe = engine._extract(question, text_lower, every_keyword)
+    assert gated_entities == full_entities
+    assert gated_timeframe.get("period") == full_timeframe.get("period")
+
+
+def test_analysis_extracts_entities_and_period():
+    _, _, entities, timeframe = NLPService().engine.analyze(QUESTIONS[1])
+    assert entities["actions"] == ["ALTER"]
+    assert entities["object_name"] == "EMPLOYEES"
+    assert entities["schema"] == "HR"
+    assert timeframe["period"] == "yesterday"
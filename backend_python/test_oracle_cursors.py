@@ -0,0 +1,22 @@
+"""Tests de la requête de pagination par clé (keyset)"""
+from oracle_cursors import keyset_query
+
+
+def test_first_page_only_orders_and_limits():
+    assert keyset_query("SELECT id, name FROM t;", ["id"], False, False) == (
+        "SELECT * FROM (SELECT id, name FROM t) keyset_q "
+        "ORDER BY id ASC FETCH FIRST :keyset_limit ROWS ONLY"
+    )
+
+
+def test_next_page_filters_strictly_after_last_key():
+    assert keyset_query("SELECT id FROM t", ["id"], False, True) == (
+        "SELECT * FROM (SELECT id FROM t) keyset_q WHERE (id > :keyset_1) "
+        "ORDER BY id ASC FETCH FIRST :keyset_limit ROWS ONLY"
+    )
+
+
+def test_composite_key_expands_tuple_comparison():
+    sql = keyset_query("SELECT * FROM audit", ["ts", "id"], True, True)
+    assert " WHERE (ts < :keyset_1) OR (ts = :keyset_1 AND id < :keyset_2) " in sql
+    assert sql.endswith("ORDER BY ts DESC, id DESC FETCH FIRST :keyset_limit ROWS ONLY")
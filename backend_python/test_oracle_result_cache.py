@@ -0,0 +1,49 @@
+"""Tests du cache de résultats Oracle (single-flight)"""
+import asyncio
+
+import pytest
+
+from oracle_result_cache import OracleResultCache
+
+
+@pytest.mark.asyncio
+async def test_cancelled_owner_does_not_cancel_coalesced_waiters():
+    cache = OracleResultCache(max_bytes=1024 * 1024)
+    release = asyncio.Event()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await release.wait()
+        return [[1, "SCOTT"]]
+
+    owner = asyncio.ensure_future(cache.get_or_load("k", 60, loader))
+    await asyncio.sleep(0)
+    waiter = asyncio.ensure_future(cache.get_or_load("k", 60, loader))
+    await asyncio.sleep(0)
+
+    # Le client du premier appelant se déconnecte pendant l'exécution
+    owner.cancel()
+    release.set()
+    assert await waiter == ([[1, "SCOTT"]], "coalesced")
+    with pytest.raises(asyncio.CancelledError):
+        await owner
+
+    # Le chargement a abouti et a été mis en cache, en une seule exécution
+    assert await cache.get_or_load("k", 60, loader) == ([[1, "SCOTT"]], "hit")
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    cache = OracleResultCache(max_bytes=1024 * 1024)
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("ORA-00942")
+
+    results = await asyncio.gather(
+        cache.get_or_load("k", 60, failing), cache.get_or_load("k", 60, failing), return_exceptions=True
+    )
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert cache.stats()["entries"] == 0 and cache.stats()["inflight"] == 0
@@ -0,0 +1,65 @@
+"""Tests du paramétrage automatique des littéraux SQL Oracle"""
+from decimal import Decimal
+
+import pytest
+
+from oracle_sql import parameterize_sql, fingerprint_sql
+from oracle_pool import OraclePoolManager
+
+
+def test_where_literals_become_named_binds():
+    sql, binds = parameterize_sql("SELECT * FROM t WHERE name = 'O''Brien' AND id = 42 AND ratio > 0.5")
+    assert sql == "SELECT * FROM t WHERE name = :p_auto_1 AND id = :p_auto_2 AND ratio > :p_auto_3"
+    assert binds == {"p_auto_1": "O'Brien", "p_auto_2": 42, "p_auto_3": Decimal("0.5")}
+
+
+def test_exponent_literals_are_bound_as_decimal():
+    _, binds = parameterize_sql("SELECT * FROM t WHERE amount > 1.5e3")
+    assert binds == {"p_auto_1": Decimal("1.5e3")}
+    assert isinstance(binds["p_auto_1"], Decimal)
+
+
+@pytest.mark.parametrize("query", [
+    # Liste du SELECT, ORDER BY / GROUP BY positionnels
+    "SELECT 1, 'x' FROM dual",
+    "SELECT a, b FROM t ORDER BY 2",
+    "SELECT a, count(*) FROM t GROUP BY a, 1",
+    # Littéraux typés, chaînes nationales et q-quotes
+    "SELECT * FROM t WHERE d > DATE '2024-01-01'",
+    "SELECT * FROM t WHERE ts > TIMESTAMP '2024-01-01 00:00:00'",
+    "SELECT * FROM t WHERE name = N'abc'",
+    "SELECT * FROM t WHERE txt = q'[it's]'",
+    # Arguments de types et SAMPLE
+    "SELECT * FROM t SAMPLE (10) WHERE CAST(x AS VARCHAR2(20)) IS NOT NULL",
+    # Commentaires et hints
+    "SELECT /*+ FIRST_ROWS(10) */ * FROM t -- WHERE id = 5",
+])
+def test_literals_that_change_the_meaning_are_kept(query):
+    assert parameterize_sql(query) == (query, {})
+
+
+def test_positional_binds_disable_parameterization():
+    query = "SELECT * FROM t WHERE id = :1 AND name = 'x'"
+    assert parameterize_sql(query) == (query, {})
+
+
+def test_auto_bind_names_skip_existing_binds():
+    sql, binds = parameterize_sql(
+        "SELECT * FROM t WHERE a = :p_auto_1 AND b = 'x' AND c = 3", reserved=["P_AUTO_2"]
+    )
+    assert sql == "SELECT * FROM t WHERE a = :p_auto_1 AND b = :p_auto_3 AND c = :p_auto_4"
+    assert binds == {"p_auto_3": "x", "p_auto_4": 3}
+
+
+def test_prepare_statement_keeps_caller_binds():
+    sql, binds = OraclePoolManager.prepare_statement(
+        "SELECT * FROM t WHERE a = :p_auto_1 AND b = 7", {"p_auto_1": "caller"}, True
+    )
+    assert sql == "SELECT * FROM t WHERE a = :p_auto_1 AND b = :p_auto_2"
+    assert binds == {"p_auto_1": "caller", "p_auto_2": 7}
+
+
+def test_parameterized_query_keeps_its_fingerprint():
+    query = "SELECT * FROM t WHERE id = 42 AND name = 'x'"
+    sql, _ = parameterize_sql(query)
+    assert fingerprint_sql(sql)[0] == fingerprint_sql(query)[0]
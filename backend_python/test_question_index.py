@@ -0,0 +1,66 @@
+"""Tests de l'index TF-IDF incrémental des questions"""
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import question_index
+from question_index import QuestionSimilarityIndex, FRENCH_STOP_WORDS
+
+QUESTIONS = [
+    "liste des utilisateurs connectés aujourd'hui",
+    "combien de connexions échouées pour admin",
+    "quelles tables ont été modifiées hier",
+    "liste des connexions échouées cette semaine",
+    "utilisateurs ayant modifié la table employees",
+]
+
+
+def build(questions):
+    index = QuestionSimilarityIndex(min_similarity=0.0)
+    for question in questions:
+        index.add(question)
+    return index
+
+
+def test_scores_match_sklearn_tfidf_after_rebuild():
+    index = build(QUESTIONS)
+    query = "connexions échouées admin"
+    results = index.search(query, limit=len(QUESTIONS))
+
+    vectorizer = TfidfVectorizer(stop_words=sorted(FRENCH_STOP_WORDS), token_pattern=r"(?u)\b\w\w+\b")
+    matrix = vectorizer.fit_transform(QUESTIONS)
+    expected = (matrix @ vectorizer.transform([query]).T).toarray().ravel()
+
+    scores = {r["question"]: r["similarity"] for r in results}
+    for question, similarity in zip(QUESTIONS, expected):
+        if similarity > 0:
+            assert scores[question] == pytest.approx(similarity)
+    assert results[0]["question"] == "combien de connexions échouées pour admin"
+
+
+def test_incremental_add_is_searchable_and_counts_repeats():
+    index = build(QUESTIONS)
+    index.search("liste")
+    index.add("audit des privilèges système")
+    index.add("audit des privilèges système", count=2)
+
+    results = index.search("privilèges système")
+    assert results[0]["question"] == "audit des privilèges système"
+    assert results[0]["count"] == 3
+    assert len(index) == len(QUESTIONS) + 1
+
+
+def test_unknown_terms_and_empty_index_return_nothing():
+    assert QuestionSimilarityIndex().search("utilisateurs") == []
+    assert build(QUESTIONS).search("zzz inconnu") == []
+
+
+@pytest.mark.asyncio
+async def test_load_builds_from_question_stats(monkeypatch):
+    async def rows(query):
+        return [{"normalized_question": q, "count": i + 1} for i, q in enumerate(QUESTIONS)]
+
+    monkeypatch.setattr(question_index.db_manager, "fetch_sqlite_query_async", rows)
+    index = QuestionSimilarityIndex()
+    await index.load()
+    assert index.loaded and len(index) == len(QUESTIONS)
+    assert index.search("tables modifiées")[0]["count"] == 3
@@ -0,0 +1,71 @@
+"""Tests du vidage par lots de la file d'écriture différée"""
+import pytest
+
+import write_behind
+from write_behind import WriteBehindQueue
+
+
+class FailingDatabase:
+    """Remplace db_manager: échoue les N premiers lots puis les enregistre"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.batches = []
+
+    async def execute_sqlite_batch_async(self, statements):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append(statements)
+
+
+def _rows(statements, table):
+    return next(params for sql, params in statements if table in sql)
+
+
+@pytest.fixture
+def database(monkeypatch):
+    def install(failures: int):
+        db = FailingDatabase(failures)
+        monkeypatch.setattr(write_behind, "db_manager", db)
+        return db
+    return install
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_batch_and_merges_new_writes(database):
+    db = database(failures=1)
+    queue = WriteBehindQueue(max_batch_size=1000, flush_interval_seconds=0.01)
+    queue.enqueue_action("chat_query", "alice", "{}")
+    queue.enqueue_query_result("h1", "q1", "old")
+    queue.enqueue_question("liste des utilisateurs", "Liste des utilisateurs")
+
+    await queue.flush()
+    assert db.batches == []
+    assert queue.pending_count == 3
+
+    # Écritures arrivées pendant l'échec: la plus récente l'emporte, les compteurs s'additionnent
+    queue.enqueue_action("chat_query", "bob", "{}")
+    queue.enqueue_query_result("h1", "q1", "new")
+    queue.enqueue_question("liste des utilisateurs", "liste des utilisateurs ?")
+
+    await queue.flush()
+    assert queue.pending_count == 0
+    statements = db.batches[0]
+    assert [row[1] for row in _rows(statements, "action_cache")] == ["alice", "bob"]
+    assert [row[2] for row in _rows(statements, "query_cache")] == ["new"]
+    assert _rows(statements, "question_stats")[0][1] == 2
+    assert len(_rows(statements, "question_variations")) == 2
+
+
+@pytest.mark.asyncio
+async def test_flush_gives_up_after_bounded_retries(database):
+    db = database(failures=10)
+    queue = WriteBehindQueue(max_batch_size=1000, flush_interval_seconds=0.01, max_flush_retries=2)
+    queue.enqueue_action("chat_query", None, "{}")
+
+    for _ in range(3):
+        await queue.flush()
+
+    assert queue.pending_count == 0
+    assert db.batches == []
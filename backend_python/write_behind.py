@@ -0,0 +1,246 @@
+"""File d'écriture différée (write-behind) pour les écritures SQLite du chatbot.
+
+Les écritures de cache (query_cache, semantic_cache, action_cache) et de statistiques de
+questions (question_stats) sont tamponnées en mémoire puis écrites par lots,
+dans une seule transaction, lorsque le tampon atteint sa taille maximale ou
+à intervalle régulier. Le tampon est vidé à l'arrêt de l'application.
+"""
+import asyncio
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+from loguru import logger
+from config import settings
+from database import db_manager
+
+
+class WriteBehindQueue:
+    """Tampon d'écritures SQLite vidé par lots (taille ou délai)"""
+
+    def __init__(self, max_batch_size: int = 200, flush_interval_seconds: float = 2.0,
+                 max_variations: int = 20, max_flush_retries: int = 5):
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_variations = max_variations
+        self.max_flush_retries = max_flush_retries
+        self._failed_flushes = 0
+        self._retry_after = 0.0
+        self._actions: List[Tuple[str, Optional[str], str, str]] = []
+        self._query_results: Dict[str, Tuple[str, str, str, str, str]] = {}
+        self._semantic_results: Dict[str, Tuple[str, str, str, Optional[str], Optional[str], str, str]] = {}
+        self._questions: Dict[str, Dict[str, Any]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._pending_flush: Optional[asyncio.Task] = None
+
+    @property
+    def pending_count(self) -> int:
+        return (
+            len(self._actions) + len(self._query_results)
+            + len(self._semantic_results) + len(self._questions)
+        )
+
+    def enqueue_action(self, action_type: str, user: Optional[str], metadata_json: str):
+        """Tamponner une ligne action_cache"""
+        # Même format que CURRENT_TIMESTAMP pour rester comparable aux lignes existantes
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        self._actions.append((action_type, user, timestamp, metadata_json))
+        self._maybe_flush()
+
+    def enqueue_query_result(self, query_hash: str, normalized_query: str, result_json: str):
+        """Tamponner une ligne query_cache (la dernière écriture d'un hash l'emporte)"""
+        now = datetime.utcnow().isoformat()
+        self._query_results[query_hash] = (query_hash, normalized_query, result_json, now, now)
+        self._maybe_flush()
+
+    def enqueue_semantic_result(self, semantic_key: str, intent: str, filters_json: str,
+                                window_start: Optional[str], window_end: Optional[str], result_json: str):
+        """Tamponner une ligne semantic_cache (la dernière écriture d'une clé l'emporte)"""
+        self._semantic_results[semantic_key] = (
+            semantic_key, intent, filters_json, window_start, window_end, result_json,
+            datetime.utcnow().isoformat()
+        )
+        self._maybe_flush()
+    
+    def enqueue_question(self, normalized_question: str, question: str):
+        """Tamponner une occurrence de question (agrégée par question normalisée)"""
+        entry = self._questions.setdefault(
+            normalized_question, {"count": 0, "last_asked": None, "variations": {}}
+        )
+        entry["count"] += 1
+        entry["last_asked"] = datetime.utcnow().isoformat()
+        entry["variations"][question] = entry["variations"].get(question, 0) + 1
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        """Déclencher un vidage asynchrone si le tampon est plein"""
+        if self.pending_count < self.max_batch_size:
+            return
+        if self._pending_flush and not self._pending_flush.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        # Après un échec, attendre la fin du délai de reprise plutôt que réessayer à chaque écriture
+        if self._failed_flushes and loop.time() < self._retry_after:
+            return
+        self._pending_flush = loop.create_task(self.flush())
+
+    def _question_statements(self, questions: Dict[str, Dict[str, Any]]) -> List[Tuple[str, list]]:
+        """Construire les UPSERT atomiques des statistiques et variations de questions"""
+        if not questions:
+            return []
+        
+        stats_params = []
+        variation_params = []
+        prune_params = []
+        for normalized, entry in questions.items():
+            stats_params.append((normalized, entry["count"], entry["last_asked"]))
+            for variation, count in entry["variations"].items():
+                variation_params.append((normalized, variation, count, entry["last_asked"]))
+            prune_params.append((normalized, self.max_variations))
+        
+        return [
+            (
+                """INSERT INTO question_stats (normalized_question, count, last_asked)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(normalized_question) DO UPDATE SET
+                       count = count + excluded.count,
+                       last_asked = excluded.last_asked""",
+                stats_params
+            ),
+            (
+                """INSERT INTO question_variations (normalized_question, variation, count, last_seen)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(normalized_question, variation) DO UPDATE SET
+                       count = count + excluded.count,
+                       last_seen = excluded.last_seen""",
+                variation_params
+            ),
+            (
+                # Ne conserver que les N variations les plus fréquentes (puis les plus récentes)
+                """DELETE FROM question_variations
+                   WHERE normalized_question = ?1 AND variation NOT IN (
+                       SELECT variation FROM question_variations
+                       WHERE normalized_question = ?1
+                       ORDER BY count DESC, last_seen DESC
+                       LIMIT ?2
+                   )""",
+                prune_params
+            ),
+        ]
+    
+    def _restore(self, actions: List[Tuple[str, Optional[str], str, str]],
+                 query_results: Dict[str, Tuple[str, str, str, str, str]],
+                 semantic_results: Dict[str, Tuple[str, str, str, Optional[str], Optional[str], str, str]],
+                 questions: Dict[str, Dict[str, Any]]):
+        """Remettre dans le tampon un lot non écrit (les écritures plus récentes l'emportent)"""
+        self._actions = actions + self._actions
+        for key, row in query_results.items():
+            self._query_results.setdefault(key, row)
+        for key, row in semantic_results.items():
+            self._semantic_results.setdefault(key, row)
+        for normalized, entry in questions.items():
+            current = self._questions.get(normalized)
+            if current is None:
+                self._questions[normalized] = entry
+                continue
+            current["count"] += entry["count"]
+            current["last_asked"] = max(current["last_asked"], entry["last_asked"])
+            for variation, count in entry["variations"].items():
+                current["variations"][variation] = current["variations"].get(variation, 0) + count
+
+    async def flush(self):
+        """Écrire le contenu du tampon dans une seule transaction SQLite"""
+        async with self._flush_lock:
+            if not self.pending_count:
+                return
+
+            actions, self._actions = self._actions, []
+            query_results, self._query_results = self._query_results, {}
+            semantic_results, self._semantic_results = self._semantic_results, {}
+            questions, self._questions = self._questions, {}
+
+            try:
+                statements = [
+                    (
+                        # Une requête remise en cache garde son compteur de hits
+                        """INSERT INTO query_cache
+                           (query_hash, normalized_query, result, hit_count, created_at, last_accessed)
+                           VALUES (?, ?, ?, 1, ?, ?)
+                           ON CONFLICT(query_hash) DO UPDATE SET
+                               normalized_query = excluded.normalized_query,
+                               result = excluded.result,
+                               created_at = excluded.created_at,
+                               last_accessed = excluded.last_accessed""",
+                        list(query_results.values())
+                    ),
+                    (
+                        """INSERT OR REPLACE INTO semantic_cache
+                           (semantic_key, intent, filters, window_start, window_end, result, created_at)
+                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                        list(semantic_results.values())
+                    ),
+                    (
+                        "INSERT INTO action_cache (action_type, user_name, timestamp, metadata) VALUES (?, ?, ?, ?)",
+                        actions
+                    ),
+                ]
+                statements.extend(self._question_statements(questions))
+                await db_manager.execute_sqlite_batch_async(statements)
+                logger.debug(
+                    f"Write-behind: {len(query_results)} requêtes, {len(semantic_results)} réponses sémantiques, "
+                    f"{len(actions)} actions, "
+                    f"{len(questions)} questions écrites"
+                )
+                self._failed_flushes = 0
+            except Exception as e:
+                self._failed_flushes += 1
+                if self._failed_flushes > self.max_flush_retries:
+                    logger.error(
+                        f"Erreur lors du vidage du tampon d'écriture ({self._failed_flushes} échecs): {e}. "
+                        f"Lot abandonné: {len(query_results)} requêtes, {len(semantic_results)} réponses "
+                        f"sémantiques, {len(actions)} actions, {len(questions)} questions"
+                    )
+                    self._failed_flushes = 0
+                    return
+                # Remettre le lot dans le tampon et espacer les reprises (backoff borné)
+                self._restore(actions, query_results, semantic_results, questions)
+                delay = self.flush_interval_seconds * 2 ** (self._failed_flushes - 1)
+                self._retry_after = asyncio.get_running_loop().time() + delay
+                logger.warning(
+                    f"Erreur lors du vidage du tampon d'écriture: {e}. "
+                    f"Lot remis en file (tentative {self._failed_flushes}/{self.max_flush_retries})"
+                )
+
+    async def _run(self):
+        """Boucle de vidage périodique"""
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            if self._failed_flushes and asyncio.get_running_loop().time() < self._retry_after:
+                continue
+            await self.flush()
+
+    def start(self):
+        """Démarrer le vidage périodique (à appeler depuis la boucle asyncio)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Arrêter le vidage périodique et écrire le reste du tampon"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Instance globale de la file d'écriture différée
+write_behind_queue = WriteBehindQueue(
+    max_batch_size=settings.write_behind_max_batch_size,
+    flush_interval_seconds=settings.write_behind_flush_seconds,
+    max_variations=settings.question_variations_max
+)
@@ -5,8 +5,10 @@ Script d'extraction avancée des données Oracle vers MongoDB
 
 import oracledb
 import pymongo
+from pymongo.errors import OperationFailure
 import os
 import json
+import hashlib
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
@@ -25,6 +27,33 @@ logger = logging.getLogger(__name__)
 # Chargement des variables d'environnement
 load_dotenv()
 
+# Nombre de lignes Oracle lues et insérées par aller-retour
+BATCH_SIZE = int(os.getenv('EXTRACT_BATCH_SIZE', 1000))
+
+# Schéma et statistiques: "diff" (seules les lignes modifiées sont écrites,
+# historique dans oracle_snapshot_changes) ou "full" (rechargement complet)
+SNAPSHOT_MODE = os.getenv('EXTRACT_SNAPSHOT_MODE', 'diff').lower()
+SNAPSHOT_HISTORY_COLLECTION = 'oracle_snapshot_changes'
+SNAPSHOT_HISTORY_DAYS = int(os.getenv('EXTRACT_SNAPSHOT_HISTORY_DAYS', 90))
+
+# Index unique des clés d'instantané: partiel, les documents chargés en mode
+# complet (sans _key) ne sont pas indexés
+SNAPSHOT_KEY_INDEX = {'name': '_key_1', 'unique': True, 'partialFilterExpression': {'_key': {'$exists': True}}}
+
+# Champs exclus de l'empreinte d'une ligne (métadonnées d'extraction)
+_SNAPSHOT_META_FIELDS = ('_id', '_key', '_hash', 'extracted_at')
+
+
+def _row_hash(document):
+    """Empreinte du contenu Oracle d'un document (hors métadonnées)"""
+    content = {k: v for k, v in document.items() if k not in _SNAPSHOT_META_FIELDS}
+    return hashlib.md5(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
 class OracleExtractor:
     def __init__(self):
         self.oracle_conn = None
@@ -54,6 +83,154 @@ class OracleExtractor:
             logger.error(f"Erreur de connexion MongoDB: {e}")
             raise
     
+    def _cursor_batches(self, cursor, to_document, batch_size=BATCH_SIZE):
+        """Lit le curseur par lots de batch_size et convertit chaque ligne"""
+        cursor.arraysize = batch_size
+        cursor.prefetchrows = batch_size
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [to_document(row) for row in rows]
+    
+    def _load_collection(self, collection_name, batches):
+        """Charge les lots dans une collection de staging puis la substitue à la cible.
+        
+        Le renommage (dropTarget) est atomique: les lecteurs voient l'ancienne
+        collection complète jusqu'à la bascule, puis la nouvelle. En cas d'échec
+        du chargement, la collection cible reste intacte.
+        """
+        target = self.mongodb_db[collection_name]
+        staging_name = f"{collection_name}_staging"
+        self.mongodb_db.drop_collection(staging_name)
+        # Créée explicitement: le renommage doit aboutir même sans aucune ligne
+        staging = self.mongodb_db.create_collection(staging_name)
+        
+        try:
+            # Reprise des index de la collection cible
+            if collection_name in self.mongodb_db.list_collection_names():
+                for name, info in target.index_information().items():
+                    if name == '_id_':
+                        continue
+                    options = {
+                        k: v for k, v in info.items()
+                        if k in ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+                    }
+                    if name == SNAPSHOT_KEY_INDEX['name']:
+                        # Index _key créé non partiel par une version précédente
+                        options = {k: v for k, v in SNAPSHOT_KEY_INDEX.items() if k != 'name'}
+                    staging.create_index(info['key'], name=name, **options)
+            
+            count = 0
+            for documents in batches:
+                if documents:
+                    staging.insert_many(documents, ordered=False)
+                    count += len(documents)
+                    logger.info(f"{collection_name}: {count} enregistrements chargés...")
+            
+            staging.rename(collection_name, dropTarget=True)
+            return count
+        except Exception:
+            self.mongodb_db.drop_collection(staging_name)
+            raise
+    
+    def _sync_snapshot(self, collection_name, batches, key_of):
+        """Synchronise une collection instantané (schéma, statistiques) par différence.
+        
+        Chaque ligne reçoit une clé (_key) et une empreinte de son contenu (_hash).
+        Seules les lignes nouvelles, modifiées ou disparues depuis l'instantané
+        précédent sont écrites, et le détail des changements (champs modifiés
+        avec ancienne et nouvelle valeur) est ajouté à l'historique.
+        La première synchronisation (ou une collection chargée en mode complet,
+        sans _key) passe par un chargement complet.
+        """
+        collection = self.mongodb_db[collection_name]
+        
+        documents = {}
+        for batch in batches:
+            for document in batch:
+                document['_key'] = key_of(document)
+                document['_hash'] = _row_hash(document)
+                documents[document['_key']] = document
+        
+        baseline = (
+            collection_name not in self.mongodb_db.list_collection_names()
+            or collection.count_documents({'_key': {'$exists': False}}, limit=1) > 0
+        )
+        if baseline:
+            count = self._load_collection(collection_name, _chunks(list(documents.values()), BATCH_SIZE))
+            self._ensure_index(collection, '_key', **SNAPSHOT_KEY_INDEX)
+            self._record_snapshot_changes(collection_name, {'baseline': True, 'counts': {'inserted': count}})
+            logger.info(f"{collection_name}: instantané initial ({count} enregistrements)")
+            return count
+        
+        previous = {d['_key']: d['_hash'] for d in collection.find({}, {'_key': 1, '_hash': 1, '_id': 0})}
+        inserted = [key for key in documents if key not in previous]
+        updated = [key for key, d in documents.items() if key in previous and previous[key] != d['_hash']]
+        deleted = [key for key in previous if key not in documents]
+        
+        changes = []
+        if updated:
+            old_documents = {d['_key']: d for d in collection.find({'_key': {'$in': updated}}, {'_id': 0})}
+            for key in updated:
+                old, new = old_documents.get(key, {}), documents[key]
+                fields = {
+                    field: [old.get(field), new.get(field)]
+                    for field in sorted(set(old) | set(new))
+                    if field not in _SNAPSHOT_META_FIELDS and old.get(field) != new.get(field)
+                }
+                changes.append({'key': key, 'fields': fields})
+        
+        operations = (
+            [pymongo.InsertOne(documents[key]) for key in inserted]
+            + [pymongo.ReplaceOne({'_key': key}, documents[key]) for key in updated]
+            + [pymongo.DeleteOne({'_key': key}) for key in deleted]
+        )
+        for chunk in _chunks(operations, BATCH_SIZE):
+            collection.bulk_write(chunk, ordered=False)
+        
+        if operations:
+            self._record_snapshot_changes(collection_name, {
+                'counts': {'inserted': len(inserted), 'updated': len(updated), 'deleted': len(deleted)},
+                'inserted': inserted,
+                'updated': changes,
+                'deleted': deleted
+            })
+        
+        logger.info(
+            f"{collection_name}: {len(documents)} lignes comparées, {len(inserted)} nouvelles, "
+            f"{len(updated)} modifiées, {len(deleted)} supprimées"
+        )
+        return len(operations)
+    
+    def _ensure_index(self, collection, keys, name, **options):
+        """create_index tolérant aux changements d'options d'un index existant de même nom.
+        
+        Nouvelle durée de rétention (TTL): modifiée en place par collMod; autre
+        option (unique, filtre partiel): index supprimé puis recréé.
+        """
+        try:
+            collection.create_index(keys, name=name, **options)
+        except OperationFailure as e:
+            # 85: IndexOptionsConflict, 86: IndexKeySpecsConflict
+            if e.code not in (85, 86):
+                raise
+            if set(options) == {'expireAfterSeconds'}:
+                self.mongodb_db.command('collMod', collection.name, index={
+                    'name': name, 'expireAfterSeconds': options['expireAfterSeconds']
+                })
+            else:
+                collection.drop_index(name)
+                collection.create_index(keys, name=name, **options)
+            logger.info(f"{collection.name}: index {name} mis à jour ({options})")
+    
+    def _record_snapshot_changes(self, collection_name, entry):
+        """Ajoute une entrée à l'historique des changements (expiration après SNAPSHOT_HISTORY_DAYS)"""
+        history = self.mongodb_db[SNAPSHOT_HISTORY_COLLECTION]
+        self._ensure_index(history, 'run_at', name='run_at_1', expireAfterSeconds=SNAPSHOT_HISTORY_DAYS * 86400)
+        history.create_index([('collection', 1), ('run_at', -1)])
+        history.insert_one({'collection': collection_name, 'run_at': datetime.utcnow(), **entry})
+    
     def extract_audit_trail(self, days_back=30):
         """Extraction des données d'audit"""
         logger.info(f"Extraction des données d'audit (derniers {days_back} jours)")
@@ -75,16 +252,10 @@ class OracleExtractor:
         """
         
         cursor = self.oracle_conn.cursor()
-        cursor.execute(query, days_back=days_back)
-        
-        audit_collection = self.mongodb_db['oracle_audit_trail']
+        extracted_at = datetime.now().isoformat()
         
-        # Suppression des anciennes données
-        audit_collection.delete_many({})
-        
-        count = 0
-        for row in cursor:
-            audit_record = {
+        def to_document(row):
+            return {
                 'username': row[0],
                 'timestamp': row[1].isoformat() if row[1] else None,
                 'object_name': row[2],
@@ -94,17 +265,16 @@ class OracleExtractor:
                 'sessionid': row[6],
                 'os_username': row[7],
                 'userhost': row[8],
-                'extracted_at': datetime.now().isoformat()
+                'extracted_at': extracted_at
             }
-            
-            audit_collection.insert_one(audit_record)
-            count += 1
-            
-            if count % 100 == 0:
-                logger.info(f"Extrait {count} enregistrements...")
+        
+        try:
+            cursor.execute(query, days_back=days_back)
+            count = self._load_collection('oracle_audit_trail', self._cursor_batches(cursor, to_document))
+        finally:
+            cursor.close()
         
         logger.info(f"Extraction audit terminée: {count} enregistrements")
-        cursor.close()
     
     def extract_schema_info(self):
         """Extraction des informations du schéma"""
@@ -124,28 +294,6 @@ class OracleExtractor:
         FROM USER_TABLES
         """
         
-        cursor = self.oracle_conn.cursor()
-        cursor.execute(tables_query)
-        
-        schema_collection = self.mongodb_db['oracle_schema']
-        schema_collection.delete_many({'type': 'table'})
-        
-        for row in cursor:
-            table_info = {
-                'type': 'table',
-                'table_name': row[0],
-                'tablespace_name': row[1],
-                'num_rows': row[2],
-                'blocks': row[3],
-                'avg_row_len': row[4],
-                'last_analyzed': row[5].isoformat() if row[5] else None,
-                'partitioned': row[6],
-                'temporary': row[7],
-                'extracted_at': datetime.now().isoformat()
-            }
-            
-            schema_collection.insert_one(table_info)
-        
         # Colonnes
         columns_query = """
         SELECT 
@@ -160,11 +308,24 @@ class OracleExtractor:
         ORDER BY TABLE_NAME, COLUMN_ID
         """
         
-        cursor.execute(columns_query)
-        schema_collection.delete_many({'type': 'column'})
+        extracted_at = datetime.now().isoformat()
         
-        for row in cursor:
-            column_info = {
+        def table_document(row):
+            return {
+                'type': 'table',
+                'table_name': row[0],
+                'tablespace_name': row[1],
+                'num_rows': row[2],
+                'blocks': row[3],
+                'avg_row_len': row[4],
+                'last_analyzed': row[5].isoformat() if row[5] else None,
+                'partitioned': row[6],
+                'temporary': row[7],
+                'extracted_at': extracted_at
+            }
+        
+        def column_document(row):
+            return {
                 'type': 'column',
                 'table_name': row[0],
                 'column_name': row[1],
@@ -173,13 +334,31 @@ class OracleExtractor:
                 'nullable': row[4],
                 'column_id': row[5],
                 'data_default': row[6],
-                'extracted_at': datetime.now().isoformat()
+                'extracted_at': extracted_at
             }
-            
-            schema_collection.insert_one(column_info)
         
-        logger.info("Informations du schéma extraites")
-        cursor.close()
+        def batches(cursor):
+            # Tables puis colonnes dans la même collection de staging: une seule bascule
+            cursor.execute(tables_query)
+            yield from self._cursor_batches(cursor, table_document)
+            cursor.execute(columns_query)
+            yield from self._cursor_batches(cursor, column_document)
+        
+        def key_of(document):
+            if document['type'] == 'table':
+                return f"table:{document['table_name']}"
+            return f"column:{document['table_name']}.{document['column_name']}"
+        
+        cursor = self.oracle_conn.cursor()
+        try:
+            if SNAPSHOT_MODE == 'diff':
+                count = self._sync_snapshot('oracle_schema', batches(cursor), key_of)
+            else:
+                count = self._load_collection('oracle_schema', batches(cursor))
+        finally:
+            cursor.close()
+        
+        logger.info(f"Informations du schéma extraites: {count} enregistrements")
     
     def extract_performance_stats(self):
         """Extraction des statistiques de performance"""
@@ -193,31 +372,43 @@ class OracleExtractor:
             BLOCKS,
             AVG_ROW_LEN,
             LAST_ANALYZED,
-            SAMPLE_SIZE
+            SAMPLE_SIZE,
+            PARTITION_NAME,
+            SUBPARTITION_NAME
         FROM USER_TAB_STATISTICS
         """
         
         cursor = self.oracle_conn.cursor()
-        cursor.execute(stats_query)
+        extracted_at = datetime.now().isoformat()
         
-        stats_collection = self.mongodb_db['oracle_performance_stats']
-        stats_collection.delete_many({})
-        
-        for row in cursor:
-            stats_record = {
+        def to_document(row):
+            return {
                 'table_name': row[0],
                 'num_rows': row[1],
                 'blocks': row[2],
                 'avg_row_len': row[3],
                 'last_analyzed': row[4].isoformat() if row[4] else None,
                 'sample_size': row[5],
-                'extracted_at': datetime.now().isoformat()
+                'partition_name': row[6],
+                'subpartition_name': row[7],
+                'extracted_at': extracted_at
             }
-            
-            stats_collection.insert_one(stats_record)
         
-        logger.info("Statistiques de performance extraites")
-        cursor.close()
+        def key_of(document):
+            # Une ligne par table, partition et sous-partition
+            return f"{document['table_name']}:{document['partition_name'] or ''}:{document['subpartition_name'] or ''}"
+        
+        try:
+            cursor.execute(stats_query)
+            batches = self._cursor_batches(cursor, to_document)
+            if SNAPSHOT_MODE == 'diff':
+                count = self._sync_snapshot('oracle_performance_stats', batches, key_of)
+            else:
+                count = self._load_collection('oracle_performance_stats', batches)
+        finally:
+            cursor.close()
+        
+        logger.info(f"Statistiques de performance extraites: {count} enregistrements")
     
     def extract_user_activity(self, days_back=7):
         """Extraction de l'activité utilisateur"""
@@ -236,24 +427,24 @@ class OracleExtractor:
         """
         
         cursor = self.oracle_conn.cursor()
-        cursor.execute(activity_query, days_back=days_back)
+        extracted_at = datetime.now().isoformat()
         
-        activity_collection = self.mongodb_db['oracle_user_activity']
-        activity_collection.delete_many({})
-        
-        for row in cursor:
-            activity_record = {
+        def to_document(row):
+            return {
                 'username': row[0],
                 'action_count': row[1],
                 'first_action': row[2].isoformat() if row[2] else None,
                 'last_action': row[3].isoformat() if row[3] else None,
-                'extracted_at': datetime.now().isoformat()
+                'extracted_at': extracted_at
             }
-            
-            activity_collection.insert_one(activity_record)
         
-        logger.info("Activité utilisateur extraite")
-        cursor.close()
+        try:
+            cursor.execute(activity_query, days_back=days_back)
+            count = self._load_collection('oracle_user_activity', self._cursor_batches(cursor, to_document))
+        finally:
+            cursor.close()
+        
+        logger.info(f"Activité utilisateur extraite: {count} enregistrements")
     
     def close_connections(self):
         """Fermeture des connexions"""